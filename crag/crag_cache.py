@@ -0,0 +1,164 @@
+"""
+CRAG 调用缓存
+以 (节点类型, 模型/提示词作用域, 输入内容) 的哈希为键，把相关性评分、问题重写和网页搜索结果
+持久化到 SQLite，每种节点类型单独设置 TTL
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('crag')
+
+
+class CRAGCallCache:
+    """基于 SQLite 的内容寻址缓存"""
+
+    # 默认 TTL（秒）：评分与重写只依赖输入文本，可以长期保留；网页搜索结果时效性强
+    DEFAULT_TTL_SECONDS = {
+        "grade": 7 * 24 * 3600,
+        "rewrite": 7 * 24 * 3600,
+        "web_search": 6 * 3600,
+    }
+
+    def __init__(self, db_path: Path, ttl_seconds: Optional[Dict[str, int]] = None):
+        """
+        初始化缓存
+
+        Args:
+            db_path: SQLite 文件路径
+            ttl_seconds: 按节点类型覆盖默认 TTL
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = dict(self.DEFAULT_TTL_SECONDS)
+        self.ttl_seconds.update(ttl_seconds or {})
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS crag_cache (
+                key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+
+    @staticmethod
+    def make_key(namespace: str, scope: str, payload: Dict[str, Any]) -> str:
+        """生成缓存键：节点类型 + 作用域（模型与提示词）+ 规范化后的输入"""
+        raw = json.dumps(
+            {"namespace": namespace, "scope": scope, "payload": payload},
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def lookup(self, namespace: str, scope: str, payload: Dict[str, Any]) -> Tuple[bool, Any]:
+        """
+        查询缓存
+
+        Returns:
+            (是否命中, 缓存值)
+        """
+        key = self.make_key(namespace, scope, payload)
+        ttl = self.ttl_seconds.get(namespace)
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM crag_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is not None and (ttl is None or time.time() - row[1] <= ttl):
+                self._hits[namespace] = self._hits.get(namespace, 0) + 1
+                return True, json.loads(row[0])
+
+            self._misses[namespace] = self._misses.get(namespace, 0) + 1
+            return False, None
+
+    def store(self, namespace: str, scope: str, payload: Dict[str, Any], value: Any):
+        """写入缓存，值必须可 JSON 序列化"""
+        key = self.make_key(namespace, scope, payload)
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO crag_cache (key, namespace, value, created_at) VALUES (?, ?, ?, ?)",
+                    (key, namespace, json.dumps(value, ensure_ascii=False), time.time()),
+                )
+                self._conn.commit()
+        except Exception as e:
+            # 缓存写入失败不影响主流程
+            logger.warning(f"⚠️ [CRAG缓存] 写入失败 ({namespace}): {e}")
+
+    def get_or_compute(
+        self,
+        namespace: str,
+        scope: str,
+        payload: Dict[str, Any],
+        compute: Callable[[], Any],
+    ) -> Any:
+        """命中则直接返回，否则调用 compute 并写入缓存"""
+        hit, value = self.lookup(namespace, scope, payload)
+        if hit:
+            return value
+        value = compute()
+        self.store(namespace, scope, payload, value)
+        return value
+
+    def purge_expired(self) -> int:
+        """删除已过期的条目，返回删除数量"""
+        now = time.time()
+        removed = 0
+        with self._lock:
+            for namespace, ttl in self.ttl_seconds.items():
+                cursor = self._conn.execute(
+                    "DELETE FROM crag_cache WHERE namespace = ? AND created_at < ?",
+                    (namespace, now - ttl),
+                )
+                removed += cursor.rowcount
+            self._conn.commit()
+        return removed
+
+    def clear(self, namespace: Optional[str] = None):
+        """清空缓存，可只清空某种节点类型"""
+        with self._lock:
+            if namespace is None:
+                self._conn.execute("DELETE FROM crag_cache")
+            else:
+                self._conn.execute("DELETE FROM crag_cache WHERE namespace = ?", (namespace,))
+            self._conn.commit()
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """本进程内各节点类型的命中/未命中计数"""
+        with self._lock:
+            namespaces = set(self._hits) | set(self._misses)
+            stats = {}
+            for namespace in sorted(namespaces):
+                hits = self._hits.get(namespace, 0)
+                misses = self._misses.get(namespace, 0)
+                stats[namespace] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                }
+            return stats
+
+
+def cache_scope(model_name: str, prompt) -> str:
+    """模型名 + 提示词内容的短哈希，提示词修改后旧缓存自然失效"""
+    prompt_repr = repr(getattr(prompt, "messages", prompt))
+    return f"{model_name}:{hashlib.sha256(prompt_repr.encode('utf-8')).hexdigest()[:12]}"
@@ -1,11 +1,7 @@
 import os
 from pathlib import Path
-from typing import List
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import TextLoader
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import DashScopeEmbeddings
 from langchain.schema import Document
 
 from langchain_core.prompts import ChatPromptTemplate
@@ -19,6 +15,11 @@ from langchain_community.tools.tavily_search import TavilySearchResults
 from langgraph.graph import END, StateGraph, START
 
 from tradingagents.llm_adapters import ChatDashScopeOpenAI
+from tradingagents.embeddings import get_dashscope_embedding_service, get_local_embedding_service
+
+from crag.document_index import PersistentDocumentIndex
+from crag.crag_cache import CRAGCallCache, cache_scope
+from crag.semantic_cache import SemanticAnswerCache, extract_entity_key
 
 os.environ["DASHSCOPE_API_KEY"] = "sk-647775243b4a4581ae112c3aded81a66"
 os.environ["TAVILY_API_KEY"] = "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"
@@ -28,7 +29,39 @@ class CRAGServer:
         self,
         doc_dir: str,
         collection_name: str = "rag-chroma",
+        persist_directory: Optional[str] = None,
+        llm_model: str = "qwen-turbo",
+        grading_mode: str = "parallel",
+        grading_concurrency: int = 5,
+        cache_enabled: bool = True,
+        cache_ttl_seconds: Optional[Dict[str, int]] = None,
+        semantic_cache_threshold: Optional[float] = 0.95,
+        semantic_cache_ttl_seconds: int = 24 * 3600,
+        embedding_provider: str = "dashscope",
+        local_embedding_model: Optional[str] = None,
+        vector_backend: str = "chroma",
     ):
+        """
+        Args:
+            doc_dir: 文档目录（相对于 crag/ 目录）
+            collection_name: 向量集合名
+            persist_directory: 向量库持久化目录，默认为 crag/chroma_db
+            llm_model: 评分、生成与问题重写使用的模型
+            grading_mode: 相关性评分方式，sequential（逐个）/ parallel（并发逐个）/ batch（单次调用批量评分）
+            grading_concurrency: parallel 模式下的最大并发数
+            cache_enabled: 是否缓存相关性评分、问题重写和网页搜索结果
+            cache_ttl_seconds: 按节点类型（grade / rewrite / web_search）覆盖缓存 TTL
+            semantic_cache_threshold: 语义答案缓存的命中相似度阈值，None 表示关闭；
+                问题中的股票代码、公司名、报告期和数值必须与缓存条目完全相同才会命中
+            semantic_cache_ttl_seconds: 语义答案缓存的新鲜度期限
+            embedding_provider: 嵌入提供商，dashscope（远程）或 local（本地模型，离线可用）
+            local_embedding_model: 本地嵌入模型名称/路径，"hashing" 表示哈希向量化
+            vector_backend: 向量库实现，chroma 或 numpy（进程内轻量索引）
+        """
+        if grading_mode not in ("sequential", "parallel", "batch"):
+            raise ValueError(f"不支持的评分方式：{grading_mode}")
+        self.grading_mode = grading_mode
+        self.grading_concurrency = grading_concurrency
 
         ### Retrieval
         BASE_DIR = Path(__file__).resolve().parent
@@ -36,20 +69,41 @@ class CRAGServer:
         if not doc_dir.exists() or not doc_dir.is_dir():
             raise FileNotFoundError(f"文档目录不存在：{doc_dir}")
 
-        docs: List[Document] = []
-        for file in doc_dir.rglob("*.md"):
-            docs.extend(TextLoader(str(file), encoding="utf-8").load())
+        persist_directory = BASE_DIR / (persist_directory or "chroma_db")
 
-        splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        if embedding_provider == "local":
+            self.embedding = get_local_embedding_service(local_embedding_model)
+        else:
+            # 与智能体记忆共用的嵌入服务，沿用 DashScopeEmbeddings 的默认模型以兼容已有索引
+            self.embedding = get_dashscope_embedding_service("text-embedding-v1")
+
+        # 持久化索引只对新增/变更的分块调用嵌入接口
+        self.document_index = PersistentDocumentIndex(
+            doc_dir=doc_dir,
+            persist_directory=persist_directory,
+            collection_name=collection_name,
+            embedding=self.embedding,
             chunk_size=250,
             chunk_overlap=0,
+            vector_backend=vector_backend,
         )
-        doc_splits = splitter.split_documents(docs)
+        self.index_stats = self.document_index.sync()
+        self.vectorstore = self.document_index.vectorstore
 
-        self.vectorstore = Chroma.from_documents(
-            documents=doc_splits,
-            collection_name=collection_name,
-            embedding=DashScopeEmbeddings(),
+        self.llm_model = llm_model
+        self.call_cache = (
+            CRAGCallCache(persist_directory / "crag_cache.sqlite", ttl_seconds=cache_ttl_seconds)
+            if cache_enabled else None
+        )
+        self.semantic_cache = (
+            SemanticAnswerCache(
+                persist_directory / "crag_cache.sqlite",
+                embedding=self.embedding,
+                scope=f"{collection_name}:{llm_model}",
+                threshold=semantic_cache_threshold,
+                ttl_seconds=semantic_cache_ttl_seconds,
+            )
+            if semantic_cache_threshold is not None else None
         )
 
         self.retriever = self.vectorstore.as_retriever(
@@ -67,7 +121,7 @@ class CRAGServer:
             )
 
         self.relevance_llm = ChatDashScopeOpenAI(
-            model="qwen-turbo",
+            model=llm_model,
             temperature=0,
         )
         self.structured_llm_grader = self.relevance_llm.with_structured_output(GradeDocuments)
@@ -83,9 +137,30 @@ class CRAGServer:
 
         self.retrieval_grader = self.grade_prompt | self.structured_llm_grader
 
+        ### Batch Retrieval Grader
+        class BatchGradeDocuments(BaseModel):
+            """Binary relevance scores for a numbered list of retrieved documents."""
+
+            binary_scores: List[str] = Field(
+                description="One 'yes' or 'no' per document, in the same order as the documents"
+            )
+
+        self.structured_llm_batch_grader = self.relevance_llm.with_structured_output(BatchGradeDocuments)
+
+        self.batch_grade_prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", """您是一名评分员，用于评估检索到的多篇文档与用户问题的相关性。
+                文档以 [序号] 开头依次给出。对每篇文档，如果包含与问题相关的关键词或语义意义，请标记为“相关”。
+                请按文档顺序逐篇给出二元评分——“yes”或“no”，评分数量必须等于文档数量。"""),
+                ("human", "共 {count} 篇检索文档: \n\n {documents} \n\n 用户问题: {question}"),
+            ]
+        )
+
+        self.batch_retrieval_grader = self.batch_grade_prompt | self.structured_llm_batch_grader
+
         ### Generate
         self.rag_llm = ChatDashScopeOpenAI(
-            model="qwen-turbo",
+            model=llm_model,
             temperature=0,
         )
 
@@ -104,7 +179,7 @@ class CRAGServer:
 
         ### Question Re-writer
         self.question_llm = ChatDashScopeOpenAI(
-            model="qwen-turbo",
+            model=llm_model,
             temperature=0,
         )
 
@@ -133,9 +208,23 @@ class CRAGServer:
 
         retrieve_node = create_retrieve_node(self.retriever)
         generate_node = create_generate_node(self.rag_chain)
-        grade_documents_node = create_grade_documents_node(self.retrieval_grader)
-        transform_query_node = create_transform_query_node(self.question_rewriter)
-        web_search_node = create_web_search_node(self.web_search_tool)
+        grade_documents_node = create_grade_documents_node(
+            self.retrieval_grader,
+            max_concurrency=self.grading_concurrency if self.grading_mode == "parallel" else 1,
+            batch_grader=self.batch_retrieval_grader if self.grading_mode == "batch" else None,
+            cache=self.call_cache,
+            cache_scope=cache_scope(self.llm_model, self.grade_prompt),
+        )
+        transform_query_node = create_transform_query_node(
+            self.question_rewriter,
+            cache=self.call_cache,
+            cache_scope=cache_scope(self.llm_model, self.re_write_prompt),
+        )
+        web_search_node = create_web_search_node(
+            self.web_search_tool,
+            cache=self.call_cache,
+            cache_scope=f"tavily:{getattr(self.web_search_tool, 'max_results', '')}",
+        )
 
         # Define the nodes
         workflow.add_node("retrieve_node", retrieve_node)  # retrieve
@@ -162,6 +251,106 @@ class CRAGServer:
         # Compile
         self.graph = workflow.compile()
 
+    def _lookup_answer(self, question: str):
+        """
+        查询语义缓存
+
+        Returns:
+            (命中的最终状态或 None, 用于写回缓存的 (问题向量, 索引指纹, 实体键) 或 None)
+        """
+        if self.semantic_cache is None:
+            return None, None
+
+        fingerprint = self.document_index.fingerprint
+        entity_key = extract_entity_key(question)
+        question_vector = self.semantic_cache.embed(question)
+        cached = self.semantic_cache.lookup(question_vector, fingerprint, entity_key)
+        if cached is not None:
+            return {
+                "question": question,
+                "generation": cached["generation"],
+                "documents": cached["documents"],
+                "cache_hit": True,
+            }, None
+        return None, (question_vector, fingerprint, entity_key)
+
+    def _remember_answer(self, question: str, cache_key, result: Dict):
+        if cache_key is not None and result.get("generation"):
+            question_vector, fingerprint, entity_key = cache_key
+            self.semantic_cache.store(
+                question, question_vector, fingerprint, entity_key, result["generation"], result.get("documents")
+            )
+
+    def invoke(self, question: str) -> Dict:
+        """
+        回答问题，相似问题命中语义缓存时跳过检索、评分与生成
+
+        Returns:
+            图的最终状态（question / generation / documents），附带 cache_hit 标记
+        """
+        cached, cache_key = self._lookup_answer(question)
+        if cached is not None:
+            return cached
+
+        result = self.graph.invoke({"question": question})
+        self._remember_answer(question, cache_key, result)
+        result["cache_hit"] = False
+        return result
+
+    def stream(self, question: str) -> Iterator[Tuple[str, Any]]:
+        """
+        流式回答问题
+
+        Yields:
+            ("token", 文本片段)：generate_node 产生的生成 token；
+            ("final", 最终状态)：结束时产出一次，结构与 invoke 的返回值相同
+        """
+        cached, cache_key = self._lookup_answer(question)
+        if cached is not None:
+            yield "token", cached["generation"]
+            yield "final", cached
+            return
+
+        final_state = None
+        for mode, payload in self.graph.stream(
+            {"question": question}, stream_mode=["messages", "values"]
+        ):
+            if mode == "messages":
+                chunk, metadata = payload
+                # 问题重写节点也会调用 LLM，只转发最终答案的 token
+                if metadata.get("langgraph_node") == "generate_node" and chunk.content:
+                    yield "token", chunk.content
+            else:
+                final_state = payload
+
+        final_state = dict(final_state or {})
+        self._remember_answer(question, cache_key, final_state)
+        final_state["cache_hit"] = False
+        yield "final", final_state
+
+    def invoke_streaming(self, question: str, on_token: Callable[[str], None]) -> Dict:
+        """
+        流式回答问题，每个 token 回调一次 on_token，返回最终状态
+
+        Args:
+            question: 问题
+            on_token: token 回调，例如把累积文本写入 Streamlit 占位符
+        """
+        result = {}
+        for event, payload in self.stream(question):
+            if event == "token":
+                on_token(payload)
+            else:
+                result = payload
+        return result
+
+    def cache_stats(self) -> Dict[str, Dict[str, float]]:
+        """各节点类型的缓存命中/未命中计数"""
+        stats = self.call_cache.get_stats() if self.call_cache is not None else {}
+        if self.semantic_cache is not None:
+            stats["semantic_answer"] = self.semantic_cache.get_stats()
+        return stats
+
 
 from typing_extensions import TypedDict
 
@@ -218,7 +407,29 @@ def create_generate_node(rag_chain):
         return {"documents": documents, "question": question, "generation": generation}
     return generate_node
 
-def create_grade_documents_node(retrieval_grader):
+def create_grade_documents_node(
+    retrieval_grader, max_concurrency=1, batch_grader=None, cache=None, cache_scope=""
+):
+    def grade_individually(question, documents):
+        inputs = [{"question": question, "document": d.page_content} for d in documents]
+        if max_concurrency > 1:
+            # Runnable.batch 在线程池中并发执行，max_concurrency 限制同时在途的请求数
+            scores = retrieval_grader.batch(inputs, config={"max_concurrency": max_concurrency})
+        else:
+            scores = [retrieval_grader.invoke(i) for i in inputs]
+        return [score.binary_score for score in scores]
+
+    def grade_in_one_call(question, documents):
+        numbered = "\n\n".join(f"[{i}] {d.page_content}" for i, d in enumerate(documents))
+        result = batch_grader.invoke(
+            {"question": question, "documents": numbered, "count": len(documents)}
+        )
+        grades = list(result.binary_scores)
+        if len(grades) != len(documents):
+            # 模型返回的评分数量不对，无法与文档一一对应，退回逐个评分
+            return grade_individually(question, documents)
+        return grades
+
     def grade_documents_node(state):
         """
         Determines whether the retrieved documents are relevant to the question.
@@ -233,15 +444,35 @@ def create_grade_documents_node(retrieval_grader):
         question = state["question"]
         documents = state["documents"]
 
-        # Score each doc
+        # Reuse cached grades, score the rest
+        grades = [None] * len(documents)
+        if cache is not None:
+            for i, d in enumerate(documents):
+                hit, grade = cache.lookup(
+                    "grade", cache_scope, {"question": question, "document": d.page_content}
+                )
+                if hit:
+                    grades[i] = grade
+
+        pending = [i for i, grade in enumerate(grades) if grade is None]
+        if pending:
+            pending_docs = [documents[i] for i in pending]
+            if batch_grader is not None:
+                fresh_grades = grade_in_one_call(question, pending_docs)
+            else:
+                fresh_grades = grade_individually(question, pending_docs)
+
+            for i, grade in zip(pending, fresh_grades):
+                grades[i] = grade
+                if cache is not None:
+                    cache.store(
+                        "grade", cache_scope, {"question": question, "document": documents[i].page_content}, grade
+                    )
+
         filtered_docs = []
         web_search = "No"
-        for d in documents:
-            score = retrieval_grader.invoke(
-                {"question": question, "document": d.page_content}
-            )
-            grade = score.binary_score
-            if grade == "yes":
+        for d, grade in zip(documents, grades):
+            if str(grade).strip().lower() == "yes":
                 filtered_docs.append(d)
             else:
                 web_search = "Yes"
@@ -249,7 +480,7 @@ def create_grade_documents_node(retrieval_grader):
         return {"documents": filtered_docs, "question": question, "web_search": web_search}
     return grade_documents_node
 
-def create_transform_query_node(question_rewriter):
+def create_transform_query_node(question_rewriter, cache=None, cache_scope=""):
     def transform_query(state):
         """
         Transform the query to produce a better question.
@@ -265,11 +496,17 @@ def create_transform_query_node(question_rewriter):
         documents = state["documents"]
 
         # Re-write question
-        better_question = question_rewriter.invoke({"question": question})
+        if cache is not None:
+            better_question = cache.get_or_compute(
+                "rewrite", cache_scope, {"question": question},
+                lambda: question_rewriter.invoke({"question": question}),
+            )
+        else:
+            better_question = question_rewriter.invoke({"question": question})
         return {"documents": documents, "question": better_question}
     return transform_query
 
-def create_web_search_node(web_search_tool):
+def create_web_search_node(web_search_tool, cache=None, cache_scope=""):
     def web_search(state):
         """
         Web search based on the re-phrased question.
@@ -285,7 +522,12 @@ def create_web_search_node(web_search_tool):
         documents = state["documents"]
 
         # Web search
-        docs = web_search_tool.invoke({"query": question})
+        hit, docs = cache.lookup("web_search", cache_scope, {"query": question}) if cache is not None else (False, None)
+        if not hit:
+            docs = web_search_tool.invoke({"query": question})
+            # 搜索失败时工具返回错误字符串，不写入缓存
+            if cache is not None and isinstance(docs, list):
+                cache.store("web_search", cache_scope, {"query": question}, docs)
         web_results = "\n".join([d["content"] for d in docs])
         web_results = Document(page_content=web_results)
         documents.append(web_results)
@@ -323,5 +565,5 @@ if __name__ == "__main__":
         collection_name="rag-chroma",
     )
 
-    message = crag_server.graph.invoke({"question": "What are the types of agent memory?"})
+    message = crag_server.invoke("What are the types of agent memory?")
     print(message["generation"])
\ No newline at end of file
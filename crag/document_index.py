@@ -0,0 +1,360 @@
+"""
+CRAG 文档向量索引
+持久化的 Chroma 集合 + 分块内容哈希清单（manifest）。
+启动时只对新增或变更的文件/分块做向量化，并删除源文件已消失的分块。
+文件解析与分块见 crag/ingestion.py
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langchain.schema import Document
+from langchain_community.vectorstores import Chroma
+
+from tradingagents.embeddings import NumpyVectorStore
+
+from crag.ingestion import SUPPORTED_PATTERNS, iter_file_chunks
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('crag')
+
+# 清单格式版本，格式不兼容时递增以触发全量重建
+MANIFEST_VERSION = 1
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class PersistentDocumentIndex:
+    """持久化、增量同步的文档向量索引"""
+
+    def __init__(
+        self,
+        doc_dir: Path,
+        persist_directory: Path,
+        collection_name: str,
+        embedding,
+        chunk_size: int = 250,
+        chunk_overlap: int = 0,
+        file_patterns: Iterable[str] = SUPPORTED_PATTERNS,
+        add_batch_size: int = 64,
+        max_workers: Optional[int] = None,
+        vector_backend: str = "chroma",
+    ):
+        """
+        初始化文档索引
+
+        Args:
+            doc_dir: 源文档目录
+            persist_directory: 向量库与清单的持久化目录
+            collection_name: Chroma 集合名
+            embedding: LangChain Embeddings 实例
+            chunk_size: 分块大小（tiktoken token 数）
+            chunk_overlap: 分块重叠
+            file_patterns: 参与索引的文件匹配模式
+            add_batch_size: 每批写入向量库（即每批向量化）的分块数
+            max_workers: 解析文件的进程数，默认为 CPU 核数
+            vector_backend: 向量库实现，chroma 或 numpy（进程内轻量索引，适合小集合）
+        """
+        self.doc_dir = Path(doc_dir)
+        self.persist_directory = Path(persist_directory)
+        self.persist_directory.mkdir(parents=True, exist_ok=True)
+        self.collection_name = collection_name
+        self.embedding = embedding
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.file_patterns = tuple(file_patterns)
+        self.add_batch_size = add_batch_size
+        self.max_workers = max_workers
+        self.vector_backend = vector_backend
+
+        self.manifest_path = self.persist_directory / f"{collection_name}.manifest.json"
+
+        self.vectorstore = self._create_vectorstore()
+        self.manifest = self._load_manifest()
+
+    # ------------------------------------------------------------------
+    # 清单读写
+    # ------------------------------------------------------------------
+
+    def _settings(self) -> Dict[str, Any]:
+        """影响分块与向量结果的配置，任一变化都需要全量重建"""
+        settings = {
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+            "embedding": getattr(self.embedding, "model", type(self.embedding).__name__),
+        }
+        if self.vector_backend != "chroma":
+            # 默认后端不写入该字段，已有的 Chroma 清单无需重建
+            settings["vector_backend"] = self.vector_backend
+        return settings
+
+    def _empty_manifest(self) -> Dict[str, Any]:
+        return {
+            "version": MANIFEST_VERSION,
+            "settings": self._settings(),
+            "fingerprint": "",
+            "updated_at": None,
+            "files": {},
+        }
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        if not self.manifest_path.exists():
+            return self._empty_manifest()
+
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ [CRAG索引] 清单读取失败，将全量重建: {e}")
+            self._reset_collection()
+            return self._empty_manifest()
+
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("settings") != self._settings():
+            logger.info(f"🔄 [CRAG索引] 索引配置已变化，全量重建集合: {self.collection_name}")
+            stale_ids = [cid for entry in manifest.get("files", {}).values() for cid in entry.get("chunks", [])]
+            self._delete_chunks(stale_ids)
+            return self._empty_manifest()
+
+        return manifest
+
+    def _save_manifest(self):
+        """原子写入清单，避免进程中断留下半截文件"""
+        self.manifest["updated_at"] = time.time()
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _reset_collection(self):
+        """清单损坏时无法得知已有分块，直接清空集合"""
+        try:
+            self.vectorstore.delete_collection()
+        except Exception as e:
+            logger.warning(f"⚠️ [CRAG索引] 清空集合失败: {e}")
+        self.vectorstore = self._create_vectorstore()
+
+    def _create_vectorstore(self):
+        if self.vector_backend == "numpy":
+            # 批量导入时逐批保存会反复重写整个矩阵，改为每次同步结束时保存一次
+            return NumpyVectorStore(
+                self.embedding,
+                collection_name=self.collection_name,
+                persist_directory=str(self.persist_directory),
+                autosave=False,
+            )
+        return Chroma(
+            collection_name=self.collection_name,
+            embedding_function=self.embedding,
+            persist_directory=str(self.persist_directory),
+        )
+
+    # ------------------------------------------------------------------
+    # 分块与向量库写入
+    # ------------------------------------------------------------------
+
+    def _iter_source_files(self) -> List[Path]:
+        files = set()
+        for pattern in self.file_patterns:
+            files.update(p for p in self.doc_dir.rglob(pattern) if p.is_file())
+        return sorted(files)
+
+    @staticmethod
+    def _hash_file(path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _assign_chunk_ids(source: str, chunks: List[Document]) -> List[str]:
+        """
+        分块ID由来源路径和内容哈希决定，与分块位置无关，
+        文件中插入/删除段落时未变化的分块可以直接复用
+        """
+        ids = []
+        occurrences: Dict[str, int] = {}
+        for chunk in chunks:
+            content_hash = _sha256(chunk.page_content.encode("utf-8"))
+            n = occurrences.get(content_hash, 0)
+            occurrences[content_hash] = n + 1
+            chunk.metadata["chunk_hash"] = content_hash
+            ids.append(_sha256(f"{source}\0{content_hash}\0{n}".encode("utf-8"))[:40])
+        return ids
+
+    def _defers_persist(self) -> bool:
+        """向量库是否需要在写入结束后显式保存"""
+        return isinstance(self.vectorstore, NumpyVectorStore) and self.vectorstore.persistent
+
+    def _delete_chunks(self, ids: List[str]):
+        if ids:
+            self.vectorstore.delete(ids=list(ids))
+
+    def _flush(self, pending_docs: List[Document], pending_ids: List[str],
+               stale_ids: List[str], pending_entries: List[Tuple[str, Dict[str, Any]]]):
+        """
+        批量写入向量库后再提交对应文件的清单条目，
+        进程中断时已写入的分块不会被重复向量化，未写入的文件下次会重新处理。
+        向量库在同步结束时才落盘（NumPy 后端）时，清单也推迟到那时一起保存
+        """
+        for start in range(0, len(pending_docs), self.add_batch_size):
+            self.vectorstore.add_documents(
+                pending_docs[start:start + self.add_batch_size],
+                ids=pending_ids[start:start + self.add_batch_size],
+            )
+        self._delete_chunks(stale_ids)
+
+        for source, entry in pending_entries:
+            self.manifest["files"][source] = entry
+        if pending_entries and not self._defers_persist():
+            self._save_manifest()
+
+        pending_docs.clear()
+        pending_ids.clear()
+        stale_ids.clear()
+        pending_entries.clear()
+
+    # ------------------------------------------------------------------
+    # 同步
+    # ------------------------------------------------------------------
+
+    def sync(self) -> Dict[str, int]:
+        """
+        将向量库与文档目录对齐
+
+        先用 文件大小/修改时间/内容哈希 找出需要重新解析的文件，
+        再在进程池中并行解析，按批次写入向量库
+
+        Returns:
+            同步统计信息
+        """
+        start_time = time.time()
+        stats = {
+            "files_added": 0,
+            "files_changed": 0,
+            "files_removed": 0,
+            "files_unchanged": 0,
+            "files_failed": 0,
+            "chunks_added": 0,
+            "chunks_removed": 0,
+            "chunks_reused": 0,
+        }
+
+        files = self.manifest["files"]
+        seen = set()
+        dirty = False
+        to_parse: List[Tuple[Path, str]] = []
+        parse_info: Dict[str, Tuple[str, os.stat_result]] = {}
+
+        for path in self._iter_source_files():
+            source = path.relative_to(self.doc_dir).as_posix()
+            seen.add(source)
+            entry = files.get(source)
+            stat = path.stat()
+
+            if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                stats["files_unchanged"] += 1
+                stats["chunks_reused"] += len(entry["chunks"])
+                continue
+
+            file_hash = self._hash_file(path)
+            if entry and entry["file_hash"] == file_hash:
+                # 仅修改时间变化（如 touch / 重新检出），内容未变
+                entry["mtime"] = stat.st_mtime
+                entry["size"] = stat.st_size
+                stats["files_unchanged"] += 1
+                stats["chunks_reused"] += len(entry["chunks"])
+                dirty = True
+                continue
+
+            to_parse.append((path, source))
+            parse_info[source] = (file_hash, stat)
+
+        for source in sorted(set(files) - seen):
+            stale_ids = files.pop(source)["chunks"]
+            self._delete_chunks(stale_ids)
+            stats["files_removed"] += 1
+            stats["chunks_removed"] += len(stale_ids)
+            dirty = True
+
+        pending_docs: List[Document] = []
+        pending_ids: List[str] = []
+        stale_ids: List[str] = []
+        pending_entries: List[Tuple[str, Dict[str, Any]]] = []
+
+        for source, segments, error in iter_file_chunks(
+            to_parse, self.chunk_size, self.chunk_overlap, max_workers=self.max_workers
+        ):
+            if error:
+                # 解析失败时保留旧分块，下次同步重试
+                logger.warning(f"⚠️ [CRAG索引] 文件解析失败，已跳过: {source} ({error})")
+                stats["files_failed"] += 1
+                continue
+
+            file_hash, stat = parse_info[source]
+            entry = files.get(source)
+            chunks = [Document(page_content=text, metadata=metadata) for text, metadata in segments]
+            ids = self._assign_chunk_ids(source, chunks)
+            old_ids = set(entry["chunks"]) if entry else set()
+
+            added = 0
+            for chunk, cid in zip(chunks, ids):
+                if cid not in old_ids:
+                    pending_docs.append(chunk)
+                    pending_ids.append(cid)
+                    added += 1
+            removed = old_ids - set(ids)
+            stale_ids.extend(removed)
+            pending_entries.append((source, {
+                "file_hash": file_hash,
+                "mtime": stat.st_mtime,
+                "size": stat.st_size,
+                "chunks": ids,
+            }))
+
+            stats["files_changed" if entry else "files_added"] += 1
+            stats["chunks_added"] += added
+            stats["chunks_removed"] += len(removed)
+            stats["chunks_reused"] += len(ids) - added
+            dirty = True
+
+            if len(pending_docs) >= self.add_batch_size:
+                self._flush(pending_docs, pending_ids, stale_ids, pending_entries)
+
+        self._flush(pending_docs, pending_ids, stale_ids, pending_entries)
+        if self._defers_persist() and self.vectorstore.persist():
+            # 向量先落盘，清单随后保存，清单中的分块一定已在向量库中
+            dirty = True
+
+        fingerprint = self._compute_fingerprint()
+        if dirty or fingerprint != self.manifest.get("fingerprint"):
+            self.manifest["fingerprint"] = fingerprint
+            self._save_manifest()
+
+        logger.info(
+            f"📚 [CRAG索引] {self.collection_name} 同步完成: "
+            f"新增文件 {stats['files_added']}, 变更 {stats['files_changed']}, 删除 {stats['files_removed']}, "
+            f"失败 {stats['files_failed']}; "
+            f"新增分块 {stats['chunks_added']}, 删除 {stats['chunks_removed']}, 复用 {stats['chunks_reused']}, "
+            f"耗时 {time.time() - start_time:.2f}s"
+        )
+        return stats
+
+    def _compute_fingerprint(self) -> str:
+        chunk_ids = sorted(cid for entry in self.manifest["files"].values() for cid in entry["chunks"])
+        return _sha256("\n".join(chunk_ids).encode("utf-8"))[:16]
+
+    @property
+    def fingerprint(self) -> str:
+        """索引内容指纹，分块集合任何变化都会改变该值"""
+        return self.manifest.get("fingerprint", "")
+
+    def as_retriever(self, **kwargs):
+        return self.vectorstore.as_retriever(**kwargs)
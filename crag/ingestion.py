@@ -0,0 +1,220 @@
+"""
+CRAG 文档解析与分块
+支持 Markdown/TXT、PDF、DOCX、XLSX、HTML，在进程池中并行解析和分块，
+按文件完成顺序流式返回分块，不需要一次性把整个目录读入内存
+"""
+
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('crag')
+
+SUPPORTED_PATTERNS = ("*.md", "*.txt", "*.pdf", "*.docx", "*.xlsx", "*.html", "*.htm")
+
+# (文本, 元数据) 片段；一个文件可以拆成多个片段（如 PDF 的每一页、XLSX 的每个工作表）
+Segment = Tuple[str, Dict[str, Any]]
+# (来源, 分块列表, 错误信息)
+FileChunks = Tuple[str, List[Segment], Optional[str]]
+
+# 每个工作进程缓存自己的分块器（内含 tiktoken 编码器），避免每个文件重复加载
+_SPLITTER_CACHE: Dict[Tuple[int, int], Any] = {}
+
+
+def _get_splitter(chunk_size: int, chunk_overlap: int):
+    key = (chunk_size, chunk_overlap)
+    splitter = _SPLITTER_CACHE.get(key)
+    if splitter is None:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+        splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+        )
+        _SPLITTER_CACHE[key] = splitter
+    return splitter
+
+
+# ----------------------------------------------------------------------
+# 各格式解析器
+# ----------------------------------------------------------------------
+
+def _parse_text(path: Path) -> List[Segment]:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return [(f.read(), {})]
+
+
+def _parse_pdf(path: Path) -> List[Segment]:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ImportError("解析 PDF 需要安装 pypdf: pip install pypdf")
+
+    reader = PdfReader(str(path))
+    return [
+        (page.extract_text() or "", {"page": page_number})
+        for page_number, page in enumerate(reader.pages, start=1)
+    ]
+
+
+def _parse_docx(path: Path) -> List[Segment]:
+    try:
+        import docx
+    except ImportError:
+        raise ImportError("解析 DOCX 需要安装 python-docx: pip install python-docx")
+
+    document = docx.Document(str(path))
+    lines = [p.text for p in document.paragraphs if p.text.strip()]
+    for table in document.tables:
+        for row in table.rows:
+            lines.append(" | ".join(cell.text.strip() for cell in row.cells))
+    return [("\n\n".join(lines), {})]
+
+
+def _parse_xlsx(path: Path) -> List[Segment]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportError("解析 XLSX 需要安装 openpyxl: pip install openpyxl")
+
+    workbook = load_workbook(str(path), read_only=True, data_only=True)
+    segments = []
+    try:
+        for sheet in workbook.worksheets:
+            rows = []
+            for row in sheet.iter_rows(values_only=True):
+                cells = ["" if v is None else str(v) for v in row]
+                if any(cells):
+                    rows.append("\t".join(cells))
+            if rows:
+                segments.append(("\n".join(rows), {"sheet": sheet.title}))
+    finally:
+        workbook.close()
+    return segments
+
+
+class _HTMLTextExtractor(HTMLParser):
+    """标准库 HTML 正文提取，忽略脚本与样式"""
+
+    _SKIP_TAGS = {"script", "style", "noscript", "head"}
+    _BLOCK_TAGS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article", "table"}
+
+    def __init__(self):
+        super().__init__()
+        self._parts: List[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in self._BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in self._BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._parts.append(data)
+
+    def get_text(self) -> str:
+        lines = (line.strip() for line in "".join(self._parts).splitlines())
+        return "\n".join(line for line in lines if line)
+
+
+def _parse_html(path: Path) -> List[Segment]:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        extractor = _HTMLTextExtractor()
+        extractor.feed(f.read())
+    return [(extractor.get_text(), {})]
+
+
+_PARSERS = {
+    ".md": _parse_text,
+    ".txt": _parse_text,
+    ".pdf": _parse_pdf,
+    ".docx": _parse_docx,
+    ".xlsx": _parse_xlsx,
+    ".html": _parse_html,
+    ".htm": _parse_html,
+}
+
+
+# ----------------------------------------------------------------------
+# 解析 + 分块
+# ----------------------------------------------------------------------
+
+def parse_and_split(path: str, source: str, chunk_size: int, chunk_overlap: int) -> FileChunks:
+    """
+    解析单个文件并分块（可在工作进程中执行）
+
+    Returns:
+        (来源, [(分块文本, 元数据), ...], 错误信息)
+    """
+    try:
+        parser = _PARSERS.get(Path(path).suffix.lower())
+        if parser is None:
+            return source, [], f"不支持的文件类型: {path}"
+
+        splitter = _get_splitter(chunk_size, chunk_overlap)
+        chunks = []
+        for text, metadata in parser(Path(path)):
+            if not text.strip():
+                continue
+            for piece in splitter.split_text(text):
+                chunks.append((piece, {"source": source, **metadata}))
+        return source, chunks, None
+    except Exception as e:
+        return source, [], f"{type(e).__name__}: {e}"
+
+
+def iter_file_chunks(
+    files: Iterable[Tuple[Path, str]],
+    chunk_size: int,
+    chunk_overlap: int,
+    max_workers: Optional[int] = None,
+    inline_threshold: int = 4,
+) -> Iterator[FileChunks]:
+    """
+    并行解析文件，按完成顺序逐个返回分块结果
+
+    Args:
+        files: (文件路径, 来源标识) 序列
+        chunk_size: 分块大小
+        chunk_overlap: 分块重叠
+        max_workers: 进程数，默认为 CPU 核数
+        inline_threshold: 文件数不超过该值时在当前进程内解析，省去进程池开销
+    """
+    files = list(files)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    if max_workers <= 1 or len(files) <= inline_threshold:
+        for path, source in files:
+            yield parse_and_split(str(path), source, chunk_size, chunk_overlap)
+        return
+
+    # 限制在途任务数，已完成但未被消费的结果不会无限堆积
+    max_in_flight = max_workers * 2
+    pending = iter(files)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = set()
+        for path, source in pending:
+            in_flight.add(executor.submit(parse_and_split, str(path), source, chunk_size, chunk_overlap))
+            if len(in_flight) >= max_in_flight:
+                break
+
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+                next_file = next(pending, None)
+                if next_file is not None:
+                    path, source = next_file
+                    in_flight.add(executor.submit(parse_and_split, str(path), source, chunk_size, chunk_overlap))
@@ -0,0 +1,171 @@
+"""
+CRAGServer 进程级注册表
+按 (文档目录, 集合名, 持久化目录, 模型配置) 复用已编译的 CRAG 图，
+避免每次请求都重建索引、LLM 客户端和 LangGraph
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('crag')
+
+if TYPE_CHECKING:
+    from crag.crag_server import CRAGServer
+
+BASE_DIR = Path(__file__).resolve().parent
+
+RegistryKey = Tuple[str, str, str, str, str]
+
+
+class CRAGServerRegistry:
+    """线程安全的 CRAGServer 注册表"""
+
+    def __init__(self):
+        self._servers: Dict[RegistryKey, "CRAGServer"] = {}
+        self._build_locks: Dict[RegistryKey, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _make_key(
+        doc_dir: str,
+        collection_name: str,
+        persist_directory: Optional[str],
+        llm_model: str,
+        server_kwargs: Dict[str, Any],
+    ) -> RegistryKey:
+        return (
+            str((BASE_DIR / doc_dir).resolve()),
+            collection_name,
+            str((BASE_DIR / (persist_directory or "chroma_db")).resolve()),
+            llm_model,
+            # 参数中可能包含 dict（如 cache_ttl_seconds），序列化后才能作为键
+            json.dumps(server_kwargs, sort_keys=True, default=str),
+        )
+
+    def get(
+        self,
+        doc_dir: str,
+        collection_name: str = "rag-chroma",
+        persist_directory: Optional[str] = None,
+        llm_model: str = "qwen-turbo",
+        **server_kwargs,
+    ) -> "CRAGServer":
+        """
+        获取（必要时创建）共享的 CRAGServer
+
+        同一个键只会构建一次；不同键的构建互不阻塞。
+        server_kwargs 透传给 CRAGServer（如 grading_mode），并参与注册表键
+        """
+        key = self._make_key(doc_dir, collection_name, persist_directory, llm_model, server_kwargs)
+
+        with self._lock:
+            server = self._servers.get(key)
+            if server is not None:
+                return server
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                server = self._servers.get(key)
+            if server is not None:
+                return server
+
+            from crag.crag_server import CRAGServer
+
+            logger.info(f"🔧 [CRAG注册表] 构建 CRAGServer: {collection_name} ({doc_dir}, {llm_model})")
+            server = CRAGServer(
+                doc_dir=doc_dir,
+                collection_name=collection_name,
+                persist_directory=persist_directory,
+                llm_model=llm_model,
+                **server_kwargs,
+            )
+            with self._lock:
+                self._servers[key] = server
+            return server
+
+    def refresh(
+        self,
+        doc_dir: Optional[str] = None,
+        collection_name: Optional[str] = None,
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        文档变更后就地增量同步已注册服务的索引，图与LLM客户端保持不变
+
+        Returns:
+            {集合名: 同步统计}
+        """
+        results = {}
+        for key, server in self._matching(doc_dir, collection_name):
+            with self._build_locks[key]:
+                results[key[1]] = server.document_index.sync()
+        return results
+
+    def invalidate(
+        self,
+        doc_dir: Optional[str] = None,
+        collection_name: Optional[str] = None,
+    ) -> int:
+        """
+        移除匹配的服务，下次 get 时重新构建；不传参数时清空注册表
+
+        Returns:
+            被移除的服务数量
+        """
+        removed = 0
+        for key, _ in self._matching(doc_dir, collection_name):
+            with self._lock:
+                if self._servers.pop(key, None) is not None:
+                    removed += 1
+        if removed:
+            logger.info(f"🗑️ [CRAG注册表] 已失效 {removed} 个 CRAGServer")
+        return removed
+
+    def _matching(self, doc_dir: Optional[str], collection_name: Optional[str]):
+        doc_key = str((BASE_DIR / doc_dir).resolve()) if doc_dir else None
+        with self._lock:
+            items = list(self._servers.items())
+        return [
+            (key, server) for key, server in items
+            if (doc_key is None or key[0] == doc_key)
+            and (collection_name is None or key[1] == collection_name)
+        ]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._servers)
+
+
+# 全局注册表实例
+_registry_instance = None
+_registry_lock = threading.Lock()
+
+def get_crag_registry() -> CRAGServerRegistry:
+    """获取全局 CRAGServer 注册表"""
+    global _registry_instance
+    if _registry_instance is None:
+        with _registry_lock:
+            if _registry_instance is None:
+                _registry_instance = CRAGServerRegistry()
+    return _registry_instance
+
+
+def get_crag_server(
+    doc_dir: str = "./document",
+    collection_name: str = "rag-chroma",
+    persist_directory: Optional[str] = None,
+    llm_model: str = "qwen-turbo",
+    **server_kwargs,
+) -> "CRAGServer":
+    """获取共享的 CRAGServer（便捷函数）"""
+    return get_crag_registry().get(
+        doc_dir=doc_dir,
+        collection_name=collection_name,
+        persist_directory=persist_directory,
+        llm_model=llm_model,
+        **server_kwargs,
+    )
@@ -0,0 +1,305 @@
+"""
+CRAG 语义答案缓存
+对问题做向量化，若与历史问题的余弦相似度超过阈值且未过期，直接返回缓存的答案与参考文档，
+跳过检索、评分与生成。
+
+匹配键除问题向量外还包括：
+- 文档索引指纹：索引变化后旧答案不再命中（旧条目保留给仍使用旧索引的进程，过期后清理）
+- 问题中的实体：股票代码、公司名、年份/报告期和数值，必须完全相同才会命中。
+  模板化的指标提取问题只有这些字词不同，整体相似度很高，不能只凭向量匹配
+多个进程共用同一 SQLite 文件时，每次查询前载入其他进程新写入的条目
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain.schema import Document
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('crag')
+
+
+# 股票代码：A股6位数字、港股 4-5 位数字 + .HK、美股 1-5 位大写字母（可带交易所后缀）
+_TICKER_PATTERN = re.compile(
+    r"(?<![A-Za-z0-9.])(?:\d{6}(?:\.(?:SH|SZ|BJ))?|\d{4,5}\.HK|[A-Z]{1,5}(?:\.[A-Z]{1,2})?)(?![A-Za-z0-9.])"
+)
+# 公司名：以常见机构后缀结尾的中文名称
+_COMPANY_PATTERN = re.compile(
+    r"[\u4e00-\u9fa5A-Za-z]{2,20}?(?:股份有限公司|有限责任公司|有限公司|集团|控股|股份|银行|证券|保险|科技|公司)"
+)
+# 报告期：年份、季度、半年、月份
+_PERIOD_PATTERN = re.compile(
+    r"(?:19|20)\d{2}\s*(?:年|FY|财年)?(?:\s*(?:[一二三四1-4]季度|Q[1-4]|[上下]半年|中报|年报|年度|\d{1,2}\s*月))?"
+    r"|Q[1-4]|[一二三四1-4]季度|[上下]半年|中报|年报|TTM",
+    re.IGNORECASE,
+)
+# 数值（去掉千分位）
+_NUMBER_PATTERN = re.compile(r"\d+(?:,\d{3})*(?:\.\d+)?")
+
+
+def extract_entity_key(question: str) -> str:
+    """
+    提取问题中的实体（股票代码、公司名、报告期、数值），组成缓存匹配键
+
+    同一组实体（顺序无关）得到同一个键；不含任何实体的问题得到空字符串
+    """
+    text = str(question)
+    entities = {
+        "ticker": _TICKER_PATTERN.findall(text),
+        "company": _COMPANY_PATTERN.findall(text),
+        "period": [re.sub(r"\s+", "", p).upper() for p in _PERIOD_PATTERN.findall(text)],
+        "number": [n.replace(",", "") for n in _NUMBER_PATTERN.findall(text)],
+    }
+    return json.dumps({k: sorted(set(v)) for k, v in entities.items() if v}, ensure_ascii=False, sort_keys=True)
+
+
+class SemanticAnswerCache:
+    """基于问题向量相似度的答案缓存"""
+
+    def __init__(
+        self,
+        db_path: Path,
+        embedding,
+        scope: str,
+        threshold: float = 0.95,
+        ttl_seconds: int = 24 * 3600,
+        max_entries: int = 2000,
+    ):
+        """
+        初始化语义缓存
+
+        Args:
+            db_path: SQLite 文件路径
+            embedding: LangChain Embeddings 实例，用于向量化问题
+            scope: 缓存作用域（集合名 + 模型），不同作用域互不可见
+            threshold: 命中所需的最小余弦相似度
+            ttl_seconds: 答案的新鲜度期限
+            max_entries: 作用域内最多保留的条目数，超出时淘汰最旧的条目
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.embedding = embedding
+        self.scope = scope
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS semantic_answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                scope TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                question TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                generation TEXT NOT NULL,
+                documents TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                entity_key TEXT
+            )
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(semantic_answers)")}
+        if "entity_key" not in columns:
+            # 旧版本写入的条目没有实体键（NULL），不会再被命中，过期后清理
+            self._conn.execute("ALTER TABLE semantic_answers ADD COLUMN entity_key TEXT")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_semantic_scope ON semantic_answers (scope, fingerprint)"
+        )
+        self._conn.commit()
+
+        # 内存中只保存当前 (索引指纹, 向量维度) 的条目
+        self._loaded: Optional[Tuple[str, int]] = None
+        self._ids: List[int] = []
+        self._created_at: List[float] = []
+        self._entity_keys: List[str] = []
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    # 内部工具
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    @staticmethod
+    def _serialize_documents(documents) -> str:
+        return json.dumps(
+            [
+                {"page_content": d.page_content, "metadata": dict(d.metadata)}
+                if isinstance(d, Document) else {"page_content": str(d), "metadata": {}}
+                for d in documents or []
+            ],
+            ensure_ascii=False,
+            default=str,
+        )
+
+    @staticmethod
+    def _deserialize_documents(raw: str) -> List[Document]:
+        return [Document(page_content=d["page_content"], metadata=d["metadata"]) for d in json.loads(raw)]
+
+    def _select(self, fingerprint: str, dim: int, after_id: int = 0):
+        """读取指定索引指纹与向量维度的条目；其他指纹（其他进程的索引版本）或嵌入模型的条目只是不读取"""
+        return self._conn.execute(
+            "SELECT id, embedding, created_at, entity_key FROM semantic_answers "
+            "WHERE scope = ? AND fingerprint = ? AND length(embedding) = ? AND entity_key IS NOT NULL AND id > ? "
+            "ORDER BY id",
+            (self.scope, fingerprint, dim * 4, after_id),
+        ).fetchall()
+
+    def _load(self, fingerprint: str, dim: int):
+        """加载某个索引指纹下的向量矩阵，并清理整个作用域中过期的条目"""
+        self._conn.execute(
+            "DELETE FROM semantic_answers WHERE scope = ? AND created_at < ?",
+            (self.scope, time.time() - self.ttl_seconds),
+        )
+        self._conn.commit()
+
+        self._ids, self._created_at, self._entity_keys = [], [], []
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+        self._loaded = (fingerprint, dim)
+        self._append_rows(self._select(fingerprint, dim))
+
+    def _append_rows(self, rows):
+        if not rows:
+            return
+        self._ids.extend(row[0] for row in rows)
+        self._created_at.extend(row[2] for row in rows)
+        self._entity_keys.extend(row[3] for row in rows)
+        self._matrix = np.vstack([self._matrix] + [np.frombuffer(row[1], dtype=np.float32) for row in rows])
+
+    def _ensure_loaded(self, fingerprint: str, dim: int):
+        if self._loaded != (fingerprint, dim):
+            self._load(fingerprint, dim)
+            return
+        # 载入其他进程在本进程加载之后写入的条目
+        self._append_rows(self._select(fingerprint, dim, self._ids[-1] if self._ids else 0))
+
+    # ------------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------------
+
+    def embed(self, question: str) -> np.ndarray:
+        return self._normalize(self.embedding.embed_query(question))
+
+    def lookup(self, question_vector: np.ndarray, fingerprint: str, entity_key: str) -> Optional[Dict[str, Any]]:
+        """
+        查找相似问题的缓存答案
+
+        Args:
+            question_vector: 归一化的问题向量
+            fingerprint: 文档索引指纹
+            entity_key: extract_entity_key 得到的实体键，必须与缓存条目完全相同
+
+        Returns:
+            命中时返回 {"question", "generation", "documents", "similarity"}，否则 None
+        """
+        with self._lock:
+            self._ensure_loaded(fingerprint, question_vector.shape[0])
+
+            if not self._ids:
+                self.misses += 1
+                return None
+
+            similarities = self._matrix @ question_vector
+            # 过期条目和实体不同的条目不参与匹配
+            expired = np.asarray(self._created_at) < time.time() - self.ttl_seconds
+            other_entities = np.asarray(self._entity_keys, dtype=object) != entity_key
+            similarities[expired | other_entities] = -1.0
+
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            row = self._conn.execute(
+                "SELECT question, generation, documents FROM semantic_answers WHERE id = ?",
+                (self._ids[best],),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return {
+                "question": row[0],
+                "generation": row[1],
+                "documents": self._deserialize_documents(row[2]),
+                "similarity": similarity,
+            }
+
+    def store(self, question: str, question_vector: np.ndarray, fingerprint: str, entity_key: str,
+              generation: str, documents):
+        """写入一条答案"""
+        try:
+            with self._lock:
+                self._ensure_loaded(fingerprint, question_vector.shape[0])
+
+                now = time.time()
+                cursor = self._conn.execute(
+                    "INSERT INTO semantic_answers "
+                    "(scope, fingerprint, question, embedding, generation, documents, created_at, entity_key) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        self.scope,
+                        fingerprint,
+                        question,
+                        question_vector.astype(np.float32).tobytes(),
+                        generation,
+                        self._serialize_documents(documents),
+                        now,
+                        entity_key,
+                    ),
+                )
+                self._ids.append(cursor.lastrowid)
+                self._created_at.append(now)
+                self._entity_keys.append(entity_key)
+                self._matrix = np.vstack([self._matrix, question_vector.astype(np.float32)[np.newaxis, :]])
+
+                overflow = len(self._ids) - self.max_entries
+                if overflow > 0:
+                    self._conn.executemany(
+                        "DELETE FROM semantic_answers WHERE id = ?", [(i,) for i in self._ids[:overflow]]
+                    )
+                    self._ids = self._ids[overflow:]
+                    self._created_at = self._created_at[overflow:]
+                    self._entity_keys = self._entity_keys[overflow:]
+                    self._matrix = self._matrix[overflow:]
+                self._conn.commit()
+        except Exception as e:
+            # 缓存写入失败不影响主流程
+            logger.warning(f"⚠️ [语义缓存] 写入失败: {e}")
+
+    def invalidate(self):
+        """清空当前作用域的全部答案"""
+        with self._lock:
+            self._conn.execute("DELETE FROM semantic_answers WHERE scope = ?", (self.scope,))
+            self._conn.commit()
+            self._loaded = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._ids),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
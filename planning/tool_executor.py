@@ -11,7 +11,7 @@ import os
 from decimal import Decimal
 from fastmcp import Client as McpClient
 import dashscope
-from web.utils.analysis_runner import run_stock_analysis
+from web.utils.analysis_runner import run_batch_stock_analysis, format_stock_analysis_report
 import streamlit as st
 
 
@@ -26,6 +26,8 @@ class ToolExecutor:
             '机构经营情况分析工具': self.deposit_analyze
             # 在这里添加新工具，格式: '工具名称': 执行方法
         }
+        # 批量分析股票时的并发数
+        self.max_concurrency = int(os.getenv("TRADINGAGENTS_BATCH_CONCURRENCY", "4"))
 
     def get_available_tools(self):
         """获取所有可用工具的列表"""
@@ -179,52 +181,31 @@ class ToolExecutor:
         llm_provider = st.session_state.llm_config.get('llm_provider', 'dashscope')
         llm_model = st.session_state.llm_config.get('llm_model', 'qwen-plus')
 
-        all_analysis = []
         total = len(stock_symbols)
+        analyses = {}
 
-        for i, code in enumerate(stock_symbols, 1):
-            # 进度反馈
-            if progress_callback:
-                progress = i / total
-                progress_callback(f"正在分析股票 {code}（{i}/{total}）", progress)
-
-            try:
-                # 执行股票分析
-                analysis_result = run_stock_analysis(
-                    stock_symbol=code,
+        # 共用一个分析引擎并发分析，按完成顺序反馈进度
+        try:
+            for analysis_result in run_batch_stock_analysis(
+                    stock_symbols=stock_symbols,
                     analysis_date=str(datetime.date.today()),
                     analysts=['fundamentals'],
                     research_depth=1,
                     llm_provider=llm_provider,
                     llm_model=llm_model,
                     market_type='A股',
-                )
-            except Exception as e:
-                all_analysis.append(f"### 个股分析: {code}\n分析失败：{str(e)}")
-                continue
-
-            # 处理分析结果
-            raw_reports = []
-            if 'state' in analysis_result:
-                state = analysis_result['state']
-                report_types = [
-                    'market_report', 'fundamentals_report',
-                    'sentiment_report', 'news_report',
-                ]
-                for report_type in report_types:
-                    if report_type in state:
-                        raw_reports.append(
-                            f"#### {report_type.replace('_', ' ').title()}\n{state[report_type]}")
-
-            # 添加决策推理
-            decision_reasoning = ""
-            if 'decision' in analysis_result and 'reasoning' in analysis_result['decision']:
-                decision_reasoning = f"#### 核心决策结论\n{analysis_result['decision']['reasoning']}"
-
-            # 整合报告
-            full_raw_report = "\n\n".join(raw_reports + [decision_reasoning])
-            all_analysis.append(
-                f"### 个股分析: {code}\n{full_raw_report if full_raw_report else '无分析结果'}")
+                    max_concurrency=self.max_concurrency,
+            ):
+                code = analysis_result['stock_symbol']
+                analyses[code] = format_stock_analysis_report(code, analysis_result)
+                if progress_callback:
+                    progress_callback(f"已完成股票 {code}（{len(analyses)}/{total}）", len(analyses) / total)
+        except Exception as e:
+            for code in stock_symbols:
+                analyses.setdefault(code, f"### 个股分析: {code}\n分析失败：{str(e)}")
+
+        # 按输入顺序整合报告
+        all_analysis = [analyses[code] for code in dict.fromkeys(stock_symbols) if code in analyses]
 
         return "\n\n".join(all_analysis)
 
@@ -9,7 +9,7 @@ from typing import List, Optional, Dict, Callable, Any
 from decimal import Decimal
 from fastmcp import Client as McpClient
 import dashscope
-from web.utils.analysis_runner import run_stock_analysis
+from web.utils.analysis_runner import run_batch_stock_analysis, format_stock_analysis_report
 import streamlit as st
 import akshare as ak
 import time
@@ -55,6 +55,8 @@ class ToolExecutor:
         }
 
         # MCP相关配置
+        # 批量分析（个股/基金）时的并发数
+        self.max_concurrency = int(os.getenv("TRADINGAGENTS_BATCH_CONCURRENCY", "4"))
         self.mcp_server_urls = self._load_mcp_server_urls()  # 所有MCP服务器URL列表
         self.mcp_tools = {}  # 存储MCP工具信息，包含来源URL
         self.available_mcp_urls = []  # 可用的MCP服务器URL
@@ -395,41 +397,28 @@ class ToolExecutor:
         llm_provider = st.session_state.llm_config.get('llm_provider', 'dashscope')
         llm_model = st.session_state.llm_config.get('llm_model', 'qwen-plus')
 
-        all_analysis = []
-        for code in stock_symbols:
-            try:
-                analysis_result = run_stock_analysis(
-                    stock_symbol=code,
+        analyses = {}
+
+        # 共用一个分析引擎并发分析
+        try:
+            for analysis_result in run_batch_stock_analysis(
+                    stock_symbols=stock_symbols,
                     analysis_date=str(datetime.date.today()),
                     analysts=['fundamentals'],
                     research_depth=1,
                     llm_provider=llm_provider,
                     llm_model=llm_model,
                     market_type='A股',
-                )
-            except Exception as e:
-                all_analysis.append(f"### 个股分析: {code}\n分析失败：{str(e)}")
-                continue
+                    max_concurrency=self.max_concurrency,
+            ):
+                code = analysis_result['stock_symbol']
+                analyses[code] = format_stock_analysis_report(code, analysis_result)
+        except Exception as e:
+            for code in stock_symbols:
+                analyses.setdefault(code, f"### 个股分析: {code}\n分析失败：{str(e)}")
 
-            raw_reports = []
-            if 'state' in analysis_result:
-                state = analysis_result['state']
-                report_types = [
-                    'market_report', 'fundamentals_report',
-                    'sentiment_report', 'news_report',
-                ]
-                for report_type in report_types:
-                    if report_type in state:
-                        raw_reports.append(
-                            f"#### {report_type.replace('_', ' ').title()}\n{state[report_type]}")
-
-            decision_reasoning = ""
-            if 'decision' in analysis_result and 'reasoning' in analysis_result['decision']:
-                decision_reasoning = f"#### 核心决策结论\n{analysis_result['decision']['reasoning']}"
-
-            full_raw_report = "\n\n".join(raw_reports + [decision_reasoning])
-            all_analysis.append(
-                f"### 个股分析: {code}\n{full_raw_report if full_raw_report else '无分析结果'}")
+        # 按输入顺序整合报告
+        all_analysis = [analyses[code] for code in dict.fromkeys(stock_symbols) if code in analyses]
 
         return "\n\n".join(all_analysis)
 
@@ -643,19 +632,20 @@ class ToolExecutor:
         Returns:
             整合后的基金分析报告，包含每只基金的市场、基本面等分析内容。
         """
-        all_analysis = []
+        from concurrent.futures import ThreadPoolExecutor
 
-        for i, code in enumerate(fund_symbols, 1):
+        def analyze(code):
             try:
                 # 执行基金分析
                 analysis_result = self._run_fund_analysis(
                     fund_symbol=code)
             except Exception as e:
-                all_analysis.append(f"### 基金分析: {code}\n分析失败：{str(e)}")
-                continue
+                return f"### 基金分析: {code}\n分析失败：{str(e)}"
+            return f"### 基金分析: {code}\n{analysis_result if analysis_result else '无分析结果'}"
 
-            all_analysis.append(
-                f"### 基金分析: {code}\n{analysis_result if analysis_result else '无分析结果'}")
+        # 各基金相互独立，有界并发执行，结果保持输入顺序
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_concurrency, len(fund_symbols) or 1))) as pool:
+            all_analysis = list(pool.map(analyze, fund_symbols))
 
         return "\n\n".join(all_analysis)
 
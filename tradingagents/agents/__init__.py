@@ -1,6 +1,7 @@
 from .utils.agent_utils import Toolkit, create_msg_delete
 from .utils.agent_states import AgentState, InvestDebateState, RiskDebateState
 from .utils.memory import FinancialSituationMemory
+from .utils.debate_compaction import DebateHistoryCompactor
 
 from .analysts.fundamentals_analyst import create_fundamentals_analyst
 from .analysts.market_analyst import create_market_analyst
@@ -25,6 +26,7 @@ logger = get_logger("default")
 
 __all__ = [
     "FinancialSituationMemory",
+    "DebateHistoryCompactor",
     "Toolkit",
     "AgentState",
     "create_msg_delete",
@@ -8,11 +8,16 @@ from langchain_core.messages import AIMessage
 
 # 导入分析模块日志装饰器
 from tradingagents.utils.tool_logging import log_analyst_module
+from tradingagents.dataflows.run_data_context import default_start_date
 
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
 logger = get_logger("default")
 
+# 基本面分析参考的行情时长（天）：估值需要比市场分析（预获取的30天）更长的价格区间，
+# 因此不使用预获取的行情，由基本面工具自行获取
+FUNDAMENTALS_PERIOD_DAYS = 90
+
 
 def _get_company_name_for_fundamentals(ticker: str, market_info: dict) -> str:
     """
@@ -26,6 +31,14 @@ def _get_company_name_for_fundamentals(ticker: str, market_info: dict) -> str:
         str: 公司名称
     """
     try:
+        if market_info['is_china'] or market_info['is_hk']:
+            # 分析前的数据预获取已经解析过名称时直接使用
+            from tradingagents.dataflows.run_data_context import get_run_data_context
+            prefetched_name = get_run_data_context().get_stock_name(ticker)
+            if prefetched_name:
+                logger.debug(f"📊 [基本面分析师] 使用预获取的股票名称: {ticker} -> {prefetched_name}")
+                return prefetched_name
+
         if market_info['is_china']:
             # 中国A股：使用统一接口获取股票信息
             from tradingagents.dataflows.interface import get_china_stock_info_unified
@@ -85,7 +98,7 @@ def create_fundamentals_analyst(llm, toolkit):
 
         current_date = state["trade_date"]
         ticker = state["company_of_interest"]
-        start_date = '2025-05-28'
+        start_date = default_start_date(current_date, FUNDAMENTALS_PERIOD_DAYS)
 
         logger.debug(f"📊 [DEBUG] 输入参数: ticker={ticker}, date={current_date}")
         logger.debug(f"📊 [DEBUG] 当前状态中的消息数量: {len(state.get('messages', []))}")
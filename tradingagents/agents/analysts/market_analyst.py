@@ -7,6 +7,7 @@ import traceback
 
 # 导入分析模块日志装饰器
 from tradingagents.utils.tool_logging import log_analyst_module
+from tradingagents.dataflows.run_data_context import default_start_date
 
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
@@ -25,6 +26,14 @@ def _get_company_name(ticker: str, market_info: dict) -> str:
         str: 公司名称
     """
     try:
+        if market_info['is_china'] or market_info['is_hk']:
+            # 分析前的数据预获取已经解析过名称时直接使用
+            from tradingagents.dataflows.run_data_context import get_run_data_context
+            prefetched_name = get_run_data_context().get_stock_name(ticker)
+            if prefetched_name:
+                logger.debug(f"📊 [DEBUG] 使用预获取的股票名称: {ticker} -> {prefetched_name}")
+                return prefetched_name
+
         if market_info['is_china']:
             # 中国A股：使用统一接口获取股票信息
             from tradingagents.dataflows.interface import get_china_stock_info_unified
@@ -85,6 +94,8 @@ def create_market_analyst_react(llm, toolkit):
 
         current_date = state["trade_date"]
         ticker = state["company_of_interest"]
+        # 与分析前预获取的行情区间一致，工具可直接使用预获取的数据
+        start_date = default_start_date(current_date)
 
         logger.debug(f"📈 [DEBUG] 输入参数: ticker={ticker}, date={current_date}")
 
@@ -115,7 +126,7 @@ def create_market_analyst_react(llm, toolkit):
                             from tradingagents.dataflows.optimized_china_data import get_china_stock_data_cached
                             return get_china_stock_data_cached(
                                 symbol=ticker,
-                                start_date='2025-05-28',
+                                start_date=start_date,
                                 end_date=current_date,
                                 force_refresh=False
                             )
@@ -125,7 +136,7 @@ def create_market_analyst_react(llm, toolkit):
                             try:
                                 return toolkit.get_china_stock_data.invoke({
                                     'stock_code': ticker,
-                                    'start_date': '2025-05-28',
+                                    'start_date': start_date,
                                     'end_date': current_date
                                 })
                             except Exception as e2:
@@ -169,7 +180,7 @@ def create_market_analyst_react(llm, toolkit):
                             from tradingagents.dataflows.optimized_us_data import get_us_stock_data_cached
                             return get_us_stock_data_cached(
                                 symbol=ticker,
-                                start_date='2025-05-28',
+                                start_date=start_date,
                                 end_date=current_date,
                                 force_refresh=False
                             )
@@ -179,7 +190,7 @@ def create_market_analyst_react(llm, toolkit):
                             try:
                                 return toolkit.get_YFin_data_online.invoke({
                                     'symbol': ticker,
-                                    'start_date': '2025-05-28',
+                                    'start_date': start_date,
                                     'end_date': current_date
                                 })
                             except Exception as e2:
@@ -194,7 +205,7 @@ def create_market_analyst_react(llm, toolkit):
                             logger.debug(f"📈 [DEBUG] FinnhubNewsTool调用，股票代码: {ticker}")
                             return toolkit.get_finnhub_news.invoke({
                                 'ticker': ticker,
-                                'start_date': '2025-05-28',
+                                'start_date': start_date,
                                 'end_date': current_date
                             })
                         except Exception as e:
@@ -267,6 +278,8 @@ def create_market_analyst(llm, toolkit):
 
         current_date = state["trade_date"]
         ticker = state["company_of_interest"]
+        # 与分析前预获取的行情区间一致，工具可直接使用预获取的数据
+        start_date = default_start_date(current_date)
 
         logger.debug(f"📈 [DEBUG] 输入参数: ticker={ticker}, date={current_date}")
         logger.debug(f"📈 [DEBUG] 当前状态中的消息数量: {len(state.get('messages', []))}")
@@ -316,6 +329,7 @@ def create_market_analyst(llm, toolkit):
 
 **工具调用指令：**
 你有一个工具叫做get_stock_market_data_unified，你必须立即调用这个工具来获取{company_name}（{ticker}）的市场数据。
+参数：ticker='{ticker}', start_date='{start_date}', end_date='{current_date}'
 不要说你将要调用工具，直接调用工具。
 
 **分析要求：**
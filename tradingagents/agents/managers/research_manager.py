@@ -1,12 +1,14 @@
 import time
 import json
 
+from tradingagents.agents.utils.research_brief import format_research_context
+
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
 logger = get_logger("default")
 
 
-def create_research_manager(llm, memory):
+def create_research_manager(llm, memory, use_raw_reports=False):
     def research_manager_node(state) -> dict:
         history = state["investment_debate_state"].get("history", "")
         market_research_report = state["market_report"]
@@ -52,14 +54,8 @@ def create_research_manager(llm, memory):
 以下是您对错误的过去反思：
 \"{past_memory_str}\"
 
-以下是综合分析报告：
-市场研究：{market_research_report}
-
-情绪分析：{sentiment_report}
-
-新闻分析：{news_report}
-
-基本面分析：{fundamentals_report}
+以下是综合分析资料：
+{format_research_context(state, use_raw_reports)}
 
 以下是辩论：
 辩论历史：
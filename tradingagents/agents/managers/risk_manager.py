@@ -1,6 +1,8 @@
 import time
 import json
 
+from tradingagents.agents.utils.decision_trailer import DECISION_TRAILER_TAG, split_decision_trailer
+
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
 logger = get_logger("default")
@@ -51,12 +53,17 @@ def create_risk_manager(llm, memory):
 
 ---
 
-专注于可操作的见解和持续改进。建立在过去经验教训的基础上，批判性地评估所有观点，确保每个决策都能带来更好的结果。请用中文撰写所有分析内容和建议。"""
+专注于可操作的见解和持续改进。建立在过去经验教训的基础上，批判性地评估所有观点，确保每个决策都能带来更好的结果。请用中文撰写所有分析内容和建议。
+
+在回答的最后单独输出一行决策摘要（单行JSON，不要放在代码块中），格式如下：
+{DECISION_TRAILER_TAG} {{"action": "买入/持有/卖出", "target_price": 目标价数字, "confidence": 0-1之间的数字, "risk_score": 0-1之间的数字, "reasoning": "一句话决策理由"}}"""
 
         response = llm.invoke(prompt)
+        # 决策摘要行只供信号处理使用，单独保存，展示和保存的决策正文中不包含
+        decision, decision_summary = split_decision_trailer(response.content)
 
         new_risk_debate_state = {
-            "judge_decision": response.content,
+            "judge_decision": decision,
             "history": risk_debate_state["history"],
             "risky_history": risk_debate_state["risky_history"],
             "safe_history": risk_debate_state["safe_history"],
@@ -70,7 +77,8 @@ def create_risk_manager(llm, memory):
 
         return {
             "risk_debate_state": new_risk_debate_state,
-            "final_trade_decision": response.content,
+            "final_trade_decision": decision,
+            "final_decision_summary": decision_summary or {},
         }
 
     return risk_manager_node
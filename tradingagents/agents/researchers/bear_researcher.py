@@ -2,12 +2,15 @@ from langchain_core.messages import AIMessage
 import time
 import json
 
+from tradingagents.agents.utils.debate_compaction import compact_history
+from tradingagents.agents.utils.research_brief import format_research_context
+
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
 logger = get_logger("default")
 
 
-def create_bear_researcher(llm, memory):
+def create_bear_researcher(llm, memory, compactor=None, use_raw_reports=False):
     def bear_node(state) -> dict:
         investment_debate_state = state["investment_debate_state"]
         history = investment_debate_state.get("history", "")
@@ -59,11 +62,8 @@ def create_bear_researcher(llm, memory):
 
 可用资源：
 
-市场研究报告：{market_research_report}
-社交媒体情绪报告：{sentiment_report}
-最新世界事务新闻：{news_report}
-公司基本面报告：{fundamentals_report}
-辩论对话历史：{history}
+{format_research_context(state, use_raw_reports)}
+辩论对话历史：{compact_history(compactor, history)}
 最后的看涨论点：{current_response}
 类似情况的反思和经验教训：{past_memory_str}
 
@@ -51,9 +51,17 @@ class RiskDebateState(TypedDict):
     count: Annotated[int, "Length of the current conversation"]  # Conversation length
 
 
+def merge_round_responses(left: Optional[dict], right: Optional[dict]) -> dict:
+    """Reducer for concurrent risk-debate replies; an update of None clears the round."""
+    if right is None:
+        return {}
+    return {**(left or {}), **right}
+
+
 class AgentState(MessagesState):
     company_of_interest: Annotated[str, "Company that we are interested in trading"]
     trade_date: Annotated[str, "What date we are trading at"]
+    run_fingerprint: Annotated[str, "Analysts/config fingerprint of the graph that started this run"]
 
     sender: Annotated[str, "Agent that sent this message"]
 
@@ -64,6 +72,7 @@ class AgentState(MessagesState):
         str, "Report from the News Researcher of current world affairs"
     ]
     fundamentals_report: Annotated[str, "Report from the Fundamentals Researcher"]
+    research_brief: Annotated[str, "Condensed brief of the analyst reports, shared by downstream agents"]
 
     # researcher team discussion step
     investment_debate_state: Annotated[
@@ -78,3 +87,7 @@ class AgentState(MessagesState):
         RiskDebateState, "Current state of the debate on evaluating risk"
     ]
     final_trade_decision: Annotated[str, "Final decision made by the Risk Analysts"]
+    final_decision_summary: Annotated[dict, "Structured decision line parsed from the Risk Manager's answer"]
+
+    # replies of the current round in round-synchronous risk debate mode, merged by the join node
+    risk_round_responses: Annotated[dict, merge_round_responses]
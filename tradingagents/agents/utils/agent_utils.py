@@ -779,10 +779,14 @@ class Toolkit:
                 logger.info(f"🔍 [股票代码追踪] 进入A股处理分支，ticker: '{ticker}'")
 
                 try:
-                    # 获取股票价格数据
+                    # 获取股票价格数据（优先使用分析前预获取的数据）
                     from tradingagents.dataflows.interface import get_china_stock_data_unified
-                    logger.info(f"🔍 [股票代码追踪] 调用 get_china_stock_data_unified，传入参数: ticker='{ticker}', start_date='{start_date}', end_date='{end_date}'")
-                    stock_data = get_china_stock_data_unified(ticker, start_date, end_date)
+                    from tradingagents.dataflows.run_data_context import get_run_data_context
+                    stock_data = get_run_data_context().get_price_data(
+                        ticker, start_date, end_date, source="get_china_stock_data_unified")
+                    if stock_data is None:
+                        logger.info(f"🔍 [股票代码追踪] 调用 get_china_stock_data_unified，传入参数: ticker='{ticker}', start_date='{start_date}', end_date='{end_date}'")
+                        stock_data = get_china_stock_data_unified(ticker, start_date, end_date)
                     logger.info(f"🔍 [股票代码追踪] get_china_stock_data_unified 返回结果前200字符: {stock_data[:200] if stock_data else 'None'}")
                     result_data.append(f"## A股价格数据\n{stock_data}")
                 except Exception as e:
@@ -810,7 +814,11 @@ class Toolkit:
                 # 主要数据源：AKShare
                 try:
                     from tradingagents.dataflows.interface import get_hk_stock_data_unified
-                    hk_data = get_hk_stock_data_unified(ticker, start_date, end_date)
+                    from tradingagents.dataflows.run_data_context import get_run_data_context
+                    hk_data = get_run_data_context().get_price_data(
+                        ticker, start_date, end_date, source="get_hk_stock_data_unified")
+                    if hk_data is None:
+                        hk_data = get_hk_stock_data_unified(ticker, start_date, end_date)
 
                     # 检查数据质量
                     if hk_data and len(hk_data) > 100 and "❌" not in hk_data:
@@ -827,7 +835,10 @@ class Toolkit:
                 if not hk_data_success:
                     try:
                         from tradingagents.dataflows.interface import get_hk_stock_info_unified
-                        hk_info = get_hk_stock_info_unified(ticker)
+                        from tradingagents.dataflows.run_data_context import get_run_data_context
+                        hk_info = get_run_data_context().get_stock_info(ticker)
+                        if not isinstance(hk_info, dict):
+                            hk_info = get_hk_stock_info_unified(ticker)
 
                         basic_info = f"""## 港股基础信息
 
@@ -935,13 +946,23 @@ class Toolkit:
 
             result_data = []
 
+            # 分析前的数据预获取已经用同一数据接口下载过同一区间的行情时直接使用
+            # （美股预获取使用的接口与本工具不同、输出格式不一致，不交接行情）
+            from tradingagents.dataflows.run_data_context import get_run_data_context
+            source = (
+                "get_china_stock_data_unified" if is_china
+                else "get_hk_stock_data_unified" if is_hk
+                else "get_YFin_data_online"
+            )
+            prefetched = get_run_data_context().get_price_data(ticker, start_date, end_date, source=source)
+
             if is_china:
                 # 中国A股：使用中国股票数据源
                 logger.info(f"🇨🇳 [统一市场工具] 处理A股市场数据...")
 
                 try:
                     from tradingagents.dataflows.interface import get_china_stock_data_unified
-                    stock_data = get_china_stock_data_unified(ticker, start_date, end_date)
+                    stock_data = prefetched if prefetched is not None else get_china_stock_data_unified(ticker, start_date, end_date)
                     result_data.append(f"## A股市场数据\n{stock_data}")
                 except Exception as e:
                     result_data.append(f"## A股市场数据\n获取失败: {e}")
@@ -952,7 +973,7 @@ class Toolkit:
 
                 try:
                     from tradingagents.dataflows.interface import get_hk_stock_data_unified
-                    hk_data = get_hk_stock_data_unified(ticker, start_date, end_date)
+                    hk_data = prefetched if prefetched is not None else get_hk_stock_data_unified(ticker, start_date, end_date)
                     result_data.append(f"## 港股市场数据\n{hk_data}")
                 except Exception as e:
                     result_data.append(f"## 港股市场数据\n获取失败: {e}")
@@ -963,7 +984,7 @@ class Toolkit:
 
                 try:
                     from tradingagents.dataflows.interface import get_YFin_data_online
-                    us_data = get_YFin_data_online(ticker, start_date, end_date)
+                    us_data = prefetched if prefetched is not None else get_YFin_data_online(ticker, start_date, end_date)
                     result_data.append(f"## 美股市场数据\n{us_data}")
                 except Exception as e:
                     result_data.append(f"## 美股市场数据\n获取失败: {e}")
@@ -0,0 +1,149 @@
+"""
+辩论历史压缩
+辩论历史是不断拼接的字符串，每一轮发言都会把完整历史再发给LLM，提示词随轮数平方增长。
+超出token预算时，保留最近若干条发言原文，更早的发言滚动合并为摘要；
+摘要按已摘要的发言前缀缓存，每次只把新滑出窗口的发言并入上一份摘要。
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+# 导入统一日志系统
+from tradingagents.utils.logging_init import get_logger
+logger = get_logger("agents.utils.debate_compaction")
+
+# 各辩手发言的前缀（见 researchers/ 与 risk_mgmt/）
+_TURN_PATTERN = re.compile(r"\n(?=(?:Bull|Bear|Risky|Safe|Neutral) Analyst: )")
+_CJK_PATTERN = re.compile(r"[\u3000-\u303f\u4e00-\u9fff\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算token数：中文约每字1个token，其他字符约每4个1个token"""
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def split_turns(history: str) -> List[str]:
+    """把辩论历史拆成单条发言"""
+    return [turn for turn in _TURN_PATTERN.split(history) if turn.strip()]
+
+
+class DebateHistoryCompactor:
+    """在token预算内构造发给辩手的辩论历史"""
+
+    def __init__(self, llm, token_budget: int = 3000, keep_last_turns: int = 3, max_cached: int = 256):
+        """
+        Args:
+            llm: 生成摘要的模型（使用快速模型）
+            token_budget: 辩论历史部分的token预算，0为不压缩
+            keep_last_turns: 始终保留原文的最近发言条数
+            max_cached: 缓存的摘要数量
+        """
+        self.llm = llm
+        self.token_budget = token_budget
+        self.keep_last_turns = max(1, keep_last_turns)
+        self.max_cached = max_cached
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(turns: List[str]) -> str:
+        return hashlib.sha1("\n".join(turns).encode("utf-8")).hexdigest()
+
+    def _cached(self, key: str) -> Optional[str]:
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is not None:
+                self._summaries.move_to_end(key)
+            return summary
+
+    def _latest_prefix(self, turns: List[str]) -> Tuple[int, str]:
+        """找到已摘要过的最长发言前缀，返回 (前缀长度, 摘要)"""
+        for size in range(len(turns) - 1, 0, -1):
+            summary = self._cached(self._key(turns[:size]))
+            if summary is not None:
+                return size, summary
+        return 0, ""
+
+    def _summarize(self, previous_summary: str, new_turns: List[str]) -> str:
+        target = max(200, self.token_budget // 3)
+        prompt = f"""请把以下辩论内容更新为一份简洁的中文摘要，供后续辩手参考。
+
+要求：
+- 按发言方归纳各自的核心论点、引用的关键数据和对对方的主要反驳
+- 保留具体数字、价格和结论，删除重复和修辞
+- 摘要不超过约{target} tokens（中文约每字1个token，英文约每4个字符1个token），只输出摘要本身
+
+已有摘要：
+{previous_summary or "（无）"}
+
+新增发言：
+{chr(10).join(new_turns)}
+"""
+        try:
+            return self.llm.invoke(prompt).content.strip()
+        except Exception as e:
+            # 摘要失败时退化为截取较早发言的结尾部分，保证提示词仍在预算内
+            logger.warning(f"⚠️ [辩论压缩] 生成摘要失败，改为截断: {e}")
+            text = "\n".join(([previous_summary] if previous_summary else []) + new_turns)
+            return text[-target * 2:]
+
+    def _summary_for(self, turns: List[str]) -> str:
+        key = self._key(turns)
+        while True:
+            with self._lock:
+                summary = self._summaries.get(key)
+                if summary is not None:
+                    self._summaries.move_to_end(key)
+                    return summary
+                event = self._inflight.get(key)
+                if event is None:
+                    # 并行的风险辩手会同时压缩同一段历史，只生成一次
+                    event = threading.Event()
+                    self._inflight[key] = event
+                    break
+            event.wait()
+
+        try:
+            size, previous = self._latest_prefix(turns)
+            summary = self._summarize(previous, turns[size:])
+            logger.info(
+                f"🗜️ [辩论压缩] 摘要更新: 新增 {len(turns) - size} 条发言, "
+                f"累计 {len(turns)} 条, 摘要约 {estimate_tokens(summary)} tokens"
+            )
+            with self._lock:
+                self._summaries[key] = summary
+                while len(self._summaries) > self.max_cached:
+                    self._summaries.popitem(last=False)
+            return summary
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def compact(self, history: str) -> str:
+        """返回发给辩手的辩论历史：未超预算时原样返回"""
+        if not self.token_budget or estimate_tokens(history) <= self.token_budget:
+            return history
+
+        turns = split_turns(history)
+        if len(turns) <= self.keep_last_turns:
+            return history
+
+        older, recent = turns[:-self.keep_last_turns], turns[-self.keep_last_turns:]
+        summary = self._summary_for(older)
+        return (
+            f"【早期辩论摘要（共{len(older)}条发言）】\n{summary}\n\n"
+            f"【最近发言】\n" + "\n".join(recent)
+        )
+
+
+def compact_history(compactor: Optional[DebateHistoryCompactor], history: str) -> str:
+    """未配置压缩器时原样返回"""
+    return compactor.compact(history) if compactor is not None else history
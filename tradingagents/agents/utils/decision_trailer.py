@@ -0,0 +1,46 @@
+"""
+风险经理决策摘要行
+风险经理在最终决策末尾输出一行 `DECISION_JSON: {...}`，信号处理时直接解析，无需再调用LLM提取；
+摘要行在写入状态前从决策正文中移除，不会出现在页面和保存的报告中
+"""
+
+import json
+import re
+from typing import Any, Dict, Optional, Tuple
+
+DECISION_TRAILER_TAG = "DECISION_JSON:"
+
+_TRAILER_PATTERN = re.compile(re.escape(DECISION_TRAILER_TAG) + r"\s*(\{.*?\})\s*(?:`{3})?\s*$", re.DOTALL)
+
+
+def parse_decision_trailer(text: str) -> Optional[Dict[str, Any]]:
+    """解析文本中最后一个决策摘要行，不存在或格式错误时返回 None"""
+    if not text or DECISION_TRAILER_TAG not in text:
+        return None
+    tail = text[text.rindex(DECISION_TRAILER_TAG):]
+    match = _TRAILER_PATTERN.search(tail)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(1))
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def split_decision_trailer(text: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    拆分决策正文和末尾的决策摘要行
+
+    Returns:
+        (去掉摘要行的正文, 解析出的摘要)；没有摘要行时正文原样返回，摘要为 None
+    """
+    if not text or DECISION_TRAILER_TAG not in text:
+        return text, None
+    start = text.rindex(DECISION_TRAILER_TAG)
+    if not _TRAILER_PATTERN.search(text[start:]):
+        # 标记后面还有正文，不是末尾的摘要行
+        return text, None
+    body = re.sub(r"`{3}\w*\s*$", "", text[:start].rstrip()).rstrip()
+    return body, parse_decision_trailer(text)
+
@@ -4,8 +4,28 @@ from openai import OpenAI
 import dashscope
 from dashscope import TextEmbedding
 import os
+import math
+import time
+import atexit
 import threading
-from typing import Dict, Optional
+import weakref
+import hashlib
+import uuid
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from tradingagents.embeddings import (
+    OpenAIEmbeddingBackend,
+    get_dashscope_embedding_service,
+    get_embedding_service,
+    get_local_embedding_service,
+    get_numpy_collection,
+    get_durable_collection,
+)
 
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
@@ -61,7 +81,8 @@ class ChromaDBManager:
             except Exception:
                 try:
                     # 创建新集合
-                    collection = self._client.create_collection(name=name)
+                    # 使用余弦距离，与NumPy索引一致，similarity_score = 1 - distance
+                    collection = self._client.create_collection(name=name, metadata={"hnsw:space": "cosine"})
                     logger.info(f"📚 [ChromaDB] 创建新集合: {name}")
                 except Exception as e:
                     # 可能是并发创建，再次尝试获取
@@ -77,13 +98,106 @@ class ChromaDBManager:
             return collection
 
 
+class EmbeddingMemo:
+    """线程安全的嵌入结果LRU缓存（键为文本哈希）"""
+
+    def __init__(self, max_size: Optional[int] = None):
+        """
+        Args:
+            max_size: 最大条目数，None表示不限（用于单次运行）
+        """
+        self.max_size = max_size
+        self._items: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._items.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, key: str, vector: List[float]):
+        if self.max_size == 0:
+            return
+        with self._lock:
+            self._items[key] = vector
+            self._items.move_to_end(key)
+            if self.max_size is not None:
+                while len(self._items) > self.max_size:
+                    self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+
+# 尚未写回元数据的记忆使用记录 {集合名: {id: (最近命中时间, 新增命中次数)}}，攒够一批后写回集合，
+# 持久集合重启后LRU/时间衰减淘汰仍然有效
+_memory_usage: Dict[str, Dict[str, tuple]] = {}
+_memory_usage_lock = threading.Lock()
+_memory_usage_flushed_at: Dict[str, float] = {}
+_live_memories: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def _flush_all_usage():
+    """进程退出前写回所有集合未落盘的使用记录"""
+    for memory in list(_live_memories):
+        memory.flush_usage()
+
+
+atexit.register(_flush_all_usage)
+
+
+# 单次运行内的嵌入缓存：分析师报告拼接成的同一段situation会被多个记忆集合查询，只需向量化一次
+_run_embedding_memo: contextvars.ContextVar = contextvars.ContextVar("run_embedding_memo", default=None)
+
+# 进程级嵌入缓存（可通过 config["embedding_memo_process_wide"] 关闭）
+_process_embedding_memo = EmbeddingMemo(max_size=int(os.getenv("TRADINGAGENTS_EMBEDDING_MEMO_SIZE", "256")))
+
+
+@contextmanager
+def embedding_memo_scope():
+    """
+    在一次运行（如 propagate 或 reflect_and_remember）内共享嵌入结果
+
+    LangGraph 在线程池中执行节点时会复制上下文，各节点拿到的是同一个缓存对象
+    """
+    current = _run_embedding_memo.get()
+    if current is not None:
+        # 嵌套使用时沿用外层缓存
+        yield current
+        return
+
+    memo = EmbeddingMemo()
+    token = _run_embedding_memo.set(memo)
+    try:
+        yield memo
+    finally:
+        if memo.hits or memo.misses:
+            logger.debug(f"🧮 [记忆] 本次运行嵌入缓存: 命中 {memo.hits}, 未命中 {memo.misses}")
+        _run_embedding_memo.reset(token)
+
+
 class FinancialSituationMemory:
     def __init__(self, name, config):
         self.config = config
+        self.process_memo_enabled = config.get("embedding_memo_process_wide", True)
         self.llm_provider = config.get("llm_provider", "openai").lower()
 
+        self.embedding_provider = str(config.get("embedding_provider", "auto")).lower()
+
         # 根据LLM提供商选择嵌入模型和客户端
-        if self.llm_provider == "dashscope" or self.llm_provider == "alibaba":
+        if self.embedding_provider == "local":
+            # 本地嵌入模型，不依赖远程API，离线环境也可使用记忆功能
+            self.embedding = config.get("local_embedding_model")
+            self.client = None
+            logger.info(f"💡 使用本地嵌入模型: {self.embedding}")
+        elif self.llm_provider == "dashscope" or self.llm_provider == "alibaba":
             self.embedding = "text-embedding-v3"
             self.client = None  # DashScope不需要OpenAI客户端
 
@@ -206,11 +320,126 @@ class FinancialSituationMemory:
             self.embedding = "text-embedding-3-small"
             self.client = OpenAI(base_url=config["backend_url"])
 
-        # 使用单例ChromaDB管理器
-        self.chroma_manager = ChromaDBManager()
-        self.situation_collection = self.chroma_manager.get_or_create_collection(name)
+        # 共享嵌入服务：批量请求 + 按内容哈希持久化，相同文本只向量化一次
+        self.embedding_service = self._create_embedding_service()
+
+        # 容量上限、时间衰减半衰期与检索相似度下限
+        self.name = name
+        self.max_entries = int(config.get("memory_max_entries", 500) or 0)
+        self.half_life_days = float(config.get("memory_half_life_days", 90) or 0)
+        self.min_similarity = float(config.get("memory_min_similarity", 0.0) or 0.0)
+        self.compaction_threshold = float(config.get("memory_compaction_threshold", 0.97))
+        # 超出容量一定比例后才合并与淘汰（避免每次写入都做一次全量合并），使用记录攒够一批再写回
+        self.capacity_slack = float(config.get("memory_capacity_slack", 0.1) or 0.0)
+        self.usage_flush_batch = int(config.get("memory_usage_flush_batch", 20) or 1)
+        _live_memories.add(self)
+
+        # 向量集合：默认使用落盘的持久集合，重启后保留经验；也可选进程内NumPy索引或单例ChromaDB管理器
+        self.memory_backend = str(config.get("memory_backend", "persistent")).lower()
+        if self.memory_backend == "numpy":
+            self.situation_collection = get_numpy_collection(name)
+        elif self.memory_backend == "persistent":
+            memory_dir = config.get("memory_dir") or os.path.join(config.get("data_cache_dir", "."), "memory")
+            self.situation_collection = get_durable_collection(name, memory_dir)
+        else:
+            self.chroma_manager = ChromaDBManager()
+            self.situation_collection = self.chroma_manager.get_or_create_collection(name)
+
+    def _uses_dashscope_embedding(self):
+        if self.embedding_provider == "local":
+            return False
+        return (self.llm_provider == "dashscope" or
+                self.llm_provider == "alibaba" or
+                (self.llm_provider == "google" and self.client is None) or
+                (self.llm_provider == "deepseek" and self.client is None))
+
+    def _create_embedding_service(self):
+        """根据已选定的嵌入提供商创建共享嵌入服务，记忆功能禁用时返回None"""
+        if self.client == "DISABLED":
+            return None
+        try:
+            if self.embedding_provider == "local":
+                return get_local_embedding_service(self.embedding)
+            if self._uses_dashscope_embedding():
+                return get_dashscope_embedding_service(self.embedding)
+            if self.client is not None:
+                return get_embedding_service(OpenAIEmbeddingBackend(self.client, self.embedding))
+        except Exception as e:
+            logger.error(f"❌ 嵌入服务初始化失败: {e}")
+        return None
+
+    def _memo_key(self, text):
+        return hashlib.sha256(
+            f"{self.embedding_provider}\0{self.embedding}\0{text}".encode("utf-8")
+        ).hexdigest()
 
     def get_embedding(self, text):
+        """Get embedding for a text, reusing run-scoped / process-wide memoized results"""
+        return self.get_embeddings([text])[0]
+
+    def _active_memos(self):
+        memos = [_run_embedding_memo.get()]
+        if self.process_memo_enabled:
+            memos.append(_process_embedding_memo)
+        return [m for m in memos if m is not None]
+
+    def get_embeddings(self, texts):
+        """
+        批量获取嵌入：先查缓存，未命中的文本去重后合并为一次提供商调用
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            与 texts 一一对应的向量列表
+        """
+        memos = self._active_memos()
+        vectors = [None] * len(texts)
+        missing = {}
+
+        for idx, text in enumerate(texts):
+            key = self._memo_key(text)
+            for i, memo in enumerate(memos):
+                vector = memo.get(key)
+                if vector is not None:
+                    for other in memos[:i]:
+                        other.put(key, vector)
+                    vectors[idx] = vector
+                    break
+            else:
+                missing.setdefault(key, (text, []))[1].append(idx)
+
+        if missing:
+            computed = self._compute_embeddings([text for text, _ in missing.values()])
+            for (key, (_, positions)), vector in zip(missing.items(), computed):
+                # 失败时返回的零向量不缓存，下次重试
+                if any(x != 0.0 for x in vector):
+                    for memo in memos:
+                        memo.put(key, vector)
+                for idx in positions:
+                    vectors[idx] = vector
+
+        return vectors
+
+    def _compute_embeddings(self, texts):
+        """一次提供商调用向量化多段文本；批量调用失败时逐条调用（沿用逐条的降级逻辑）"""
+        batch_ready = (
+            len(texts) > 1
+            and self.client != "DISABLED"
+            and self.embedding_service is not None
+            and not (self._uses_dashscope_embedding()
+                     and (not hasattr(dashscope, 'api_key') or not dashscope.api_key))
+        )
+        if batch_ready:
+            try:
+                vectors = self.embedding_service.embed_documents(texts)
+                logger.debug(f"✅ 批量embedding成功: {len(texts)} 条")
+                return vectors
+            except Exception as e:
+                logger.warning(f"⚠️ 批量embedding失败，改为逐条调用: {e}")
+        return [self._compute_embedding(text) for text in texts]
+
+    def _compute_embedding(self, text):
         """Get embedding for a text using the configured provider"""
 
         # 检查记忆功能是否被禁用
@@ -219,10 +448,20 @@ class FinancialSituationMemory:
             logger.debug(f"⚠️ 记忆功能已禁用，返回空向量")
             return [0.0] * 1024  # 返回1024维的零向量
 
-        if (self.llm_provider == "dashscope" or
-            self.llm_provider == "alibaba" or
-            (self.llm_provider == "google" and self.client is None) or
-            (self.llm_provider == "deepseek" and self.client is None)):
+        if self.embedding_service is None:
+            logger.warning(f"⚠️ 嵌入服务未初始化，返回空向量")
+            return [0.0] * 1024
+
+        if self.embedding_provider == "local":
+            # 本地嵌入模型，毫秒级且不受网络影响
+            try:
+                return self.embedding_service.embed_query(text)
+            except Exception as e:
+                logger.error(f"❌ 本地embedding异常: {str(e)}")
+                logger.warning(f"⚠️ 记忆功能降级，返回空向量")
+                return [0.0] * 1024
+
+        if self._uses_dashscope_embedding():
             # 使用阿里百炼的嵌入模型
             try:
                 # 检查DashScope API密钥是否可用
@@ -230,23 +469,10 @@ class FinancialSituationMemory:
                     logger.warning(f"⚠️ DashScope API密钥未设置，记忆功能降级")
                     return [0.0] * 1024  # 返回空向量
 
-                # 尝试调用DashScope API
-                response = TextEmbedding.call(
-                    model=self.embedding,
-                    input=text
-                )
-
-                # 检查响应状态
-                if response.status_code == 200:
-                    # 成功获取embedding
-                    embedding = response.output['embeddings'][0]['embedding']
-                    logger.debug(f"✅ DashScope embedding成功，维度: {len(embedding)}")
-                    return embedding
-                else:
-                    # API返回错误状态码
-                    logger.error(f"❌ DashScope API错误: {response.code} - {response.message}")
-                    logger.warning(f"⚠️ 记忆功能降级，返回空向量")
-                    return [0.0] * 1024  # 返回空向量而不是抛出异常
+                # 通过嵌入服务调用DashScope API（已存储的文本直接复用）
+                embedding = self.embedding_service.embed_query(text)
+                logger.debug(f"✅ DashScope embedding成功，维度: {len(embedding)}")
+                return embedding
 
             except ImportError as e:
                 # dashscope包未安装
@@ -295,11 +521,7 @@ class FinancialSituationMemory:
 
             # 尝试调用OpenAI兼容的embedding API
             try:
-                response = self.client.embeddings.create(
-                    model=self.embedding,
-                    input=text
-                )
-                embedding = response.data[0].embedding
+                embedding = self.embedding_service.embed_query(text)
                 logger.debug(f"✅ OpenAI embedding成功，维度: {len(embedding)}")
                 return embedding
 
@@ -340,26 +562,200 @@ class FinancialSituationMemory:
 
     def add_situations(self, situations_and_advice):
         """Add financial situations and their corresponding advice. Parameter is a list of tuples (situation, rec)"""
+        situations_and_advice = list(situations_and_advice)
+        if not situations_and_advice:
+            return
 
-        situations = []
-        advice = []
-        ids = []
-        embeddings = []
-
-        offset = self.situation_collection.count()
-
-        for i, (situation, recommendation) in enumerate(situations_and_advice):
-            situations.append(situation)
-            advice.append(recommendation)
-            ids.append(str(offset + i))
-            embeddings.append(self.get_embedding(situation))
+        embeddings = self.get_embeddings([situation for situation, _ in situations_and_advice])
+        self._add_embedded(situations_and_advice, embeddings)
 
+    def _add_embedded(self, situations_and_advice, embeddings):
+        """将已向量化的 (situation, recommendation) 一次性写入集合"""
+        now = time.time()
+        # 持久集合可能被多个进程同时写入，按条数递增的ID会相互覆盖
         self.situation_collection.add(
-            documents=situations,
-            metadatas=[{"recommendation": rec} for rec in advice],
+            documents=[situation for situation, _ in situations_and_advice],
+            metadatas=[
+                {"recommendation": rec, "created_at": now, "last_used_at": now, "hits": 0}
+                for _, rec in situations_and_advice
+            ],
             embeddings=embeddings,
-            ids=ids,
+            ids=[uuid.uuid4().hex for _ in situations_and_advice],
+        )
+        self._enforce_capacity()
+
+    def _touch(self, ids):
+        """记录检索命中：先记在进程内，攒够一批或距上次写回超过1分钟时写回集合元数据"""
+        if not ids:
+            return
+        now = time.time()
+        with _memory_usage_lock:
+            usage = _memory_usage.setdefault(self.name, {})
+            for item_id in ids:
+                _, hits = usage.get(item_id, (now, 0))
+                usage[item_id] = (now, hits + 1)
+            due = (
+                len(usage) >= self.usage_flush_batch
+                or now - _memory_usage_flushed_at.setdefault(self.name, now) >= 60
+            )
+        if due:
+            self.flush_usage()
+
+    def flush_usage(self):
+        """把未写回的命中次数与最近使用时间合并进集合元数据"""
+        with _memory_usage_lock:
+            pending = _memory_usage.pop(self.name, {})
+            _memory_usage_flushed_at[self.name] = time.time()
+        if not pending:
+            return
+        try:
+            records = self.situation_collection.get(ids=list(pending), include=["metadatas"])
+            ids, metadatas = [], []
+            for item_id, metadata in zip(records["ids"], records["metadatas"]):
+                last_used, hits = pending[item_id]
+                metadata = dict(metadata or {})
+                metadata["hits"] = int(metadata.get("hits", 0)) + hits
+                metadata["last_used_at"] = max(float(metadata.get("last_used_at", 0.0)), last_used)
+                ids.append(item_id)
+                metadatas.append(metadata)
+            if ids:
+                self.situation_collection.update(ids=ids, metadatas=metadatas)
+            logger.debug(f"📝 [记忆] {self.name} 写回 {len(ids)} 条使用记录")
+        except Exception as e:
+            # 写回失败时放回待写队列，下次再试
+            logger.warning(f"⚠️ [记忆] {self.name} 写回使用记录失败: {e}")
+            with _memory_usage_lock:
+                usage = _memory_usage.setdefault(self.name, {})
+                for item_id, (last_used, hits) in pending.items():
+                    newer, more = usage.get(item_id, (last_used, 0))
+                    usage[item_id] = (max(newer, last_used), hits + more)
+
+    def _retention_scores(self, ids, metadatas):
+        """保留分 = 时间衰减(距最近使用) × (1 + log(1 + 命中次数))，分数越低越先淘汰"""
+        now = time.time()
+        with _memory_usage_lock:
+            usage = dict(_memory_usage.get(self.name, {}))
+        scores = []
+        for item_id, metadata in zip(ids, metadatas):
+            metadata = metadata or {}
+            last_used, hits = usage.get(item_id, (0.0, 0))
+            last_used = max(last_used, float(metadata.get("last_used_at", metadata.get("created_at", 0.0))))
+            hits += int(metadata.get("hits", 0))
+            age_days = max(0.0, now - last_used) / 86400
+            decay = 0.5 ** (age_days / self.half_life_days) if self.half_life_days > 0 else 1.0
+            # 同分时按最近使用时间排序（纯LRU）
+            scores.append((decay * (1 + math.log1p(hits)), last_used))
+        return scores
+
+    def _enforce_capacity(self):
+        """超出容量一定比例时先合并近似重复，再按保留分淘汰到容量以内"""
+        if self.max_entries <= 0:
+            return
+        try:
+            limit = self.max_entries + max(1, int(self.max_entries * self.capacity_slack))
+            if self.situation_collection.count() < limit:
+                return
+            self.compact()
+            records = self.situation_collection.get(include=["metadatas"])
+            overflow = len(records["ids"]) - self.max_entries
+            if overflow <= 0:
+                return
+            scores = self._retention_scores(records["ids"], records["metadatas"])
+            order = sorted(range(len(scores)), key=lambda i: scores[i])
+            evicted = [records["ids"][i] for i in order[:overflow]]
+            self.situation_collection.delete(ids=evicted)
+            with _memory_usage_lock:
+                usage = _memory_usage.get(self.name, {})
+                for item_id in evicted:
+                    usage.pop(item_id, None)
+            logger.info(f"🧹 [记忆] {self.name} 超出容量 {self.max_entries}，淘汰 {len(evicted)} 条")
+        except Exception as e:
+            logger.warning(f"⚠️ [记忆] {self.name} 容量控制失败: {e}")
+
+    def compact(self, threshold=None):
+        """
+        合并近似重复的situation：余弦相似度不低于阈值的条目合并为最新的一条，
+        建议合并为一段，命中次数累加
+
+        Args:
+            threshold: 相似度阈值，默认使用 config["memory_compaction_threshold"]
+
+        Returns:
+            被合并删除的条目数
+        """
+        threshold = self.compaction_threshold if threshold is None else threshold
+        records = self.situation_collection.get(include=["metadatas", "documents", "embeddings"])
+        ids = list(records["ids"])
+        if len(ids) < 2:
+            return 0
+
+        matrix = np.asarray(records["embeddings"], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix = matrix / norms
+        metadatas = [dict(m or {}) for m in records["metadatas"]]
+
+        # 从最新的条目开始，后续与之近似的旧条目并入
+        order = sorted(range(len(ids)), key=lambda i: -float(metadatas[i].get("created_at", 0.0)))
+        merged_into: Dict[int, List[int]] = {}
+        absorbed = set()
+        for pos, i in enumerate(order):
+            if i in absorbed:
+                continue
+            rest = [j for j in order[pos + 1:] if j not in absorbed]
+            if not rest:
+                continue
+            similar = [j for j, score in zip(rest, matrix[rest] @ matrix[i]) if score >= threshold]
+            if similar:
+                merged_into[i] = similar
+                absorbed.update(similar)
+
+        if not merged_into:
+            return 0
+
+        keep_ids, keep_embeddings, keep_documents, keep_metadatas = [], [], [], []
+        for i, group in merged_into.items():
+            metadata = metadatas[i]
+            recommendations = [metadata.get("recommendation", "")]
+            for j in group:
+                other = metadatas[j]
+                if other.get("recommendation") and other["recommendation"] not in recommendations:
+                    recommendations.append(other["recommendation"])
+                metadata["hits"] = int(metadata.get("hits", 0)) + int(other.get("hits", 0))
+                metadata["last_used_at"] = max(
+                    float(metadata.get("last_used_at", 0.0)), float(other.get("last_used_at", 0.0))
+                )
+            metadata["recommendation"] = "\n\n---\n\n".join(r for r in recommendations if r)
+            keep_ids.append(ids[i])
+            keep_embeddings.append(records["embeddings"][i])
+            keep_documents.append(records["documents"][i])
+            keep_metadatas.append(metadata)
+
+        self.situation_collection.upsert(
+            ids=keep_ids, embeddings=keep_embeddings, documents=keep_documents, metadatas=keep_metadatas,
         )
+        self.situation_collection.delete(ids=[ids[j] for j in absorbed])
+        logger.info(f"🧹 [记忆] {self.name} 合并近似重复: {len(absorbed)} 条并入 {len(merged_into)} 条")
+        return len(absorbed)
+
+    @staticmethod
+    def add_situations_many(writes):
+        """
+        批量写回多个记忆集合：全部向量化成功后再统一写入
+
+        Args:
+            writes: [(FinancialSituationMemory, [(situation, recommendation), ...]), ...]
+        """
+        writes = [(memory, list(items)) for memory, items in writes if items]
+        with embedding_memo_scope():
+            # 相同嵌入配置的集合共享运行内缓存，同一段situation只向量化一次
+            embedded = [
+                (memory, items, memory.get_embeddings([situation for situation, _ in items]))
+                for memory, items in writes
+            ]
+        for memory, items, embeddings in embedded:
+            memory._add_embedded(items, embeddings)
+        logger.debug(f"📝 [记忆] 批量写回 {len(embedded)} 个集合")
 
     def get_memories(self, current_situation, n_matches=1):
         """Find matching recommendations using embeddings"""
@@ -378,15 +774,22 @@ class FinancialSituationMemory:
             )
 
             matched_results = []
+            matched_ids = []
             for i in range(len(results["documents"][0])):
+                similarity = 1 - results["distances"][0][i]
+                # 相似度过低的经验与当前情形无关，不注入提示词
+                if similarity < self.min_similarity:
+                    continue
+                matched_ids.append(results["ids"][0][i])
                 matched_results.append(
                     {
                         "matched_situation": results["documents"][0][i],
                         "recommendation": results["metadatas"][0][i]["recommendation"],
-                        "similarity_score": 1 - results["distances"][0][i],
+                        "similarity_score": similarity,
                     }
                 )
 
+            self._touch(matched_ids)
             return matched_results
         except Exception as e:
             logger.error(f"❌ 记忆查询失败: {e}")
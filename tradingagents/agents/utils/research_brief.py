@@ -0,0 +1,94 @@
+"""
+研究简报
+分析师阶段结束后，把四份分析报告压缩成一份带出处标注的结构化简报，只生成一次；
+研究员、研究经理和风险辩手默认使用简报，需要原文的节点可以单独选择使用完整报告。
+记忆检索仍使用完整报告（与反思时写入的situation保持一致）。
+"""
+
+from typing import Dict, List, Tuple
+
+from tradingagents.agents.utils.debate_compaction import estimate_tokens
+
+# 导入统一日志系统
+from tradingagents.utils.logging_init import get_logger
+logger = get_logger("agents.utils.research_brief")
+
+# (状态字段, 提示词中的名称, 简报中的出处标注)
+REPORT_SOURCES: List[Tuple[str, str, str]] = [
+    ("market_report", "市场研究报告", "市场"),
+    ("sentiment_report", "社交媒体情绪报告", "情绪"),
+    ("news_report", "最新世界事务报告", "新闻"),
+    ("fundamentals_report", "公司基本面报告", "基本面"),
+]
+
+
+def _available_reports(state) -> Dict[str, str]:
+    return {field: state[field] for field, _, _ in REPORT_SOURCES if state.get(field)}
+
+
+def format_research_context(state, use_raw_reports: bool = False) -> str:
+    """
+    构造提示词中的研究资料部分
+
+    Args:
+        state: 图状态
+        use_raw_reports: 使用四份完整报告而不是研究简报
+
+    Returns:
+        研究简报；未生成简报或选择原文时为完整报告
+    """
+    brief = state.get("research_brief") or ""
+    if brief and not use_raw_reports:
+        return f"研究简报（由各分析报告提炼，方括号内为出处）：\n{brief}"
+
+    return "\n".join(
+        f"{label}：{state.get(field) or ''}" for field, label, _ in REPORT_SOURCES
+    )
+
+
+def create_research_brief(llm, token_budget: int = 2000):
+    """
+    创建研究简报节点
+
+    Args:
+        llm: 生成简报的模型（使用快速模型）
+        token_budget: 简报的目标长度（估算token数）；报告总长不超过预算时直接使用原文
+    """
+
+    def research_brief_node(state) -> dict:
+        reports = _available_reports(state)
+        total_tokens = sum(estimate_tokens(report) for report in reports.values())
+        if total_tokens <= token_budget:
+            # 报告本身已经足够短，下游直接使用原文
+            logger.info(f"📝 [研究简报] 报告共约 {total_tokens} tokens，未超出预算，使用原文")
+            return {"research_brief": ""}
+
+        company_name = state.get("company_of_interest", "")
+        sections = "\n\n".join(
+            f"===== [{tag}] {label} =====\n{reports[field]}"
+            for field, label, tag in REPORT_SOURCES if field in reports
+        )
+        prompt = f"""你是研究团队的资料整理员。请把以下关于股票 {company_name} 的分析报告整理成一份供投资辩论使用的研究简报。
+
+要求：
+- 分为「关键数据」「看多信号」「看空信号与风险」「分歧与不确定性」四部分，每部分使用要点列表
+- 每个要点末尾用方括号标注出处，如 [市场]、[情绪]、[新闻]、[基本面]，多个出处并列标注
+- 保留具体数值（价格、涨跌幅、估值倍数、财务指标、日期）及其货币单位，不要四舍五入或改写数字
+- 不添加报告中没有的信息，不给出投资建议
+- 总长度不超过约{token_budget} tokens（中文约每字1个token，英文约每4个字符1个token），只输出简报本身
+
+{sections}
+"""
+        try:
+            brief = llm.invoke(prompt).content.strip()
+        except Exception as e:
+            # 简报生成失败时下游自动退回完整报告
+            logger.warning(f"⚠️ [研究简报] 生成失败，下游使用完整报告: {e}")
+            return {"research_brief": ""}
+
+        logger.info(
+            f"📝 [研究简报] 已生成: 报告约 {total_tokens} tokens → 简报约 {estimate_tokens(brief)} tokens"
+        )
+        return {"research_brief": brief}
+
+    return research_brief_node
@@ -1,3 +1,6 @@
+import contextvars
+from contextlib import contextmanager
+
 import tradingagents.default_config as default_config
 from typing import Dict, Optional
 from tradingagents.config.config_manager import config_manager
@@ -6,6 +9,9 @@ from tradingagents.config.config_manager import config_manager
 _config: Optional[Dict] = None
 DATA_DIR: Optional[str] = None
 
+# 单次分析运行的配置：同一进程内并发运行的多个图各自使用自己的配置，不改动全局配置
+_run_config: contextvars.ContextVar = contextvars.ContextVar("dataflow_run_config", default=None)
+
 
 def initialize_config():
     """Initialize the configuration with default values."""
@@ -55,9 +61,27 @@ def get_config() -> Dict:
     # 这里不再包含数据库配置，避免配置冲突
     config_copy = _config.copy()
 
+    run_config = _run_config.get()
+    if run_config:
+        config_copy.update(run_config)
+
     return config_copy
 
 
+@contextmanager
+def run_config_scope(config: Dict):
+    """
+    在一次分析运行内让 get_config 返回该运行的配置
+
+    LangGraph 在线程池中执行节点时会复制上下文，节点和工具读取到的都是本次运行的配置
+    """
+    token = _run_config.set(dict(config))
+    try:
+        yield
+    finally:
+        _run_config.reset(token)
+
+
 def get_data_dir() -> str:
     """获取数据目录路径"""
     return config_manager.get_data_dir()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+分析运行数据上下文
+分析开始前的数据预获取（stock_validator.prepare_stock_data）已经下载了股票基本信息和近期行情，
+这里把这些结果交给随后运行的分析图：Toolkit 的统一工具先查这里，命中时不再请求数据源。
+
+每次分析（或一批分析）使用自己的上下文，通过 run_data_scope 绑定到当前执行上下文；
+LangGraph 和批量分析的线程池会复制执行上下文，预获取与分析在不同线程中也能看到同一份数据。
+在 run_data_scope 之外写入的数据不会交给任何分析。
+"""
+
+import contextvars
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+# 预获取行情的默认时长（天）；分析师按同样的区间请求行情，才能命中预获取的数据
+DEFAULT_PERIOD_DAYS = 30
+
+
+def default_start_date(end_date: str, period_days: int = DEFAULT_PERIOD_DAYS) -> str:
+    """分析日期往前 period_days 天，与预获取行情的开始日期一致（YYYY-MM-DD）"""
+    end = datetime.strptime(str(end_date)[:10], "%Y-%m-%d")
+    return (end - timedelta(days=period_days)).strftime("%Y-%m-%d")
+
+
+def normalize_ticker(ticker: str) -> str:
+    """统一股票代码写法（与 web 端 format_stock_symbol 一致）"""
+    ticker = str(ticker).strip().upper()
+    if ticker.endswith('.HK'):
+        code = ticker[:-3]
+        if code.isdigit():
+            ticker = f"{code.lstrip('0').zfill(4)}.HK"
+    return ticker
+
+
+class RunDataContext:
+    """一次分析（或一批分析）的预获取数据交接区，按 (数据类型, 股票代码) 存储"""
+
+    def __init__(self, max_entries: int = 512):
+        """
+        Args:
+            max_entries: 最多保存的条目数，超出时淘汰最早写入的
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def put(self, kind: str, ticker: str, value: Any, **meta):
+        """
+        写入预获取的数据
+
+        Args:
+            kind: 数据类型（"stock_info" / "price_data"）
+            ticker: 股票代码
+            value: 数据源返回的原始结果
+            meta: 附加信息，如 start_date、end_date、stock_name、market_type，
+                行情数据需提供 source（产生该文本的数据接口，不同接口的输出格式不同）
+        """
+        key = (kind, normalize_ticker(ticker))
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = {"value": value, **meta}
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get(self, kind: str, ticker: str) -> Optional[Dict[str, Any]]:
+        key = (kind, normalize_ticker(ticker))
+        with self._lock:
+            return self._entries.get(key)
+
+    def _record(self, hit: bool):
+        with self._lock:
+            self._stats["hits" if hit else "misses"] += 1
+
+    def get_stock_info(self, ticker: str) -> Optional[Any]:
+        """预获取的股票基本信息"""
+        entry = self._get("stock_info", ticker)
+        self._record(entry is not None)
+        if entry is not None:
+            logger.info(f"♻️ [运行数据] 使用预获取的基本信息: {ticker}")
+            return entry["value"]
+        return None
+
+    def get_stock_name(self, ticker: str) -> Optional[str]:
+        """预获取时解析出的股票名称（未解析出名称时返回 None）"""
+        for kind in ("stock_info", "price_data"):
+            entry = self._get(kind, ticker)
+            name = entry.get("stock_name") if entry else None
+            if name and name != "未知" and normalize_ticker(name) != normalize_ticker(ticker):
+                return name
+        return None
+
+    def get_price_data(self, ticker: str, start_date: Optional[str], end_date: Optional[str],
+                       source: str) -> Optional[str]:
+        """
+        预获取的行情数据；由同一数据接口获取（输出格式与工具直接调用时一致）、截止日期相同
+        且预获取区间覆盖所请求的开始日期时命中（多出的早期数据不影响分析，最新价格一致）
+
+        Args:
+            source: 工具本来要调用的数据接口名称
+        """
+        entry = self._get("price_data", ticker)
+        hit = (
+            entry is not None
+            and entry.get("source") == source
+            and end_date is not None
+            and entry.get("end_date") == end_date
+            and (start_date is None or entry.get("start_date", "9999-12-31") <= start_date)
+        )
+        self._record(hit)
+        if hit:
+            logger.info(f"♻️ [运行数据] 使用预获取的行情数据: {ticker} ({entry['start_date']} 至 {entry['end_date']})")
+            return entry["value"]
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
+
+
+# 当前分析运行的数据上下文
+_current_context: contextvars.ContextVar = contextvars.ContextVar("run_data_context", default=None)
+
+
+@contextmanager
+def run_data_scope(context: Optional[RunDataContext] = None) -> Iterator[RunDataContext]:
+    """
+    在当前执行上下文中绑定一个运行数据上下文
+
+    Args:
+        context: 要绑定的上下文；批量分析在预获取和分析两个阶段传入同一个对象，默认新建
+
+    Yields:
+        绑定的运行数据上下文
+    """
+    context = context if context is not None else RunDataContext()
+    token = _current_context.set(context)
+    try:
+        yield context
+    finally:
+        _current_context.reset(token)
+
+
+def get_run_data_context() -> RunDataContext:
+    """获取当前分析运行的数据上下文；不在 run_data_scope 内时返回一个空的临时上下文"""
+    context = _current_context.get()
+    return context if context is not None else RunDataContext()
@@ -13,6 +13,63 @@ DEFAULT_CONFIG = {
     "deep_think_llm": "o4-mini",
     "quick_think_llm": "gpt-4o-mini",
     "backend_url": "https://api.openai.com/v1",
+    # Embedding settings: "auto" 按 llm_provider 选择远程嵌入服务，"local" 使用本地模型（离线可用）
+    "embedding_provider": os.getenv("TRADINGAGENTS_EMBEDDING_PROVIDER", "auto"),
+    "local_embedding_model": os.getenv("TRADINGAGENTS_LOCAL_EMBEDDING_MODEL", "BAAI/bge-small-zh-v1.5"),
+    # Memory settings: 默认 "persistent"，落盘的NumPy索引（预写日志 + 快照，重启后保留反思得到的经验）；
+    # "chroma"（进程内ChromaDB）或 "numpy"（进程内轻量索引）在进程退出后丢失全部经验
+    "memory_backend": os.getenv("TRADINGAGENTS_MEMORY_BACKEND", "persistent"),
+    "memory_dir": os.getenv(
+        "TRADINGAGENTS_MEMORY_DIR",
+        os.path.join(
+            os.path.abspath(os.path.join(os.path.dirname(__file__), ".")),
+            "dataflows/data_cache/memory",
+        ),
+    ),
+    # 每个记忆集合的容量上限（超出时合并近似重复并按时间衰减淘汰，0为不限）、淘汰半衰期（天）
+    "memory_max_entries": int(os.getenv("TRADINGAGENTS_MEMORY_MAX_ENTRIES", "500")),
+    "memory_half_life_days": float(os.getenv("TRADINGAGENTS_MEMORY_HALF_LIFE_DAYS", "90")),
+    # 超出容量的比例达到此值才触发合并与淘汰；检索命中记录每攒够多少条写回集合元数据
+    "memory_capacity_slack": 0.1,
+    "memory_usage_flush_batch": 20,
+    # 检索相似度下限（余弦相似度），低于此值的经验不注入辩论提示词
+    "memory_min_similarity": float(os.getenv("TRADINGAGENTS_MEMORY_MIN_SIMILARITY", "0.3")),
+    # 相似度不低于此值的situation视为近似重复并合并
+    "memory_compaction_threshold": 0.97,
+    # 嵌入结果除单次运行内复用外，是否在进程内跨运行复用（LRU，容量由 TRADINGAGENTS_EMBEDDING_MEMO_SIZE 控制）
+    "embedding_memo_process_wide": True,
+    # 分析师并行执行（各自独立的消息通道，在多头研究员之前汇合）
+    "parallel_analysts": os.getenv("TRADINGAGENTS_PARALLEL_ANALYSTS", "true").lower() == "true",
+    # 风险辩论按轮同步：每轮三位风险分析师并行发言，再合并进辩论状态。
+    # 代价是同一轮内互相看不到对方的发言，只能回应上一轮；因此只在 max_risk_discuss_rounds >= 2 时生效
+    # （只有一轮时没有人回应其他人），默认关闭，需要缩短多轮辩论耗时时再开启
+    "parallel_risk_debate": os.getenv("TRADINGAGENTS_PARALLEL_RISK_DEBATE", "false").lower() == "true",
+    # 运行检查点：按分析ID保存每个节点完成后的状态，失败后用同一分析ID重跑可从断点继续
+    # "sqlite"（本地文件）、"redis"（使用 REDIS_* 配置）、"memory" 或 "none"
+    "checkpoint_backend": os.getenv("TRADINGAGENTS_CHECKPOINT_BACKEND", "sqlite"),
+    "checkpoint_path": os.getenv(
+        "TRADINGAGENTS_CHECKPOINT_PATH",
+        os.path.join(
+            os.path.abspath(os.path.join(os.path.dirname(__file__), ".")),
+            "dataflows/data_cache/checkpoints.sqlite",
+        ),
+    ),
+    # 检查点保留策略：最后一次写入超过 checkpoint_ttl_hours 的分析（失败后未续跑）被清理，
+    # sqlite 后端最多保留 checkpoint_max_threads 个分析（0 为不限制）
+    "checkpoint_ttl_hours": float(os.getenv("TRADINGAGENTS_CHECKPOINT_TTL_HOURS", "72")),
+    "checkpoint_max_threads": int(os.getenv("TRADINGAGENTS_CHECKPOINT_MAX_THREADS", "200")),
+    # 辩论历史压缩：发给辩手的历史超过预算（估算token数，0为不压缩）时，
+    # 保留最近若干条发言原文，更早的发言增量合并为摘要；研究经理与风险经理仍看到完整历史
+    "debate_history_token_budget": int(os.getenv("TRADINGAGENTS_DEBATE_HISTORY_TOKEN_BUDGET", "3000")),
+    "debate_history_keep_turns": int(os.getenv("TRADINGAGENTS_DEBATE_HISTORY_KEEP_TURNS", "3")),
+    # 研究简报：分析师阶段后把四份报告提炼为带出处的简报（约 research_brief_token_budget tokens），
+    # 研究员、研究经理和风险辩手默认使用简报；需要完整报告的节点列在 research_brief_raw_reports 中
+    # （可选 bull, bear, research_manager, risky, safe, neutral，环境变量用逗号分隔）
+    "research_brief_enabled": os.getenv("TRADINGAGENTS_RESEARCH_BRIEF", "true").lower() == "true",
+    "research_brief_token_budget": int(os.getenv("TRADINGAGENTS_RESEARCH_BRIEF_TOKEN_BUDGET", "2000")),
+    "research_brief_raw_reports": [
+        node.strip() for node in os.getenv("TRADINGAGENTS_RESEARCH_BRIEF_RAW_REPORTS", "").split(",") if node.strip()
+    ],
     # Debate and discussion settings
     "max_debate_rounds": 1,
     "max_risk_discuss_rounds": 1,
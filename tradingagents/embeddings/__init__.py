@@ -0,0 +1,38 @@
+"""
+嵌入服务模块
+"""
+
+from .store import EmbeddingStore
+from .service import (
+    EmbeddingService,
+    DashScopeEmbeddingBackend,
+    OpenAIEmbeddingBackend,
+    get_embedding_service,
+    get_dashscope_embedding_service,
+    get_local_embedding_service,
+)
+from .local_backend import (
+    HashingEmbeddingBackend,
+    SentenceTransformerEmbeddingBackend,
+    create_local_backend,
+)
+from .vector_index import NumpyVectorIndex, NumpyVectorStore, get_numpy_collection
+from .durable_index import DurableVectorIndex, get_durable_collection
+
+__all__ = [
+    'EmbeddingStore',
+    'EmbeddingService',
+    'DashScopeEmbeddingBackend',
+    'OpenAIEmbeddingBackend',
+    'get_embedding_service',
+    'get_dashscope_embedding_service',
+    'get_local_embedding_service',
+    'HashingEmbeddingBackend',
+    'SentenceTransformerEmbeddingBackend',
+    'create_local_backend',
+    'NumpyVectorIndex',
+    'NumpyVectorStore',
+    'get_numpy_collection',
+    'DurableVectorIndex',
+    'get_durable_collection',
+]
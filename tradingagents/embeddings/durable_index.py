@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+持久化向量集合（智能体记忆）
+内存中是 NumpyVectorIndex；每次写入先追加到 SQLite 预写日志（WAL 模式、synchronous=FULL）再应用，
+定期把索引落盘为快照并截断日志。
+
+- 持久：写入在日志提交后才返回，进程重启后 快照 + 日志重放 即可完整恢复
+- 多进程：日志由 SQLite 串行化，读操作前重放其他进程追加的日志；生成快照使用文件锁
+- 热启动：快照向量以内存映射方式加载，日志中保存的是向量本身，全程无需重新向量化
+- 快照清理：除最近 keep_snapshots 份外，只删除超过 snapshot_grace_seconds 的旧快照；
+  读取快照失败（已被其他进程清理）时重新读取最新的快照位置再加载，不会退化为空索引
+"""
+
+import json
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows 下只做进程内加锁
+    fcntl = None
+
+from .vector_index import NumpyVectorIndex
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+# 加载快照失败时重新读取快照位置的次数
+_SNAPSHOT_LOAD_ATTEMPTS = 5
+
+
+class DurableVectorIndex:
+    """带预写日志与快照的 NumpyVectorIndex，接口与 Chroma Collection 相同"""
+
+    def __init__(
+        self,
+        name: str,
+        directory: Path,
+        dtype: str = "float16",
+        checkpoint_interval: int = 200,
+        keep_snapshots: int = 3,
+        snapshot_grace_seconds: float = 300,
+    ):
+        """
+        Args:
+            name: 集合名称
+            directory: 集合目录（log.sqlite + snapshots/）
+            dtype: 新建集合的向量精度
+            checkpoint_interval: 日志累计多少条写操作后自动生成快照
+            keep_snapshots: 保留的快照数量（旧快照可能仍被其他进程映射读取）
+            snapshot_grace_seconds: 更旧的快照生成后至少保留多久，给正在加载它的进程留出时间
+        """
+        self.name = name
+        self.dtype = dtype
+        self.directory = Path(directory)
+        self.snapshot_root = self.directory / "snapshots"
+        self.snapshot_root.mkdir(parents=True, exist_ok=True)
+        self.lock_path = self.directory / ".lock"
+        self.checkpoint_interval = checkpoint_interval
+        self.keep_snapshots = max(1, keep_snapshots)
+        self.snapshot_grace_seconds = snapshot_grace_seconds
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.directory / "log.sqlite"), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS ops (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                op TEXT NOT NULL,
+                ids TEXT NOT NULL,
+                documents TEXT,
+                metadatas TEXT,
+                vectors BLOB,
+                dim INTEGER,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+        self._index = NumpyVectorIndex(name, dtype=dtype)
+        self._snapshot_seq = 0
+        self._applied_seq = 0
+
+        began = time.time()
+        self._catch_up()
+        logger.info(
+            f"📚 [持久记忆] 加载集合: {name}, {self._index.count()} 条, "
+            f"快照序号 {self._snapshot_seq}, 耗时 {time.time() - began:.3f}s"
+        )
+
+    # ------------------------------------------------------------------
+    # 日志与快照
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _process_lock(self):
+        """跨进程快照锁"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _load_snapshot(self, seq: int, snapshot_dir: str):
+        """加载快照；快照不完整或已被清理时抛出 OSError，当前索引保持不变"""
+        index = NumpyVectorIndex(self.name, dtype=self.dtype)
+        try:
+            index.load(self.snapshot_root / snapshot_dir)
+        except (KeyError, ValueError) as e:
+            raise OSError(f"快照不完整: {snapshot_dir}, {e}") from e
+        self._index = index
+        self._snapshot_seq = self._applied_seq = seq
+
+    def _apply(self, op: str, ids: List[str], documents, metadatas, vectors: Optional[np.ndarray]):
+        if op == "add":
+            self._index.add(ids=ids, embeddings=vectors, documents=documents, metadatas=metadatas)
+        elif op == "update":
+            self._index.update(ids, metadatas)
+        elif op == "delete":
+            self._index.delete(ids)
+
+    def _catch_up(self):
+        """重放其他进程（或本进程此前）提交的日志；其他进程生成了更新的快照时先加载快照"""
+        with self._lock:
+            for attempt in range(_SNAPSHOT_LOAD_ATTEMPTS):
+                # 同一读事务内读取快照位置与日志，避免与截断日志的快照操作交错
+                self._conn.execute("BEGIN")
+                try:
+                    meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+                    snapshot_seq = int(meta.get("snapshot_seq", 0))
+                    if snapshot_seq > self._applied_seq:
+                        try:
+                            self._load_snapshot(snapshot_seq, meta["snapshot_dir"])
+                        except OSError as e:
+                            # 快照只会在更新的快照提交后被清理：结束读事务，重新读取快照位置后重试
+                            logger.warning(f"⚠️ [持久记忆] 加载快照失败，重新读取快照位置: {self.name}, {e}")
+                            continue
+                    rows = self._conn.execute(
+                        "SELECT seq, op, ids, documents, metadatas, vectors, dim FROM ops WHERE seq > ? ORDER BY seq",
+                        (self._applied_seq,),
+                    ).fetchall()
+                    break
+                finally:
+                    self._conn.execute("COMMIT")
+            else:
+                # 日志中已不含快照之前的写操作，不能用空索引代替
+                raise RuntimeError(f"持久记忆 {self.name} 无法加载快照 {meta.get('snapshot_dir')}")
+
+            for seq, op, ids, documents, metadatas, vectors, dim in rows:
+                matrix = np.frombuffer(vectors, dtype=np.float32).reshape(-1, dim) if vectors else None
+                self._apply(
+                    op,
+                    json.loads(ids),
+                    json.loads(documents) if documents else None,
+                    json.loads(metadatas) if metadatas else None,
+                    matrix,
+                )
+                self._applied_seq = seq
+
+    def _append(self, op: str, ids: List[str], documents=None, metadatas=None, matrix: Optional[np.ndarray] = None):
+        """先写日志（提交即持久），再追平内存索引"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO ops (op, ids, documents, metadatas, vectors, dim, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    op,
+                    json.dumps(ids),
+                    json.dumps(documents, ensure_ascii=False, default=str) if documents is not None else None,
+                    json.dumps(metadatas, ensure_ascii=False, default=str) if metadatas is not None else None,
+                    matrix.tobytes() if matrix is not None else None,
+                    matrix.shape[1] if matrix is not None else None,
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+            self._catch_up()
+            pending = self._applied_seq - self._snapshot_seq
+
+        if pending >= self.checkpoint_interval:
+            try:
+                self.checkpoint()
+            except Exception as e:
+                # 快照失败不影响数据安全（日志仍在）
+                logger.warning(f"⚠️ [持久记忆] 生成快照失败: {self.name}, {e}")
+
+    def checkpoint(self):
+        """把当前索引写成快照并截断已包含的日志"""
+        with self._process_lock(), self._lock:
+            self._catch_up()
+            seq = self._applied_seq
+            if seq <= self._snapshot_seq:
+                return
+
+            snapshot_dir = f"{seq:012d}"
+            self._index.save(self.snapshot_root / snapshot_dir)
+
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    [("snapshot_seq", str(seq)), ("snapshot_dir", snapshot_dir)],
+                )
+                self._conn.execute("DELETE FROM ops WHERE seq <= ?", (seq,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._snapshot_seq = seq
+
+            # 已删除文件的内存映射在 POSIX 上仍然有效；其他进程可能刚读到旧的快照位置还未加载，
+            # 因此除最近几份外只清理生成时间超过宽限期的快照
+            snapshots = sorted(p for p in self.snapshot_root.iterdir() if p.is_dir())
+            expire_before = time.time() - self.snapshot_grace_seconds
+            for old in snapshots[:-self.keep_snapshots]:
+                try:
+                    if old.stat().st_mtime < expire_before:
+                        shutil.rmtree(old, ignore_errors=True)
+                except OSError:
+                    pass
+
+            logger.debug(f"📚 [持久记忆] 快照完成: {self.name}, 序号 {seq}")
+
+    # ------------------------------------------------------------------
+    # Chroma Collection 兼容接口
+    # ------------------------------------------------------------------
+
+    def count(self) -> int:
+        self._catch_up()
+        return self._index.count()
+
+    def add(
+        self,
+        ids: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+        documents: Optional[Sequence[str]] = None,
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+    ):
+        if not ids:
+            return
+        matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+        self._append(
+            "add",
+            list(ids),
+            list(documents) if documents is not None else None,
+            list(metadatas) if metadatas is not None else None,
+            matrix,
+        )
+
+    upsert = add
+
+    def update(self, ids: Sequence[str], metadatas: Sequence[Optional[Dict[str, Any]]]):
+        if ids:
+            self._append("update", list(ids), metadatas=list(metadatas))
+
+    def delete(self, ids: Iterable[str]):
+        ids = list(ids)
+        if ids:
+            self._append("delete", ids)
+
+    def query(self, query_embeddings, n_results: int = 10, include=("metadatas", "documents", "distances"), where=None):
+        self._catch_up()
+        return self._index.query(query_embeddings, n_results=n_results, include=include, where=where)
+
+    def get(self, ids: Optional[Sequence[str]] = None, include=("metadatas", "documents")) -> Dict[str, List[Any]]:
+        self._catch_up()
+        return self._index.get(ids, include=include)
+
+    def get_stats(self) -> Dict[str, Any]:
+        self._catch_up()
+        stats = self._index.get_stats()
+        stats.update({
+            "directory": str(self.directory),
+            "snapshot_seq": self._snapshot_seq,
+            "pending_log_ops": self._applied_seq - self._snapshot_seq,
+        })
+        return stats
+
+
+# 进程内共享的持久集合
+_durable_indexes: Dict[str, DurableVectorIndex] = {}
+_durable_lock = threading.Lock()
+
+
+def get_durable_collection(name: str, directory: Path, dtype: str = "float16") -> DurableVectorIndex:
+    """获取（必要时加载）进程内共享的持久集合，目录为 directory/name"""
+    path = Path(directory) / name
+    key = str(path.resolve())
+    with _durable_lock:
+        index = _durable_indexes.get(key)
+        if index is None:
+            index = DurableVectorIndex(name, path, dtype=dtype)
+            _durable_indexes[key] = index
+        return index
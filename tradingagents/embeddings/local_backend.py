@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+本地嵌入后端
+无需网络：优先使用 sentence-transformers（可选 ONNX 推理），
+未安装或模型不可用时退回纯 NumPy 的特征哈希向量化
+"""
+
+import re
+import zlib
+from typing import List, Optional
+
+import numpy as np
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+DEFAULT_LOCAL_EMBEDDING_MODEL = "BAAI/bge-small-zh-v1.5"
+
+
+class SentenceTransformerEmbeddingBackend:
+    """sentence-transformers 本地模型（CPU）"""
+
+    provider = "local"
+
+    def __init__(
+        self,
+        model: str = DEFAULT_LOCAL_EMBEDDING_MODEL,
+        device: str = "cpu",
+        backend: Optional[str] = None,
+        max_batch_size: int = 64,
+    ):
+        """
+        Args:
+            model: 模型名称或本地路径（离线环境请使用本地路径）
+            device: 推理设备
+            backend: 推理后端，None 为 PyTorch，"onnx" 使用 ONNX Runtime（需 sentence-transformers>=3.2）
+            max_batch_size: 单次编码的最大条数
+        """
+        from sentence_transformers import SentenceTransformer
+
+        kwargs = {"device": device}
+        if backend:
+            kwargs["backend"] = backend
+        self._model = SentenceTransformer(model, **kwargs)
+        self.model = model if not backend else f"{model}:{backend}"
+        self.max_batch_size = max_batch_size
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = self._model.encode(
+            texts,
+            batch_size=self.max_batch_size,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        return np.asarray(vectors, dtype=np.float32).tolist()
+
+
+class HashingEmbeddingBackend:
+    """
+    特征哈希向量化：字符 1~3 元组（兼容中文）+ 英文/数字词，带符号哈希到固定维度后 L2 归一化。
+    语义能力有限，但确定、零依赖、毫秒级，适合作为离线兜底
+    """
+
+    provider = "local"
+
+    _WORD_PATTERN = re.compile(r"[a-zA-Z]+|\d+(?:\.\d+)?")
+
+    def __init__(self, dim: int = 1024, ngram_range=(1, 3), max_batch_size: int = 1024):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.model = f"hashing-{dim}-{ngram_range[0]}{ngram_range[1]}"
+        self.max_batch_size = max_batch_size
+
+    def _features(self, text: str) -> List[str]:
+        text = text.lower()
+        compact = re.sub(r"\s+", " ", text)
+        features = [f"w:{w}" for w in self._WORD_PATTERN.findall(text)]
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            features.extend(compact[i:i + n] for i in range(len(compact) - n + 1))
+        return features
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            # crc32 在进程间稳定（内置 hash 受 PYTHONHASHSEED 影响）
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed_one(t).tolist() for t in texts]
+
+
+def create_local_backend(model: Optional[str] = None, backend: Optional[str] = None):
+    """
+    创建本地嵌入后端
+
+    Args:
+        model: sentence-transformers 模型名/路径；传 "hashing" 直接使用哈希向量化
+        backend: 传给 sentence-transformers 的推理后端（如 "onnx"）
+    """
+    if model == "hashing":
+        return HashingEmbeddingBackend()
+
+    try:
+        return SentenceTransformerEmbeddingBackend(model or DEFAULT_LOCAL_EMBEDDING_MODEL, backend=backend)
+    except ImportError:
+        logger.warning(f"⚠️ [本地嵌入] 未安装 sentence-transformers，使用哈希向量化兜底")
+    except Exception as e:
+        logger.warning(f"⚠️ [本地嵌入] 模型加载失败，使用哈希向量化兜底: {e}")
+    return HashingEmbeddingBackend()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+嵌入服务
+按提供商的最大批量合并请求，结果写入 EmbeddingStore，相同文本只向量化一次。
+实现 LangChain Embeddings 接口，CRAG 向量库与智能体记忆共用
+"""
+
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from tradingagents.default_config import DEFAULT_CONFIG
+from .store import EmbeddingStore
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+class DashScopeEmbeddingBackend:
+    """阿里百炼 TextEmbedding 接口"""
+
+    provider = "dashscope"
+
+    # text-embedding-v3 单次最多 10 条，v1/v2 最多 25 条
+    MAX_BATCH_SIZE = {"text-embedding-v3": 10}
+
+    def __init__(self, model: str = "text-embedding-v3", api_key: Optional[str] = None):
+        import dashscope
+
+        self.model = model
+        self.max_batch_size = self.MAX_BATCH_SIZE.get(model, 25)
+        api_key = api_key or os.getenv("DASHSCOPE_API_KEY")
+        if api_key:
+            dashscope.api_key = api_key
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        from dashscope import TextEmbedding
+
+        response = TextEmbedding.call(model=self.model, input=texts)
+        if response.status_code != 200:
+            raise RuntimeError(f"DashScope API错误: {response.code} - {response.message}")
+
+        embeddings = sorted(response.output["embeddings"], key=lambda e: e["text_index"])
+        return [e["embedding"] for e in embeddings]
+
+
+class OpenAIEmbeddingBackend:
+    """OpenAI 兼容的 embeddings 接口（OpenAI / Ollama / DeepSeek 等）"""
+
+    provider = "openai"
+
+    def __init__(self, client, model: str = "text-embedding-3-small", max_batch_size: int = 256):
+        self.client = client
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.provider = f"openai@{getattr(client, 'base_url', '')}"
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        response = self.client.embeddings.create(model=self.model, input=texts)
+        return [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
+
+
+class EmbeddingService(Embeddings):
+    """带批量合并与持久化去重的嵌入服务"""
+
+    def __init__(self, backend, store: Optional[EmbeddingStore] = None):
+        """
+        Args:
+            backend: 嵌入后端，需提供 provider / model / max_batch_size / embed(texts)
+            store: 向量存储，None 表示不持久化（仍会在单次调用内去重）
+        """
+        self.backend = backend
+        self.model = backend.model
+        self.store = store
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "requested": 0,
+            "store_hits": 0,
+            "embedded": 0,
+            "provider_calls": 0,
+            "provider_seconds": 0.0,
+        }
+
+    def text_hash(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _embed_missing(self, texts: List[str]) -> List[List[float]]:
+        """按后端最大批量分批调用"""
+        vectors: List[List[float]] = []
+        batch_size = max(1, self.backend.max_batch_size)
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            began = time.time()
+            result = self.backend.embed(batch)
+            if len(result) != len(batch):
+                raise RuntimeError(f"嵌入接口返回数量不一致: 期望 {len(batch)}，实际 {len(result)}")
+            vectors.extend(result)
+            with self._stats_lock:
+                self._stats["provider_calls"] += 1
+                self._stats["provider_seconds"] += time.time() - began
+                self._stats["embedded"] += len(batch)
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """批量向量化，已存储的文本直接复用"""
+        if not texts:
+            return []
+
+        hashes = [self.text_hash(t) for t in texts]
+        found: Dict[str, np.ndarray] = self.store.get_many(hashes) if self.store is not None else {}
+
+        missing: Dict[str, str] = {}
+        for h, t in zip(hashes, texts):
+            if h not in found and h not in missing:
+                missing[h] = t
+
+        with self._stats_lock:
+            self._stats["requested"] += len(texts)
+            self._stats["store_hits"] += sum(1 for h in hashes if h in found)
+
+        if missing:
+            new_vectors = self._embed_missing(list(missing.values()))
+            fresh = dict(zip(missing.keys(), new_vectors))
+            if self.store is not None:
+                try:
+                    self.store.put_many(fresh)
+                except Exception as e:
+                    # 存储失败不影响本次结果
+                    logger.warning(f"⚠️ [嵌入服务] 向量写入存储失败: {e}")
+            found.update({h: np.asarray(v, dtype=np.float32) for h, v in fresh.items()})
+
+        return [found[h].tolist() for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def get_stats(self) -> Dict[str, object]:
+        """吞吐量与命中率统计"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["hit_rate"] = round(stats["store_hits"] / stats["requested"], 4) if stats["requested"] else 0.0
+        stats["texts_per_second"] = (
+            round(stats["embedded"] / stats["provider_seconds"], 2) if stats["provider_seconds"] else 0.0
+        )
+        stats["provider"] = self.backend.provider
+        stats["model"] = self.model
+        if self.store is not None:
+            stats["store"] = self.store.get_stats()
+        return stats
+
+
+# 全局服务实例，按 (提供商, 模型) 复用
+_services: Dict[tuple, EmbeddingService] = {}
+_services_lock = threading.Lock()
+
+
+def get_embedding_store_dir() -> Path:
+    """向量存储根目录，可通过 TRADINGAGENTS_EMBEDDING_CACHE_DIR 覆盖"""
+    return Path(os.getenv(
+        "TRADINGAGENTS_EMBEDDING_CACHE_DIR",
+        os.path.join(DEFAULT_CONFIG["data_cache_dir"], "embeddings"),
+    ))
+
+
+def get_embedding_service(backend, persist: bool = True) -> EmbeddingService:
+    """获取（必要时创建）共享的嵌入服务"""
+    key = (backend.provider, backend.model, persist)
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            store = None
+            if persist:
+                slug = f"{backend.provider}__{backend.model}".replace("/", "_").replace(":", "_").replace("@", "_")
+                store = EmbeddingStore(get_embedding_store_dir() / slug)
+            service = EmbeddingService(backend, store)
+            _services[key] = service
+            logger.info(f"🧮 [嵌入服务] 初始化: {backend.provider} / {backend.model}")
+        return service
+
+
+def get_local_embedding_service(model: Optional[str] = None, backend: Optional[str] = None) -> EmbeddingService:
+    """本地嵌入服务（便捷函数）；哈希向量化比查询存储更快，不做持久化"""
+    from .local_backend import HashingEmbeddingBackend, create_local_backend
+
+    # 模型加载较慢，按请求参数缓存，避免每次调用都重新加载
+    key = ("local-request", model, backend)
+    with _services_lock:
+        service = _services.get(key)
+    if service is not None:
+        return service
+
+    local_backend = create_local_backend(model, backend=backend)
+    service = get_embedding_service(local_backend, persist=not isinstance(local_backend, HashingEmbeddingBackend))
+    with _services_lock:
+        _services.setdefault(key, service)
+    return service
+
+
+def get_dashscope_embedding_service(model: str = "text-embedding-v3") -> EmbeddingService:
+    """阿里百炼嵌入服务（便捷函数）"""
+    key = ("dashscope", model, True)
+    with _services_lock:
+        service = _services.get(key)
+    if service is not None:
+        return service
+    return get_embedding_service(DashScopeEmbeddingBackend(model))
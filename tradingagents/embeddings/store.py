@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+嵌入向量持久化存储
+以文本内容哈希为键，向量追加写入内存映射的矩阵文件，SQLite 维护 哈希 -> 行号 索引。
+同一段文本在任意进程、任意重启之后都不会被重复向量化
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows 下只做进程内加锁
+    fcntl = None
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+class EmbeddingStore:
+    """内容哈希寻址的向量存储（float32/float16 内存映射矩阵 + 行号索引）"""
+
+    def __init__(self, directory: Path, dtype: str = "float16"):
+        """
+        初始化向量存储
+
+        Args:
+            directory: 存储目录，每个 (提供商, 模型) 使用独立目录
+            dtype: 新建存储时的向量精度，float16 或 float32；已有存储沿用其原有精度
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.directory / "vectors.bin"
+        self.lock_path = self.directory / ".lock"
+        self.vectors_path.touch(exist_ok=True)
+
+        self._thread_lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.directory / "index.sqlite"), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS vectors (hash TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        self._conn.commit()
+
+        meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        self.dtype = np.dtype(meta.get("dtype", dtype))
+        self.dim: Optional[int] = int(meta["dim"]) if "dim" in meta else None
+
+        self._mmap: Optional[np.memmap] = None
+        self._mapped_rows = 0
+
+    @contextmanager
+    def _process_lock(self):
+        """跨进程写锁（POSIX 文件锁），保证追加写与索引更新的原子性"""
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _reload_meta(self) -> bool:
+        """本进程打开存储时还没有向量：读取其他进程之后写入的维度与精度，返回是否已初始化"""
+        meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        if "dim" not in meta:
+            return False
+        self.dim = int(meta["dim"])
+        self.dtype = np.dtype(meta["dtype"])
+        return True
+
+    def _row_bytes(self) -> int:
+        return self.dim * self.dtype.itemsize
+
+    def _file_rows(self) -> int:
+        if not self.dim:
+            return 0
+        return self.vectors_path.stat().st_size // self._row_bytes()
+
+    def _ensure_mapped(self, min_rows: int):
+        """其他进程追加了向量时重新映射文件"""
+        if self._mmap is not None and self._mapped_rows >= min_rows:
+            return
+        rows = self._file_rows()
+        if rows == 0:
+            self._mmap, self._mapped_rows = None, 0
+            return
+        self._mmap = np.memmap(self.vectors_path, dtype=self.dtype, mode="r", shape=(rows, self.dim))
+        self._mapped_rows = rows
+
+    def get_many(self, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        """批量读取，返回已存在的 {哈希: float32 向量}"""
+        if not hashes:
+            return {}
+
+        rows: Dict[str, int] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._thread_lock:
+            if not self.dim and not self._reload_meta():
+                return {}
+
+            # SQLite 单条语句的参数数量有限，分批查询
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows.update(self._conn.execute(
+                    f"SELECT hash, row FROM vectors WHERE hash IN ({placeholders})", batch
+                ).fetchall())
+
+            if not rows:
+                return {}
+            self._ensure_mapped(max(rows.values()) + 1)
+            if self._mmap is None:
+                return {}
+            return {
+                h: np.asarray(self._mmap[row], dtype=np.float32)
+                for h, row in rows.items() if row < self._mapped_rows
+            }
+
+    def put_many(self, items: Dict[str, Sequence[float]]):
+        """批量写入 {哈希: 向量}，已存在的哈希会被跳过"""
+        if not items:
+            return
+
+        with self._process_lock():
+            if self.dim is None:
+                # 其他进程已初始化时沿用其维度与精度
+                if not self._reload_meta():
+                    self.dim = len(next(iter(items.values())))
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                        [("dim", str(self.dim)), ("dtype", self.dtype.name)],
+                    )
+                    self._conn.commit()
+
+            existing = set(self.get_many(list(items)).keys())
+            new_items = [
+                (h, v) for h, v in items.items()
+                if h not in existing and len(v) == self.dim
+            ]
+            skipped = len(items) - len(existing) - len(new_items)
+            if skipped:
+                logger.warning(f"⚠️ [嵌入存储] {skipped} 个向量维度与存储不一致（期望 {self.dim}），未写入")
+            if not new_items:
+                return
+
+            start_row = self._file_rows()
+            matrix = np.asarray([v for _, v in new_items], dtype=self.dtype)
+            with open(self.vectors_path, "r+b") as f:
+                # 按行对齐写入，覆盖上次中断时可能残留的半行数据
+                f.seek(start_row * self._row_bytes())
+                f.write(matrix.tobytes())
+                f.flush()
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO vectors (hash, row) VALUES (?, ?)",
+                [(h, start_row + i) for i, (h, _) in enumerate(new_items)],
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._thread_lock:
+            return self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "directory": str(self.directory),
+            "vectors": len(self),
+            "dim": self.dim,
+            "dtype": self.dtype.name,
+            "size_mb": round(self.vectors_path.stat().st_size / 1024 / 1024, 2),
+        }
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+轻量 NumPy 向量索引
+适用于几万条以内的小集合（智能体记忆、单部署的 CRAG 文档集）：
+连续存放的 float16 / int8 量化矩阵 + 元数据数组，归一化点积 + argpartition 求 top-k，
+通过内存映射文件保存/加载。
+
+NumpyVectorIndex 提供与 Chroma Collection 相同的 add / query / count / delete 接口，
+NumpyVectorStore 是供 CRAG 检索器使用的 LangChain VectorStore 适配
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+class NumpyVectorIndex:
+    """进程内向量索引（余弦相似度）"""
+
+    def __init__(self, name: str = "default", dtype: str = "float16", directory: Optional[Path] = None):
+        """
+        Args:
+            name: 索引名称
+            dtype: 向量存储精度，float16 或 int8（按行量化）
+            directory: 持久化目录，None 表示纯内存；目录中已有数据时自动加载
+        """
+        if dtype not in ("float16", "int8"):
+            raise ValueError(f"不支持的向量精度: {dtype}")
+
+        self.name = name
+        self.dtype = dtype
+        self.directory = Path(directory) if directory else None
+
+        self._lock = threading.RLock()
+        self._size = 0
+        self._dim: Optional[int] = None
+        self._vectors: Optional[np.ndarray] = None   # (容量, 维度)
+        self._scales: Optional[np.ndarray] = None    # int8 模式下每行的缩放系数
+        self._ids: List[str] = []
+        self._documents: List[Optional[str]] = []
+        self._metadatas: List[Optional[Dict[str, Any]]] = []
+        self._id_to_row: Dict[str, int] = {}
+
+        if self.directory and (self.directory / "meta.json").exists():
+            self.load(self.directory)
+
+    # ------------------------------------------------------------------
+    # 内部工具
+    # ------------------------------------------------------------------
+
+    def _encode(self, matrix: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """归一化后按配置精度编码"""
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix = matrix / norms
+        if self.dtype == "int8":
+            scales = np.abs(matrix).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            return np.round(matrix / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+        return matrix.astype(np.float16), None
+
+    def _ensure_capacity(self, needed: int):
+        capacity = 0 if self._vectors is None else self._vectors.shape[0]
+        if needed <= capacity and self._vectors.flags.writeable:
+            return
+        new_capacity = max(needed, capacity * 2, 64)
+        storage_dtype = np.int8 if self.dtype == "int8" else np.float16
+        vectors = np.zeros((new_capacity, self._dim), dtype=storage_dtype)
+        scales = np.ones(new_capacity, dtype=np.float32) if self.dtype == "int8" else None
+        if self._size:
+            vectors[:self._size] = self._vectors[:self._size]
+            if scales is not None:
+                scales[:self._size] = self._scales[:self._size]
+        self._vectors, self._scales = vectors, scales
+
+    def _scores(self, query: np.ndarray) -> np.ndarray:
+        matrix = self._vectors[:self._size]
+        if self.dtype == "int8":
+            return (matrix.astype(np.float32) @ query) * self._scales[:self._size]
+        return matrix.astype(np.float32) @ query
+
+    # ------------------------------------------------------------------
+    # Chroma Collection 兼容接口
+    # ------------------------------------------------------------------
+
+    def count(self) -> int:
+        return self._size
+
+    def add(
+        self,
+        ids: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+        documents: Optional[Sequence[str]] = None,
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+    ):
+        """写入向量，已存在的 id 会被覆盖（等同 upsert）"""
+        if not ids:
+            return
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        documents = list(documents) if documents is not None else [None] * len(ids)
+        metadatas = list(metadatas) if metadatas is not None else [None] * len(ids)
+
+        with self._lock:
+            if self._dim is None:
+                self._dim = matrix.shape[1]
+            elif matrix.shape[1] != self._dim:
+                raise ValueError(f"向量维度不一致: 索引为 {self._dim}，写入为 {matrix.shape[1]}")
+
+            encoded, scales = self._encode(matrix)
+            self._ensure_capacity(self._size + len(ids))
+
+            for i, item_id in enumerate(ids):
+                row = self._id_to_row.get(item_id)
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._id_to_row[item_id] = row
+                    self._ids.append(item_id)
+                    self._documents.append(documents[i])
+                    self._metadatas.append(metadatas[i])
+                else:
+                    self._documents[row] = documents[i]
+                    self._metadatas[row] = metadatas[i]
+                self._vectors[row] = encoded[i]
+                if scales is not None:
+                    self._scales[row] = scales[i]
+
+    upsert = add
+
+    def update(self, ids: Sequence[str], metadatas: Sequence[Optional[Dict[str, Any]]]):
+        """只更新已存在条目的元数据（向量与文档不变），不存在的 id 被忽略"""
+        with self._lock:
+            for item_id, metadata in zip(ids, metadatas):
+                row = self._id_to_row.get(item_id)
+                if row is not None:
+                    self._metadatas[row] = metadata
+
+    def delete(self, ids: Iterable[str]):
+        """删除向量：用最后一行填补空位，矩阵保持连续"""
+        with self._lock:
+            for item_id in ids:
+                row = self._id_to_row.pop(item_id, None)
+                if row is None:
+                    continue
+                if not self._vectors.flags.writeable:
+                    self._ensure_capacity(self._size)
+                last = self._size - 1
+                if row != last:
+                    moved_id = self._ids[last]
+                    self._vectors[row] = self._vectors[last]
+                    if self._scales is not None:
+                        self._scales[row] = self._scales[last]
+                    self._ids[row] = moved_id
+                    self._documents[row] = self._documents[last]
+                    self._metadatas[row] = self._metadatas[last]
+                    self._id_to_row[moved_id] = row
+                self._ids.pop()
+                self._documents.pop()
+                self._metadatas.pop()
+                self._size -= 1
+
+    def query(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        n_results: int = 10,
+        include: Sequence[str] = ("metadatas", "documents", "distances"),
+        where: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, List[List[Any]]]:
+        """
+        top-k 查询，返回结构与 Chroma Collection.query 相同；
+        distances 为余弦距离（1 - 余弦相似度）
+        """
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+
+        with self._lock:
+            for query in query_embeddings:
+                if self._size == 0:
+                    for key in results:
+                        results[key].append([])
+                    continue
+
+                query = np.asarray(query, dtype=np.float32)
+                norm = np.linalg.norm(query)
+                if norm > 0:
+                    query = query / norm
+                scores = self._scores(query)
+
+                if where:
+                    mask = np.array([
+                        all((m or {}).get(k) == v for k, v in where.items()) for m in self._metadatas
+                    ])
+                    scores = np.where(mask, scores, -np.inf)
+
+                k = min(n_results, self._size)
+                top = np.argpartition(-scores, k - 1)[:k] if k < self._size else np.arange(self._size)
+                top = top[np.argsort(-scores[top])]
+                top = [int(i) for i in top if np.isfinite(scores[i])]
+
+                results["ids"].append([self._ids[i] for i in top])
+                results["documents"].append([self._documents[i] for i in top])
+                results["metadatas"].append([self._metadatas[i] for i in top])
+                results["distances"].append([float(1.0 - scores[i]) for i in top])
+
+        return {key: value for key, value in results.items() if key == "ids" or key in include}
+
+    def get(
+        self,
+        ids: Optional[Sequence[str]] = None,
+        include: Sequence[str] = ("metadatas", "documents"),
+    ) -> Dict[str, List[Any]]:
+        """按 id 读取（None 表示全部）；include 含 "embeddings" 时返回反量化后的归一化向量"""
+        with self._lock:
+            rows = range(self._size) if ids is None else [self._id_to_row[i] for i in ids if i in self._id_to_row]
+            result = {
+                "ids": [self._ids[r] for r in rows],
+                "documents": [self._documents[r] for r in rows],
+                "metadatas": [self._metadatas[r] for r in rows],
+            }
+            if "embeddings" in include:
+                rows = list(rows)
+                matrix = self._vectors[rows].astype(np.float32) if rows else np.zeros((0, self._dim or 0), np.float32)
+                if self._scales is not None and rows:
+                    matrix *= self._scales[rows][:, None]
+                result["embeddings"] = matrix.tolist()
+            return {key: value for key, value in result.items() if key == "ids" or key in include}
+
+    # ------------------------------------------------------------------
+    # 持久化
+    # ------------------------------------------------------------------
+
+    def save(self, directory: Optional[Path] = None):
+        """保存到目录：vectors.npy / scales.npy + meta.json，先写临时文件再替换"""
+        directory = Path(directory or self.directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        with self._lock:
+            if self._dim is not None:
+                tmp = directory / "vectors.tmp.npy"
+                np.save(tmp, np.ascontiguousarray(self._vectors[:self._size]))
+                os.replace(tmp, directory / "vectors.npy")
+                if self._scales is not None:
+                    tmp = directory / "scales.tmp.npy"
+                    np.save(tmp, self._scales[:self._size])
+                    os.replace(tmp, directory / "scales.npy")
+
+            meta = {
+                "name": self.name,
+                "dtype": self.dtype,
+                "dim": self._dim,
+                "ids": self._ids,
+                "documents": self._documents,
+                "metadatas": self._metadatas,
+            }
+            tmp = directory / "meta.tmp.json"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False, default=str)
+            os.replace(tmp, directory / "meta.json")
+
+    def load(self, directory: Path):
+        """从目录加载；向量矩阵以只读内存映射打开，首次写入时才复制到内存"""
+        directory = Path(directory)
+        with open(directory / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        with self._lock:
+            self.dtype = meta["dtype"]
+            self._dim = meta["dim"]
+            self._ids = list(meta["ids"])
+            self._documents = list(meta["documents"])
+            self._metadatas = list(meta["metadatas"])
+            self._id_to_row = {item_id: row for row, item_id in enumerate(self._ids)}
+            self._size = len(self._ids)
+            if self._dim is not None and self._size:
+                self._vectors = np.load(directory / "vectors.npy", mmap_mode="r")
+                self._scales = (
+                    np.array(np.load(directory / "scales.npy")) if self.dtype == "int8" else None
+                )
+            else:
+                self._vectors, self._scales = None, None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "count": self._size,
+                "dim": self._dim,
+                "dtype": self.dtype,
+                "vector_mb": round(self._vectors[:self._size].nbytes / 1024 / 1024, 3) if self._size else 0.0,
+            }
+
+
+class NumpyVectorStore(VectorStore):
+    """基于 NumpyVectorIndex 的 LangChain VectorStore"""
+
+    def __init__(
+        self,
+        embedding_function,
+        collection_name: str = "default",
+        persist_directory: Optional[str] = None,
+        dtype: str = "float16",
+        autosave: bool = True,
+    ):
+        """
+        Args:
+            embedding_function: LangChain Embeddings 实例
+            collection_name: 集合名，持久化时作为子目录
+            persist_directory: 持久化根目录，None 表示纯内存
+            dtype: 向量存储精度
+            autosave: 每次写入/删除后自动保存（每次都重写整个矩阵）；批量导入时应关闭，
+                全部写入后调用一次 persist()
+        """
+        self._embedding = embedding_function
+        self.collection_name = collection_name
+        directory = Path(persist_directory) / f"{collection_name}.npindex" if persist_directory else None
+        self.index = NumpyVectorIndex(collection_name, dtype=dtype, directory=directory)
+        self.persistent = directory is not None
+        self.autosave = autosave and self.persistent
+        self._dirty = False
+        self._dirty_lock = threading.Lock()
+
+    def _changed(self):
+        if self.autosave:
+            self.index.save()
+        else:
+            with self._dirty_lock:
+                self._dirty = True
+
+    def persist(self) -> bool:
+        """保存自上次保存以来的写入/删除；没有未保存的修改时不写文件
+
+        Returns:
+            是否写入了文件
+        """
+        if not self.persistent:
+            return False
+        with self._dirty_lock:
+            if not self._dirty:
+                return False
+            self.index.save()
+            self._dirty = False
+        return True
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        if ids is None:
+            import uuid
+            ids = [str(uuid.uuid4()) for _ in texts]
+        vectors = self._embedding.embed_documents(texts)
+        self.index.add(ids=ids, embeddings=vectors, documents=texts, metadatas=metadatas)
+        self._changed()
+        return list(ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if ids:
+            self.index.delete(ids)
+            self._changed()
+        return True
+
+    def delete_collection(self):
+        self.index.delete(list(self.index.get()["ids"]))
+        self._changed()
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        """返回 (文档, 余弦距离)"""
+        results = self.index.query(
+            [self._embedding.embed_query(query)], n_results=k, where=kwargs.get("filter"),
+        )
+        return [
+            (Document(page_content=text or "", metadata=metadata or {}), distance)
+            for text, metadata, distance in zip(
+                results["documents"][0], results["metadatas"][0], results["distances"][0]
+            )
+        ]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        return lambda distance: 1.0 - distance
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        store = cls(embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+
+# 进程内共享的索引（与 ChromaDBManager 的集合缓存对应）
+_indexes: Dict[str, NumpyVectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_numpy_collection(name: str, dtype: str = "float16") -> NumpyVectorIndex:
+    """获取（必要时创建）进程内共享的 NumPy 集合"""
+    with _indexes_lock:
+        index = _indexes.get(name)
+        if index is None:
+            index = NumpyVectorIndex(name, dtype=dtype)
+            _indexes[name] = index
+            logger.info(f"📚 [NumPy索引] 创建集合: {name} ({dtype})")
+        return index
@@ -0,0 +1,196 @@
+# TradingAgents/graph/checkpointing.py
+
+"""
+LangGraph 检查点存储
+每个节点完成后把运行状态写入检查点，按分析ID（thread_id）区分；
+后段节点失败或进程退出后，用同一分析ID重新运行即可从最后完成的节点继续，
+已完成的分析师工具调用和LLM调用不再重复。
+
+后端：
+- sqlite: 本地文件（需要 langgraph-checkpoint-sqlite）
+- redis:  使用 .env 中的 REDIS_* 配置（需要 langgraph-checkpoint-redis 与 RedisJSON/RediSearch 模块）
+- memory: 进程内（仅用于调试，进程退出后丢失）
+- none:   不保存检查点
+
+失败后未再续跑的分析会留下检查点：sqlite 后端按 checkpoint_ttl_hours（最后一次写入距今的时长）
+和 checkpoint_max_threads（保留的分析数）定期清理，redis 后端使用同样的TTL。
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# 导入统一日志系统
+from tradingagents.utils.logging_init import get_logger
+logger = get_logger("default")
+
+
+# 两次清理之间的最小间隔（秒）
+_PRUNE_INTERVAL = 3600
+# UUIDv6 时间戳（1582-10-15 起的100纳秒数）与 Unix 纪元的差值
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+
+def _checkpoint_timestamp(checkpoint_id: str) -> Optional[float]:
+    """从检查点ID（LangGraph 使用按时间递增的 UUIDv6）解析写入时间，无法解析时返回 None"""
+    try:
+        value = uuid.UUID(checkpoint_id)
+    except (TypeError, ValueError):
+        return None
+    if value.version != 6:
+        return None
+    h = value.hex
+    ticks = int(h[0:12] + h[13:16], 16)
+    return (ticks - _UUID_EPOCH_OFFSET) / 1e7
+
+
+def _prune_sqlite_checkpoints(saver, ttl_hours: float, max_threads: int) -> int:
+    """
+    清理过期的 sqlite 检查点
+
+    Args:
+        saver: SqliteSaver
+        ttl_hours: 最后一次写入超过该时长的分析被清理（<=0 不按时间清理）
+        max_threads: 最多保留的分析数，超出时先清理最旧的（<=0 不限制）
+
+    Returns:
+        清理的分析数
+    """
+    with saver.lock:
+        rows = saver.conn.execute(
+            "SELECT thread_id, MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id"
+        ).fetchall()
+
+    now = time.time()
+    threads = []
+    for thread_id, checkpoint_id in rows:
+        written_at = _checkpoint_timestamp(checkpoint_id)
+        # 无法解析时间的检查点视为刚写入，只参与数量限制
+        threads.append((written_at if written_at is not None else now, thread_id))
+    threads.sort(reverse=True)
+
+    expired = []
+    for index, (written_at, thread_id) in enumerate(threads):
+        too_old = ttl_hours > 0 and now - written_at > ttl_hours * 3600
+        too_many = max_threads > 0 and index >= max_threads
+        if too_old or too_many:
+            expired.append(thread_id)
+
+    for thread_id in expired:
+        saver.delete_thread(thread_id)
+    if expired:
+        logger.info(f"🧹 [检查点] 已清理 {len(expired)} 个过期分析的检查点，保留 {len(threads) - len(expired)} 个")
+    return len(expired)
+
+
+def _create_sqlite_checkpointer(path: str):
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    # 同一连接由多个分析线程共享，SqliteSaver 内部加锁串行化
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    saver = SqliteSaver(conn)
+    saver.setup()
+    return saver
+
+
+def _create_redis_checkpointer(ttl_hours: float):
+    import redis
+    from langgraph.checkpoint.redis import RedisSaver
+
+    client = redis.Redis(
+        host=os.getenv("REDIS_HOST", "localhost"),
+        port=int(os.getenv("REDIS_PORT", "6379")),
+        password=os.getenv("REDIS_PASSWORD") or None,
+        db=int(os.getenv("REDIS_DB", "0")),
+    )
+    ttl = {"default_ttl": int(ttl_hours * 60), "refresh_on_read": True} if ttl_hours > 0 else None
+    saver = RedisSaver(redis_client=client, ttl=ttl)
+    saver.setup()
+    return saver
+
+
+def _create_checkpointer(backend: str, path: str, ttl_hours: float):
+    if backend == "memory":
+        from langgraph.checkpoint.memory import InMemorySaver
+        return InMemorySaver()
+    if backend == "redis":
+        try:
+            return _create_redis_checkpointer(ttl_hours)
+        except Exception as e:
+            # 与数据库管理器一致：Redis 不可用时降级到本地存储
+            logger.warning(f"⚠️ [检查点] Redis 检查点不可用，降级到SQLite: {e}")
+    return _create_sqlite_checkpointer(path)
+
+
+# 进程内共享的检查点存储（图复用池中的多个图共用同一个）
+_checkpointers: Dict[tuple, Any] = {}
+_checkpointers_lock = threading.Lock()
+# 各 sqlite 检查点存储上次清理的时间
+_last_pruned: Dict[int, float] = {}
+
+
+def get_checkpointer(config: Dict[str, Any]) -> Optional[Any]:
+    """
+    按配置获取检查点存储
+
+    Args:
+        config: 图配置（checkpoint_backend, checkpoint_path）
+
+    Returns:
+        LangGraph 检查点存储；未启用或依赖缺失时返回 None（不影响正常分析）
+    """
+    backend = str(config.get("checkpoint_backend") or "none").lower()
+    if backend in ("none", "false", "off", ""):
+        return None
+
+    path = str(config.get("checkpoint_path") or os.path.join(config["data_cache_dir"], "checkpoints.sqlite"))
+    key = (backend, path if backend != "memory" else None)
+    ttl_hours = float(config.get("checkpoint_ttl_hours") or 0)
+    with _checkpointers_lock:
+        if key not in _checkpointers:
+            try:
+                _checkpointers[key] = _create_checkpointer(backend, path, ttl_hours)
+                logger.info(f"💾 [检查点] 已启用检查点存储: {backend} ({type(_checkpointers[key]).__name__})")
+            except ImportError as e:
+                logger.warning(f"⚠️ [检查点] 缺少检查点依赖，分析将不可续跑: {e}")
+                _checkpointers[key] = None
+            except Exception as e:
+                logger.warning(f"⚠️ [检查点] 初始化检查点存储失败，分析将不可续跑: {e}")
+                _checkpointers[key] = None
+        return _checkpointers[key]
+
+
+def prune_checkpoints(checkpointer: Any, config: Dict[str, Any], force: bool = False) -> int:
+    """
+    按 checkpoint_ttl_hours / checkpoint_max_threads 清理 sqlite 检查点
+
+    每个存储每小时最多清理一次（force=True 时立即清理）；其他后端不处理
+    （redis 由TTL自动过期，memory 随进程退出释放）。清理失败只记录警告。
+
+    Returns:
+        清理的分析数
+    """
+    if checkpointer is None or not hasattr(checkpointer, "conn") or not hasattr(checkpointer, "lock"):
+        return 0
+
+    now = time.time()
+    with _checkpointers_lock:
+        if not force and now - _last_pruned.get(id(checkpointer), 0) < _PRUNE_INTERVAL:
+            return 0
+        _last_pruned[id(checkpointer)] = now
+
+    try:
+        return _prune_sqlite_checkpoints(
+            checkpointer,
+            float(config.get("checkpoint_ttl_hours") or 0),
+            int(config.get("checkpoint_max_threads") or 0),
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ [检查点] 清理过期检查点失败: {e}")
+        return 0
@@ -77,3 +77,11 @@ class ConditionalLogic:
         if state["risk_debate_state"]["latest_speaker"].startswith("Safe"):
             return "Neutral Analyst"
         return "Risky Analyst"
+
+    def should_continue_risk_round(self, state: AgentState):
+        """Determine if another concurrent risk-debate round should start."""
+        if (
+            state["risk_debate_state"]["count"] >= 3 * self.max_risk_discuss_rounds
+        ):  # each round adds one reply from each of the 3 agents
+            return "Risk Judge"
+        return ["Risky Analyst", "Safe Analyst", "Neutral Analyst"]
@@ -0,0 +1,157 @@
+# TradingAgents/graph/pool.py
+
+"""
+TradingAgentsGraph 进程级复用池
+按 (所选分析师, 配置) 复用已编译的图：LLM 客户端、Toolkit、五个记忆集合、工具节点和 LangGraph 只构建一次，
+空闲超时或超出容量时淘汰
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 导入统一日志系统
+from tradingagents.utils.logging_init import get_logger
+logger = get_logger("default")
+
+PoolKey = Tuple[Tuple[str, ...], str]
+
+
+class _PoolEntry:
+    __slots__ = ("graph", "last_used", "in_use", "runs")
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.last_used = time.time()
+        self.in_use = 0
+        self.runs = 0
+
+
+class TradingGraphPool:
+    """线程安全的 TradingAgentsGraph 复用池
+
+    同一个图可被多个请求并发使用：图本身无运行状态，单次运行的状态只存在于
+    propagate_isolated 的调用栈中
+    """
+
+    def __init__(self, idle_ttl_seconds: float = 1800, max_graphs: int = 8):
+        """
+        Args:
+            idle_ttl_seconds: 图空闲多久后淘汰
+            max_graphs: 最多保留的图数量，超出时淘汰最久未使用的空闲图
+        """
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_graphs = max_graphs
+        self._entries: Dict[PoolKey, _PoolEntry] = {}
+        self._build_locks: Dict[PoolKey, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "builds": 0, "evictions": 0}
+
+    @staticmethod
+    def _make_key(selected_analysts: List[str], config: Dict[str, Any]) -> PoolKey:
+        # 提供商、模型、辩论轮数等都在配置中，整体序列化后作为键
+        return tuple(selected_analysts), json.dumps(config, sort_keys=True, default=str)
+
+    def _evict(self, now: float):
+        """淘汰空闲超时的图；超出容量时再按最近使用时间淘汰（调用方需持有锁）"""
+        idle = [
+            (entry.last_used, key) for key, entry in self._entries.items()
+            if entry.in_use == 0
+        ]
+        expired = [key for last_used, key in idle if now - last_used > self.idle_ttl_seconds]
+        overflow = len(self._entries) - len(expired) - self.max_graphs
+        if overflow > 0:
+            expired += [key for _, key in sorted(idle) if key not in expired][:overflow]
+
+        for key in expired:
+            self._entries.pop(key, None)
+            self._build_locks.pop(key, None)
+            self._stats["evictions"] += 1
+            logger.info(f"🧹 [图复用池] 淘汰空闲图: {list(key[0])}")
+
+    def evict_idle(self):
+        """立即执行一次空闲淘汰"""
+        with self._lock:
+            self._evict(time.time())
+
+    @contextmanager
+    def lease(self, selected_analysts: List[str], config: Dict[str, Any]) -> Iterator[Any]:
+        """
+        借出（必要时构建）一个已编译的图，使用期间不会被淘汰
+
+        Args:
+            selected_analysts: 分析师列表
+            config: 图配置
+        """
+        from tradingagents.graph.trading_graph import TradingAgentsGraph
+
+        key = self._make_key(selected_analysts, config)
+
+        with self._lock:
+            self._evict(time.time())
+            entry = self._entries.get(key)
+            if entry is None:
+                build_lock = self._build_locks.setdefault(key, threading.Lock())
+            else:
+                entry.in_use += 1
+                self._stats["hits"] += 1
+
+        if entry is None:
+            with build_lock:
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if entry is not None:
+                        entry.in_use += 1
+                        self._stats["hits"] += 1
+                if entry is None:
+                    began = time.time()
+                    graph = TradingAgentsGraph(list(selected_analysts), config=dict(config), debug=False)
+                    entry = _PoolEntry(graph)
+                    entry.in_use = 1
+                    with self._lock:
+                        self._entries[key] = entry
+                        self._stats["builds"] += 1
+                    logger.info(f"🔧 [图复用池] 构建新图: {list(selected_analysts)}, 耗时 {time.time() - began:.2f}s")
+        # 数据接口的配置不在借出时切换：每次运行通过 run_config_scope 使用所属图的配置，
+        # 不同配置的图并发运行时互不覆盖
+
+        try:
+            yield entry.graph
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                entry.runs += 1
+                entry.last_used = time.time()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "graphs": len(self._entries),
+                "in_use": sum(entry.in_use for entry in self._entries.values()),
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+# 全局复用池
+_graph_pool: Optional[TradingGraphPool] = None
+_graph_pool_lock = threading.Lock()
+
+
+def get_graph_pool() -> TradingGraphPool:
+    """获取全局图复用池"""
+    global _graph_pool
+    if _graph_pool is None:
+        with _graph_pool_lock:
+            if _graph_pool is None:
+                _graph_pool = TradingGraphPool(
+                    idle_ttl_seconds=float(os.getenv("TRADINGAGENTS_GRAPH_POOL_IDLE_SECONDS", "1800")),
+                    max_graphs=int(os.getenv("TRADINGAGENTS_GRAPH_POOL_SIZE", "8")),
+                )
+    return _graph_pool
@@ -1,8 +1,12 @@
 # TradingAgents/graph/reflection.py
 
-from typing import Dict, Any
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
 from langchain_openai import ChatOpenAI
 
+from tradingagents.agents.utils.memory import FinancialSituationMemory
+
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
 logger = get_logger("default")
@@ -11,6 +15,15 @@ logger = get_logger("default")
 class Reflector:
     """Handles reflection on decisions and updating memory."""
 
+    # 组件键 -> (反思标签, 从状态中取出待反思内容)
+    COMPONENTS = {
+        "bull": ("BULL", lambda state: state["investment_debate_state"]["bull_history"]),
+        "bear": ("BEAR", lambda state: state["investment_debate_state"]["bear_history"]),
+        "trader": ("TRADER", lambda state: state["trader_investment_plan"]),
+        "invest_judge": ("INVEST JUDGE", lambda state: state["investment_debate_state"]["judge_decision"]),
+        "risk_manager": ("RISK JUDGE", lambda state: state["risk_debate_state"]["judge_decision"]),
+    }
+
     def __init__(self, quick_thinking_llm: ChatOpenAI):
         """Initialize the reflector with an LLM."""
         self.quick_thinking_llm = quick_thinking_llm
@@ -123,3 +136,60 @@ Adhere strictly to these instructions, and ensure your output is detailed, accur
             "RISK JUDGE", judge_decision, situation, returns_losses
         )
         risk_manager_memory.add_situations([(situation, result)])
+
+    def reflect_all(
+        self,
+        current_state,
+        returns_losses,
+        memories: Dict[str, Any],
+        max_workers: Optional[int] = None,
+    ) -> Dict[str, str]:
+        """
+        Reflect on all components concurrently, then write every memory update back together.
+
+        Returns only after all memory writes have committed. Components whose
+        reflection succeeded are written even if another one failed; the first
+        failure is re-raised afterwards.
+
+        Args:
+            memories: {"bull" | "bear" | "trader" | "invest_judge" | "risk_manager": FinancialSituationMemory}
+            max_workers: Concurrent LLM calls (defaults to one per component, 1 runs sequentially)
+
+        Returns:
+            Component key to reflection text
+        """
+        situation = self._extract_current_situation(current_state)
+        # 记忆功能未启用时为 None
+        active = {key: memory for key, memory in memories.items() if memory is not None}
+        if not active:
+            return {}
+
+        def reflect(key):
+            label, get_report = self.COMPONENTS[key]
+            return self._reflect_on_component(
+                label, get_report(current_state), situation, returns_losses
+            )
+
+        workers = max(1, min(max_workers or len(active), len(active)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reflect") as pool:
+            futures = {
+                key: pool.submit(contextvars.copy_context().run, reflect, key)
+                for key in active
+            }
+
+        results, errors = {}, []
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                logger.error(f"❌ [反思] {key} 反思失败: {e}")
+                errors.append(e)
+
+        FinancialSituationMemory.add_situations_many(
+            [(active[key], [(situation, result)]) for key, result in results.items()]
+        )
+        logger.info(f"🪞 [反思] 完成 {len(results)}/{len(active)} 个组件的反思并写入记忆 (并发数 {workers})")
+
+        if errors:
+            raise errors[0]
+        return results
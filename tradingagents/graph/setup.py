@@ -2,12 +2,15 @@
 
 from typing import Dict, Any
 from langchain_openai import ChatOpenAI
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import END, StateGraph, START
 from langgraph.prebuilt import ToolNode
 
 from tradingagents.agents import *
 from tradingagents.agents.utils.agent_states import AgentState
 from tradingagents.agents.utils.agent_utils import Toolkit
+from tradingagents.agents.utils.debate_compaction import DebateHistoryCompactor
+from tradingagents.agents.utils.research_brief import create_research_brief
 
 from .conditional_logic import ConditionalLogic
 
@@ -16,6 +19,15 @@ from tradingagents.utils.logging_init import get_logger
 logger = get_logger("default")
 
 
+# 各分析师写入的报告字段
+ANALYST_REPORT_FIELDS = {
+    "market": "market_report",
+    "social": "sentiment_report",
+    "news": "news_report",
+    "fundamentals": "fundamentals_report",
+}
+
+
 class GraphSetup:
     """Handles the setup and configuration of the agent graph."""
 
@@ -48,8 +60,79 @@ class GraphSetup:
         self.config = config or {}
         self.react_llm = react_llm
 
+    def _build_analyst_subgraph(self, analyst_type, analyst_node, delete_node, tool_node):
+        """Compile one analyst's tool loop as a standalone graph with its own message channel."""
+        name = analyst_type.capitalize()
+        subgraph = StateGraph(AgentState)
+        subgraph.add_node(f"{name} Analyst", analyst_node)
+        subgraph.add_node(f"Msg Clear {name}", delete_node)
+        subgraph.add_node(f"tools_{analyst_type}", tool_node)
+
+        subgraph.add_edge(START, f"{name} Analyst")
+        subgraph.add_conditional_edges(
+            f"{name} Analyst",
+            getattr(self.conditional_logic, f"should_continue_{analyst_type}"),
+            [f"tools_{analyst_type}", f"Msg Clear {name}"],
+        )
+        subgraph.add_edge(f"tools_{analyst_type}", f"{name} Analyst")
+        subgraph.add_edge(f"Msg Clear {name}", END)
+        # 检查点只记录父图节点，分析师分支整体完成后才算一个可续跑的步骤
+        return subgraph.compile(checkpointer=False)
+
+    def _create_analyst_branch(self, analyst_type, subgraph):
+        """Wrap an analyst subgraph so only its report field reaches the parent state."""
+        report_field = ANALYST_REPORT_FIELDS[analyst_type]
+
+        def analyst_branch(state, config: RunnableConfig):
+            # 子图使用独立的messages通道，Msg Clear只清理本分析师的消息
+            result = subgraph.invoke(state, config)
+            return {report_field: result.get(report_field, "")}
+
+        return analyst_branch
+
+    def _create_round_debater(self, debater_node, speaker):
+        """Run a risk debater against the previous round and report only its reply."""
+
+        def round_debater(state):
+            update = debater_node(state)["risk_debate_state"]
+            return {"risk_round_responses": {speaker: update[f"current_{speaker.lower()}_response"]}}
+
+        return round_debater
+
+    def _create_risk_round_join(self):
+        """Merge one concurrent round of risk-debate replies into risk_debate_state."""
+
+        def risk_round_join(state):
+            risk_debate_state = state["risk_debate_state"]
+            replies = state.get("risk_round_responses") or {}
+
+            new_risk_debate_state = dict(risk_debate_state)
+            history = risk_debate_state.get("history", "")
+            # 按原有的发言顺序拼接，保证历史记录稳定
+            for speaker in ("Risky", "Safe", "Neutral"):
+                argument = replies.get(speaker)
+                if argument is None:
+                    continue
+                key = speaker.lower()
+                history += "\n" + argument
+                new_risk_debate_state[f"{key}_history"] = (
+                    risk_debate_state.get(f"{key}_history", "") + "\n" + argument
+                )
+                new_risk_debate_state[f"current_{key}_response"] = argument
+                new_risk_debate_state["latest_speaker"] = speaker
+            new_risk_debate_state["history"] = history
+            new_risk_debate_state["count"] = risk_debate_state["count"] + len(replies)
+
+            return {"risk_debate_state": new_risk_debate_state, "risk_round_responses": None}
+
+        return risk_round_join
+
     def setup_graph(
-        self, selected_analysts=["market", "social", "news", "fundamentals"]
+        self,
+        selected_analysts=["market", "social", "news", "fundamentals"],
+        parallel_analysts=None,
+        parallel_risk_debate=None,
+        checkpointer=None,
     ):
         """Set up and compile the agent workflow graph.
 
@@ -59,7 +142,22 @@ class GraphSetup:
                 - "social": Social media analyst
                 - "news": News analyst
                 - "fundamentals": Fundamentals analyst
+            parallel_analysts (bool): Run the analysts concurrently and join before
+                the Bull Researcher. Defaults to config["parallel_analysts"].
+            parallel_risk_debate (bool): Run the three risk debaters of each round
+                concurrently. Debaters then only answer the previous round, so this
+                is ignored with a single risk round. Defaults to config["parallel_risk_debate"].
+            checkpointer: LangGraph checkpoint saver; when set, runs invoked with a
+                thread_id can resume from the last completed node.
         """
+        if parallel_analysts is None:
+            parallel_analysts = self.config.get("parallel_analysts", False)
+        if parallel_risk_debate is None:
+            parallel_risk_debate = self.config.get("parallel_risk_debate", False)
+        if parallel_risk_debate and self.conditional_logic.max_risk_discuss_rounds < 2:
+            # 只有一轮时并行发言的三人都看不到其他人的观点，辩论退化为各说各话
+            logger.info("⚖️ [风险辩论] 仅一轮辩论，按顺序发言")
+            parallel_risk_debate = False
         if len(selected_analysts) == 0:
             raise ValueError("Trading Agents Graph Setup Error: no analysts selected!")
 
@@ -136,22 +234,34 @@ class GraphSetup:
             delete_nodes["fundamentals"] = create_msg_delete()
             tool_nodes["fundamentals"] = self.tool_nodes["fundamentals"]
 
+        # 辩论历史超出预算时，辩手看到的是 早期摘要 + 最近发言（状态中的完整历史不变）
+        compactor = DebateHistoryCompactor(
+            self.quick_thinking_llm,
+            token_budget=self.config.get("debate_history_token_budget", 0),
+            keep_last_turns=self.config.get("debate_history_keep_turns", 3),
+        )
+
+        # 分析师阶段结束后生成一次研究简报，下游默认使用简报；列在 research_brief_raw_reports 中的节点使用完整报告
+        use_research_brief = self.config.get("research_brief_enabled", False)
+        raw_reports = set(self.config.get("research_brief_raw_reports") or [])
+        research_entry = "Research Brief" if use_research_brief else "Bull Researcher"
+
         # Create researcher and manager nodes
         bull_researcher_node = create_bull_researcher(
-            self.quick_thinking_llm, self.bull_memory
+            self.quick_thinking_llm, self.bull_memory, compactor, "bull" in raw_reports
         )
         bear_researcher_node = create_bear_researcher(
-            self.quick_thinking_llm, self.bear_memory
+            self.quick_thinking_llm, self.bear_memory, compactor, "bear" in raw_reports
         )
         research_manager_node = create_research_manager(
-            self.deep_thinking_llm, self.invest_judge_memory
+            self.deep_thinking_llm, self.invest_judge_memory, "research_manager" in raw_reports
         )
         trader_node = create_trader(self.quick_thinking_llm, self.trader_memory)
 
         # Create risk analysis nodes
-        risky_analyst = create_risky_debator(self.quick_thinking_llm)
-        neutral_analyst = create_neutral_debator(self.quick_thinking_llm)
-        safe_analyst = create_safe_debator(self.quick_thinking_llm)
+        risky_analyst = create_risky_debator(self.quick_thinking_llm, compactor, "risky" in raw_reports)
+        neutral_analyst = create_neutral_debator(self.quick_thinking_llm, compactor, "neutral" in raw_reports)
+        safe_analyst = create_safe_debator(self.quick_thinking_llm, compactor, "safe" in raw_reports)
         risk_manager_node = create_risk_manager(
             self.deep_thinking_llm, self.risk_manager_memory
         )
@@ -160,48 +270,83 @@ class GraphSetup:
         workflow = StateGraph(AgentState)
 
         # Add analyst nodes to the graph
-        for analyst_type, node in analyst_nodes.items():
-            workflow.add_node(f"{analyst_type.capitalize()} Analyst", node)
-            workflow.add_node(
-                f"Msg Clear {analyst_type.capitalize()}", delete_nodes[analyst_type]
-            )
-            workflow.add_node(f"tools_{analyst_type}", tool_nodes[analyst_type])
+        if parallel_analysts:
+            # 每个分析师的工具循环编译为独立子图，并行执行
+            for analyst_type, node in analyst_nodes.items():
+                subgraph = self._build_analyst_subgraph(
+                    analyst_type, node, delete_nodes[analyst_type], tool_nodes[analyst_type]
+                )
+                workflow.add_node(
+                    f"{analyst_type.capitalize()} Analyst",
+                    self._create_analyst_branch(analyst_type, subgraph),
+                )
+        else:
+            for analyst_type, node in analyst_nodes.items():
+                workflow.add_node(f"{analyst_type.capitalize()} Analyst", node)
+                workflow.add_node(
+                    f"Msg Clear {analyst_type.capitalize()}", delete_nodes[analyst_type]
+                )
+                workflow.add_node(f"tools_{analyst_type}", tool_nodes[analyst_type])
 
         # Add other nodes
+        if use_research_brief:
+            workflow.add_node(
+                "Research Brief",
+                create_research_brief(
+                    self.quick_thinking_llm, self.config.get("research_brief_token_budget", 2000)
+                ),
+            )
         workflow.add_node("Bull Researcher", bull_researcher_node)
         workflow.add_node("Bear Researcher", bear_researcher_node)
         workflow.add_node("Research Manager", research_manager_node)
         workflow.add_node("Trader", trader_node)
-        workflow.add_node("Risky Analyst", risky_analyst)
-        workflow.add_node("Neutral Analyst", neutral_analyst)
-        workflow.add_node("Safe Analyst", safe_analyst)
+        if parallel_risk_debate:
+            workflow.add_node("Risky Analyst", self._create_round_debater(risky_analyst, "Risky"))
+            workflow.add_node("Neutral Analyst", self._create_round_debater(neutral_analyst, "Neutral"))
+            workflow.add_node("Safe Analyst", self._create_round_debater(safe_analyst, "Safe"))
+            workflow.add_node("Risk Round Join", self._create_risk_round_join())
+        else:
+            workflow.add_node("Risky Analyst", risky_analyst)
+            workflow.add_node("Neutral Analyst", neutral_analyst)
+            workflow.add_node("Safe Analyst", safe_analyst)
         workflow.add_node("Risk Judge", risk_manager_node)
 
         # Define edges
-        # Start with the first analyst
-        first_analyst = selected_analysts[0]
-        workflow.add_edge(START, f"{first_analyst.capitalize()} Analyst")
-
-        # Connect analysts in sequence
-        for i, analyst_type in enumerate(selected_analysts):
-            current_analyst = f"{analyst_type.capitalize()} Analyst"
-            current_tools = f"tools_{analyst_type}"
-            current_clear = f"Msg Clear {analyst_type.capitalize()}"
-
-            # Add conditional edges for current analyst
-            workflow.add_conditional_edges(
-                current_analyst,
-                getattr(self.conditional_logic, f"should_continue_{analyst_type}"),
-                [current_tools, current_clear],
-            )
-            workflow.add_edge(current_tools, current_analyst)
-
-            # Connect to next analyst or to Bull Researcher if this is the last analyst
-            if i < len(selected_analysts) - 1:
-                next_analyst = f"{selected_analysts[i+1].capitalize()} Analyst"
-                workflow.add_edge(current_clear, next_analyst)
-            else:
-                workflow.add_edge(current_clear, "Bull Researcher")
+        if parallel_analysts:
+            # Fan out from START to every analyst and join before the research phase
+            branches = [f"{analyst_type.capitalize()} Analyst" for analyst_type in selected_analysts]
+            for branch in branches:
+                workflow.add_edge(START, branch)
+            workflow.add_edge(branches, research_entry)
+            logger.info(f"🚀 [图构建] 分析师并行执行: {', '.join(branches)}")
+        else:
+            # Start with the first analyst
+            first_analyst = selected_analysts[0]
+            workflow.add_edge(START, f"{first_analyst.capitalize()} Analyst")
+
+            # Connect analysts in sequence
+            for i, analyst_type in enumerate(selected_analysts):
+                current_analyst = f"{analyst_type.capitalize()} Analyst"
+                current_tools = f"tools_{analyst_type}"
+                current_clear = f"Msg Clear {analyst_type.capitalize()}"
+
+                # Add conditional edges for current analyst
+                workflow.add_conditional_edges(
+                    current_analyst,
+                    getattr(self.conditional_logic, f"should_continue_{analyst_type}"),
+                    [current_tools, current_clear],
+                )
+                workflow.add_edge(current_tools, current_analyst)
+
+                # Connect to next analyst or to the research phase if this is the last analyst
+                if i < len(selected_analysts) - 1:
+                    next_analyst = f"{selected_analysts[i+1].capitalize()} Analyst"
+                    workflow.add_edge(current_clear, next_analyst)
+                else:
+                    workflow.add_edge(current_clear, research_entry)
+
+        if use_research_brief:
+            workflow.add_edge("Research Brief", "Bull Researcher")
 
         # Add remaining edges
         workflow.add_conditional_edges(
@@ -221,33 +366,46 @@ class GraphSetup:
             },
         )
         workflow.add_edge("Research Manager", "Trader")
-        workflow.add_edge("Trader", "Risky Analyst")
-        workflow.add_conditional_edges(
-            "Risky Analyst",
-            self.conditional_logic.should_continue_risk_analysis,
-            {
-                "Safe Analyst": "Safe Analyst",
-                "Risk Judge": "Risk Judge",
-            },
-        )
-        workflow.add_conditional_edges(
-            "Safe Analyst",
-            self.conditional_logic.should_continue_risk_analysis,
-            {
-                "Neutral Analyst": "Neutral Analyst",
-                "Risk Judge": "Risk Judge",
-            },
-        )
-        workflow.add_conditional_edges(
-            "Neutral Analyst",
-            self.conditional_logic.should_continue_risk_analysis,
-            {
-                "Risky Analyst": "Risky Analyst",
-                "Risk Judge": "Risk Judge",
-            },
-        )
+        risk_debaters = ["Risky Analyst", "Safe Analyst", "Neutral Analyst"]
+        if parallel_risk_debate:
+            # Round-synchronous debate: the three debaters answer the previous round
+            # concurrently and the join node merges their replies
+            for debater in risk_debaters:
+                workflow.add_edge("Trader", debater)
+            workflow.add_edge(risk_debaters, "Risk Round Join")
+            workflow.add_conditional_edges(
+                "Risk Round Join",
+                self.conditional_logic.should_continue_risk_round,
+                risk_debaters + ["Risk Judge"],
+            )
+        else:
+            workflow.add_edge("Trader", "Risky Analyst")
+            workflow.add_conditional_edges(
+                "Risky Analyst",
+                self.conditional_logic.should_continue_risk_analysis,
+                {
+                    "Safe Analyst": "Safe Analyst",
+                    "Risk Judge": "Risk Judge",
+                },
+            )
+            workflow.add_conditional_edges(
+                "Safe Analyst",
+                self.conditional_logic.should_continue_risk_analysis,
+                {
+                    "Neutral Analyst": "Neutral Analyst",
+                    "Risk Judge": "Risk Judge",
+                },
+            )
+            workflow.add_conditional_edges(
+                "Neutral Analyst",
+                self.conditional_logic.should_continue_risk_analysis,
+                {
+                    "Risky Analyst": "Risky Analyst",
+                    "Risk Judge": "Risk Judge",
+                },
+            )
 
         workflow.add_edge("Risk Judge", END)
 
         # Compile and return
-        return workflow.compile()
+        return workflow.compile(checkpointer=checkpointer)
@@ -1,12 +1,53 @@
 # TradingAgents/graph/signal_processing.py
 
+import re
+from typing import Optional
+
 from langchain_openai import ChatOpenAI
 
+from tradingagents.agents.utils.decision_trailer import parse_decision_trailer
+
 # 导入统一日志系统和图处理模块日志装饰器
 from tradingagents.utils.logging_init import get_logger
 from tradingagents.utils.tool_logging import log_graph_module
 logger = get_logger("graph.signal_processing")
 
+# 投资建议的各种写法
+ACTION_ALIASES = {
+    '买入': '买入', '增持': '买入', '购买': '买入', 'buy': '买入', 'purchase': '买入',
+    '持有': '持有', '观望': '持有', '保持': '持有', 'hold': '持有', 'keep': '持有',
+    '卖出': '卖出', '减持': '卖出', '出售': '卖出', 'sell': '卖出', 'dispose': '卖出',
+}
+
+# 带标签的明确表述，如 "最终建议：买入"、"FINAL TRANSACTION PROPOSAL: **BUY**"
+_ACTION_PATTERN = re.compile(
+    r'(?:(?:最终|投资|交易)?(?:建议|决策|决定|推荐|行动|操作)|FINAL TRANSACTION PROPOSAL|Recommendation)'
+    r'\s*[：:]\s*[*#\s]*(买入|卖出|持有|增持|减持|BUY|SELL|HOLD)',
+    re.IGNORECASE,
+)
+
+# 带标签的目标价，支持区间（取中值）和货币标记；后面紧跟年/月/日或%的数字不是价格
+_CURRENCY = r'(HK\$|US\$|[¥￥$])?'
+_PRICE = r'(\d+(?:\.\d+)?)(?!\d|\.\d|\s*[年月日号%])'
+_TARGET_PRICE_PATTERN = re.compile(
+    r'(?:目标价[位格]?|target\s*price)[*\s]*(?:为|是|[：:])?[*\s]*' + _CURRENCY +
+    r'\s*' + _PRICE + r'(?:\s*[-~～至到]\s*' + _CURRENCY + r'\s*' + _PRICE + r')?\s*(港元|港币|美元|人民币|元)?',
+    re.IGNORECASE,
+)
+
+# 货币标记 -> 货币符号（与 StockUtils.get_currency_info 一致）
+_CURRENCY_MARKERS = {
+    '¥': '¥', '￥': '¥', '元': '¥', '人民币': '¥',
+    '$': '$', 'US$': '$', '美元': '$',
+    'HK$': 'HK$', '港元': 'HK$', '港币': 'HK$',
+}
+
+# 置信度/风险评分：数值，可带 % 或 "/10" 这样的分母
+_SCORE = r'[*\s]*[：:]?[*\s]*(\d+(?:\.\d+)?)\s*(?:(%)|/\s*(\d+(?:\.\d+)?))?'
+_CONFIDENCE_PATTERN = re.compile(r'(?:置信度|信心(?:程度|水平)?|confidence)' + _SCORE, re.IGNORECASE)
+_RISK_PATTERN = re.compile(r'(?:风险评分|风险分数|风险得分|risk[_\s]*score)' + _SCORE, re.IGNORECASE)
+_REASONING_PATTERN = re.compile(r'(?:理由|推理|决策依据)[*\s]*[：:][*\s]*([^\n]+)')
+
 
 class SignalProcessor:
     """Processes trading signals to extract actionable decisions."""
@@ -16,13 +57,14 @@ class SignalProcessor:
         self.quick_thinking_llm = quick_thinking_llm
 
     @log_graph_module("signal_processing")
-    def process_signal(self, full_signal: str, stock_symbol: str = None) -> dict:
+    def process_signal(self, full_signal: str, stock_symbol: str = None, decision_summary: Optional[dict] = None) -> dict:
         """
         Process a full trading signal to extract structured decision information.
 
         Args:
             full_signal: Complete trading signal text
             stock_symbol: Stock symbol to determine currency type
+            decision_summary: Decision line already split off by the risk manager (final_decision_summary)
 
         Returns:
             Dictionary containing extracted decision information
@@ -40,6 +82,14 @@ class SignalProcessor:
         logger.info(f"🔍 [SignalProcessor] 处理信号: 股票={stock_symbol}, 市场={market_info['market_name']}, 货币={currency}",
                    extra={'stock_symbol': stock_symbol, 'market': market_info['market_name'], 'currency': currency})
 
+        # 快速路径：决策摘要行或报告中的明确表述已给出投资建议和目标价时，不再调用LLM提取
+        fast_result = self._extract_rule_based(full_signal, currency_symbol, decision_summary)
+        if fast_result is not None:
+            logger.info(f"⚡ [SignalProcessor] 规则提取成功，跳过LLM: {fast_result}",
+                       extra={'action': fast_result['action'], 'target_price': fast_result['target_price'],
+                             'confidence': fast_result['confidence'], 'stock_symbol': stock_symbol})
+            return fast_result
+
         messages = [
             (
                 "system",
@@ -177,6 +227,114 @@ class SignalProcessor:
             # 回退到简单提取
             return self._extract_simple_decision(full_signal)
 
+    @staticmethod
+    def _normalize_action(value) -> Optional[str]:
+        if not isinstance(value, str):
+            return None
+        return ACTION_ALIASES.get(value.strip().strip('*').lower())
+
+    @staticmethod
+    def _to_ratio(value, percent: bool = False, denominator=None) -> Optional[float]:
+        """
+        把 0.72 / "72%" / "7/10" 统一为 0-1 之间的小数
+
+        没有 % 也没有分母的大于1的数值（如 7 可能是 7/10，也可能是 7%）无法确定含义，返回 None
+        """
+        try:
+            if isinstance(value, str):
+                value = value.strip()
+                if '/' in value:
+                    value, denominator = value.split('/', 1)
+                percent = percent or value.endswith('%')
+                value = value.rstrip('%').strip()
+            ratio = float(value)
+            if denominator:
+                ratio /= float(denominator)
+            elif percent:
+                ratio /= 100
+        except (TypeError, ValueError, ZeroDivisionError):
+            return None
+        return ratio if 0 <= ratio <= 1 else None
+
+    def _match_ratio(self, trailer_value, pattern, text):
+        """
+        决策摘要行或正文中的比例字段
+
+        Returns:
+            (是否出现, 0-1之间的小数)；出现但无法换算时小数为 None
+        """
+        if trailer_value is not None:
+            return True, self._to_ratio(trailer_value)
+        match = pattern.search(text)
+        if not match:
+            return False, None
+        return True, self._to_ratio(match.group(1), bool(match.group(2)), match.group(3))
+
+    @staticmethod
+    def _to_price(value) -> Optional[float]:
+        if isinstance(value, str):
+            value = re.sub(r'HK\$|US\$|[¥￥$,]|港元|港币|美元|人民币|元', '', value).strip()
+        try:
+            price = float(value)
+        except (TypeError, ValueError):
+            return None
+        return price if price > 0 else None
+
+    @staticmethod
+    def _match_action(text: str) -> Optional[str]:
+        """带标签的投资建议；多处表述不一致时视为无法确定"""
+        actions = {ACTION_ALIASES[match.lower()] for match in _ACTION_PATTERN.findall(text)}
+        return actions.pop() if len(actions) == 1 else None
+
+    @staticmethod
+    def _match_target_price(text: str, currency_symbol: str) -> Optional[float]:
+        """带标签的目标价；货币标记与股票计价货币不一致的匹配被忽略"""
+        for low_marker, low, high_marker, high, unit in _TARGET_PRICE_PATTERN.findall(text):
+            markers = {_CURRENCY_MARKERS[m] for m in (low_marker, high_marker, unit) if m}
+            if currency_symbol in _CURRENCY_MARKERS.values() and markers and markers != {currency_symbol}:
+                continue
+            price = float(low) if not high else (float(low) + float(high)) / 2
+            if price > 0:
+                return round(price, 2)
+        return None
+
+    def _extract_rule_based(self, text: str, currency_symbol: str, decision_summary: Optional[dict] = None) -> Optional[dict]:
+        """
+        不调用LLM的决策提取：优先解析风险经理的决策摘要行，缺失字段再用规则从正文匹配
+
+        Returns:
+            投资建议和目标价都能确定时返回结果，否则返回 None（交给LLM提取）
+        """
+        if not text:
+            return None
+        trailer = decision_summary or parse_decision_trailer(text) or {}
+
+        action = self._normalize_action(trailer.get('action')) or self._match_action(text)
+        target_price = self._to_price(trailer.get('target_price')) or self._match_target_price(text, currency_symbol)
+        if action is None or target_price is None:
+            logger.debug(f"🔍 [SignalProcessor] 规则提取字段不全 (action={action}, target_price={target_price})，使用LLM提取")
+            return None
+
+        has_confidence, confidence = self._match_ratio(trailer.get('confidence'), _CONFIDENCE_PATTERN, text)
+        has_risk_score, risk_score = self._match_ratio(trailer.get('risk_score'), _RISK_PATTERN, text)
+        if (has_confidence and confidence is None) or (has_risk_score and risk_score is None):
+            # 给出了数值但无法确定刻度，不猜测，交给LLM提取
+            logger.debug(f"🔍 [SignalProcessor] 置信度/风险评分刻度不明确，使用LLM提取")
+            return None
+
+        reasoning = trailer.get('reasoning')
+        if not reasoning:
+            match = _REASONING_PATTERN.search(text)
+            reasoning = match.group(1).strip()[:200] if match else '基于综合分析的投资建议'
+
+        return {
+            'action': action,
+            'target_price': target_price,
+            'confidence': confidence if confidence is not None else 0.7,
+            'risk_score': risk_score if risk_score is not None else 0.5,
+            'reasoning': reasoning,
+        }
+
     def _smart_price_estimation(self, text: str, action: str, is_china: bool) -> float:
         """智能价格推算方法"""
         import re
@@ -0,0 +1,151 @@
+# TradingAgents/graph/tool_memo.py
+
+import contextvars
+import inspect
+import json
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from langchain_core.tools import StructuredTool
+
+# 导入统一日志系统
+from tradingagents.utils.logging_init import get_logger
+logger = get_logger("default")
+
+
+class ToolResultMemo:
+    """Thread-safe memo of tool results; concurrent calls with the same key compute once."""
+
+    def __init__(self, name: str = "tools"):
+        self.name = name
+        self._results: Dict[str, Any] = {}
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # 等待其他线程正在进行的相同调用的次数（并发去重）
+        self.inflight_waits = 0
+        self._tool_hits = Counter()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], tool_name: Optional[str] = None) -> Any:
+        while True:
+            with self._lock:
+                if key in self._results:
+                    self.hits += 1
+                    if tool_name:
+                        self._tool_hits[tool_name] += 1
+                    return self._results[key]
+                event = self._inflight.get(key)
+                if event is None:
+                    event = threading.Event()
+                    self._inflight[key] = event
+                    self.misses += 1
+                    break
+                self.inflight_waits += 1
+            # 其他线程正在获取相同数据，等待其结果
+            event.wait()
+
+        try:
+            result = compute()
+            with self._lock:
+                self._results[key] = result
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "entries": len(self._results),
+                "hits": self.hits,
+                "misses": self.misses,
+                "inflight_waits": self.inflight_waits,
+                "hits_by_tool": dict(self._tool_hits),
+            }
+
+
+# 当前作用域内生效的工具缓存（LangGraph/LangChain 的线程池会复制上下文）
+# 单次运行内所有工具共用 run 缓存；批量分析中与个股无关的工具再共用 shared 缓存
+_run_tool_memo: contextvars.ContextVar = contextvars.ContextVar("run_tool_memo", default=None)
+_shared_tool_memo: contextvars.ContextVar = contextvars.ContextVar("shared_tool_memo", default=None)
+
+
+@contextmanager
+def run_tool_memo_scope(name: str = "run"):
+    """Activate a fresh tool-result memo for one graph run (shared by all analysts of the run)."""
+    memo = ToolResultMemo(name)
+    token = _run_tool_memo.set(memo)
+    try:
+        yield memo
+    finally:
+        _run_tool_memo.reset(token)
+
+
+@contextmanager
+def shared_tool_memo_scope(memo: Optional[ToolResultMemo] = None):
+    """Activate a tool-result memo for the current context (e.g. one batch of tickers)."""
+    memo = memo or ToolResultMemo()
+    token = _shared_tool_memo.set(memo)
+    try:
+        yield memo
+    finally:
+        _shared_tool_memo.reset(token)
+
+
+def _normalize_args(signature: Optional[inspect.Signature], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """补全默认参数并去掉字符串首尾空白，使等价调用得到相同的键"""
+    if signature is not None:
+        try:
+            bound = signature.bind_partial(**kwargs)
+            bound.apply_defaults()
+            kwargs = dict(bound.arguments)
+        except TypeError:
+            pass
+    return {key: value.strip() if isinstance(value, str) else value for key, value in kwargs.items()}
+
+
+def memoize_tool(tool: StructuredTool, shared: bool = False) -> StructuredTool:
+    """
+    Wrap a tool so identical calls (tool name + normalized arguments) reuse one result.
+
+    Args:
+        tool: Toolkit tool
+        shared: Also reuse results across the runs of one shared_tool_memo_scope
+            (only for tools whose output does not depend on the ticker)
+    """
+    func = tool.func
+    try:
+        signature = inspect.signature(func)
+    except (TypeError, ValueError):
+        signature = None
+
+    def memoized(**kwargs):
+        run_memo = _run_tool_memo.get()
+        shared_memo = _shared_tool_memo.get() if shared else None
+        if run_memo is None and shared_memo is None:
+            return func(**kwargs)
+
+        args = _normalize_args(signature, kwargs)
+        key = f"{tool.name}:{json.dumps(args, sort_keys=True, ensure_ascii=False, default=str)}"
+
+        def compute():
+            if shared_memo is None:
+                return func(**kwargs)
+            return shared_memo.get_or_compute(key, lambda: func(**kwargs), tool.name)
+
+        if run_memo is None:
+            return compute()
+        return run_memo.get_or_compute(key, compute, tool.name)
+
+    return StructuredTool.from_function(
+        func=memoized,
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+        return_direct=tool.return_direct,
+    )
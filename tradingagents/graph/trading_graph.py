@@ -1,10 +1,16 @@
 # TradingAgents/graph/trading_graph.py
 
 import os
+import uuid
+import hashlib
+import threading
+import contextvars
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 import json
 from datetime import date
-from typing import Dict, Any, Tuple, List, Optional
+from typing import Dict, Any, Iterable, Iterator, Tuple, List, Optional
 
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
@@ -15,7 +21,7 @@ from langgraph.prebuilt import ToolNode
 
 from tradingagents.agents import *
 from tradingagents.default_config import DEFAULT_CONFIG
-from tradingagents.agents.utils.memory import FinancialSituationMemory
+from tradingagents.agents.utils.memory import FinancialSituationMemory, embedding_memo_scope
 
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
@@ -29,12 +35,19 @@ from tradingagents.agents.utils.agent_states import (
     RiskDebateState,
 )
 from tradingagents.dataflows.interface import set_config
+from tradingagents.dataflows.config import run_config_scope
+from tradingagents.dataflows.run_data_context import RunDataContext, get_run_data_context, run_data_scope
 
 from .conditional_logic import ConditionalLogic
 from .setup import GraphSetup
+from .checkpointing import get_checkpointer, prune_checkpoints
 from .propagation import Propagator
 from .reflection import Reflector
 from .signal_processing import SignalProcessor
+from .tool_memo import ToolResultMemo, memoize_tool, run_tool_memo_scope, shared_tool_memo_scope
+
+# 与个股无关的市场/宏观新闻，在批量分析中各股票共享同一份结果
+BATCH_SHARED_TOOLS = {"get_market_news", "get_global_news_openai", "get_reddit_news"}
 
 
 class TradingAgentsGraph:
@@ -157,7 +170,11 @@ class TradingAgentsGraph:
         self.tool_nodes = self._create_tool_nodes()
 
         # Initialize components
-        self.conditional_logic = ConditionalLogic()
+        # 辩论轮数来自配置（研究深度3-5级为多轮辩论）
+        self.conditional_logic = ConditionalLogic(
+            self.config.get("max_debate_rounds", 1),
+            self.config.get("max_risk_discuss_rounds", 1),
+        )
         self.graph_setup = GraphSetup(
             self.quick_thinking_llm,
             self.deep_thinking_llm,
@@ -173,7 +190,7 @@ class TradingAgentsGraph:
             getattr(self, 'react_llm', None),
         )
 
-        self.propagator = Propagator()
+        self.propagator = Propagator(self.config.get("max_recur_limit", 100))
         self.reflector = Reflector(self.quick_thinking_llm)
         self.signal_processor = SignalProcessor(self.quick_thinking_llm)
 
@@ -181,113 +198,345 @@ class TradingAgentsGraph:
         self.curr_state = None
         self.ticker = None
         self.log_states_dict = {}  # date to full state dict
+        # 工具调用去重统计：最近一次 propagate 的统计与本实例所有运行的累计值
+        self.last_tool_memo_stats = None
+        self._tool_memo_totals = Counter()
+        self._tool_memo_hits_by_tool = Counter()
+        self._tool_memo_lock = threading.Lock()
+        self._batch_log_states = {}  # ticker to (date to full state dict), used by propagate_many
+        self._log_lock = threading.Lock()
 
         # Set up the graph
-        self.graph = self.graph_setup.setup_graph(selected_analysts)
+        self.checkpointer = get_checkpointer(self.config)
+        self.graph = self.graph_setup.setup_graph(selected_analysts, checkpointer=self.checkpointer)
+        # 检查点只能由相同分析师组合与配置的图续跑（写入初始状态，续跑时校验）
+        self.run_fingerprint = hashlib.sha1(
+            json.dumps([list(selected_analysts), self.config], sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
 
     def _create_tool_nodes(self) -> Dict[str, ToolNode]:
-        """Create tool nodes for different data sources."""
+        """Create tool nodes for different data sources.
+
+        Every tool is memoized per run, so identical calls from different analysts
+        (or repeated calls in one tool loop) hit the data source once.
+        """
+        tools = {
+            "market": [
+                # 统一工具
+                self.toolkit.get_stock_market_data_unified,
+                # online tools
+                self.toolkit.get_YFin_data_online,
+                self.toolkit.get_stockstats_indicators_report_online,
+                # offline tools
+                self.toolkit.get_YFin_data,
+                self.toolkit.get_stockstats_indicators_report,
+            ],
+            "social": [
+                # online tools
+                self.toolkit.get_stock_news_openai,
+                # offline tools
+                self.toolkit.get_reddit_stock_info,
+            ],
+            "news": [
+                # online tools
+                self.toolkit.get_realtime_stock_news,
+                self.toolkit.get_company_news,
+                self.toolkit.get_market_news,
+                self.toolkit.get_global_news_openai,
+                self.toolkit.get_google_news,
+                # offline tools
+                self.toolkit.get_finnhub_news,
+                self.toolkit.get_reddit_news,
+            ],
+            "fundamentals": [
+                # 统一工具
+                self.toolkit.get_stock_fundamentals_unified,
+                # offline tools
+                self.toolkit.get_finnhub_company_insider_sentiment,
+                self.toolkit.get_finnhub_company_insider_transactions,
+                self.toolkit.get_simfin_balance_sheet,
+                self.toolkit.get_simfin_cashflow,
+                self.toolkit.get_simfin_income_stmt,
+            ],
+        }
         return {
-            "market": ToolNode(
-                [
-                    # 统一工具
-                    self.toolkit.get_stock_market_data_unified,
-                    # online tools
-                    self.toolkit.get_YFin_data_online,
-                    self.toolkit.get_stockstats_indicators_report_online,
-                    # offline tools
-                    self.toolkit.get_YFin_data,
-                    self.toolkit.get_stockstats_indicators_report,
-                ]
-            ),
-            "social": ToolNode(
-                [
-                    # online tools
-                    self.toolkit.get_stock_news_openai,
-                    # offline tools
-                    self.toolkit.get_reddit_stock_info,
-                ]
-            ),
-            "news": ToolNode(
-                [
-                    # online tools
-                    self.toolkit.get_realtime_stock_news,
-                    self.toolkit.get_company_news,
-                    self.toolkit.get_market_news,
-                    self.toolkit.get_global_news_openai,
-                    self.toolkit.get_google_news,
-                    # offline tools
-                    self.toolkit.get_finnhub_news,
-                    self.toolkit.get_reddit_news,
-                ]
-            ),
-            "fundamentals": ToolNode(
-                [
-                    # 统一工具
-                    self.toolkit.get_stock_fundamentals_unified,
-                    # offline tools
-                    self.toolkit.get_finnhub_company_insider_sentiment,
-                    self.toolkit.get_finnhub_company_insider_transactions,
-                    self.toolkit.get_simfin_balance_sheet,
-                    self.toolkit.get_simfin_cashflow,
-                    self.toolkit.get_simfin_income_stmt,
-                ]
-            ),
+            analyst: ToolNode([
+                memoize_tool(tool, shared=tool.name in BATCH_SHARED_TOOLS) for tool in analyst_tools
+            ])
+            for analyst, analyst_tools in tools.items()
         }
 
-    def propagate(self, company_name, trade_date):
-        """Run the trading agents graph for a company on a specific date."""
+    def propagate(self, company_name, trade_date, analysis_id=None):
+        """Run the trading agents graph for a company on a specific date.
+
+        With a checkpointer configured, passing the analysis_id of an interrupted
+        run resumes it from the last completed node; without one the run uses a
+        throwaway thread id and its checkpoints are dropped when it ends.
+        """
+
+        self.ticker = company_name
+        logger.debug(f"🔍 [GRAPH DEBUG] 设置self.ticker: '{self.ticker}'")
+
+        final_state, self.last_tool_memo_stats = self._run_graph(company_name, trade_date, analysis_id)
+
+        # Store current state for reflection
+        self.curr_state = final_state
+
+        # Log state
+        self._log_state(trade_date, final_state, analysis_id=analysis_id)
+
+        # Return decision and processed signal
+        return final_state, self.process_signal(
+            final_state["final_trade_decision"], company_name, final_state.get("final_decision_summary")
+        )
+
+    def propagate_isolated(self, company_name, trade_date, analysis_id=None):
+        """Run the graph like propagate, without touching per-instance run state.
+
+        Safe to call concurrently on a shared instance (e.g. from a graph pool);
+        the result is not stored in curr_state, so reflect_and_remember does not apply.
+        """
+        final_state, decision, _ = self._propagate_with_stats(company_name, trade_date, analysis_id)
+        return final_state, decision
+
+    def _propagate_with_stats(self, company_name, trade_date, analysis_id=None):
+        """propagate_isolated that also returns the run's tool memo stats."""
+        final_state, tool_stats = self._run_graph(company_name, trade_date, analysis_id)
+        self._log_state(trade_date, final_state, ticker=company_name, analysis_id=analysis_id)
+        decision = self.process_signal(
+            final_state["final_trade_decision"], company_name, final_state.get("final_decision_summary")
+        )
+        return final_state, decision, tool_stats
+
+    def propagate_many(
+        self,
+        tickers: Iterable[str],
+        trade_date,
+        max_concurrency: int = 4,
+        run_data: Optional[RunDataContext] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Run the graph for many tickers on a bounded worker pool.
+
+        LLM clients, the toolkit, memories and ticker-independent tool results
+        (market / global news) are shared across runs. Results are yielded as
+        each ticker finishes, not in input order.
+
+        Args:
+            tickers: Ticker symbols (duplicates are analysed once)
+            trade_date: Trading date shared by all runs
+            max_concurrency: Maximum number of tickers analysed at the same time
+            run_data: Prefetched data handed to the runs (see run_data_scope);
+                defaults to the one bound in the calling context
+
+        Yields:
+            dict with "ticker", "state", "decision", "error" (None on success) and
+            "tool_stats" (the run's duplicate tool calls avoided, see get_tool_memo_stats);
+            calls avoided through the batch-wide memo are reported by get_tool_memo_stats
+            once the batch finishes
+        """
+        tickers = list(dict.fromkeys(tickers))
+        if not tickers:
+            return
+
+        memo = ToolResultMemo("batch")
+        run_data = run_data if run_data is not None else get_run_data_context()
+
+        def run_one(ticker):
+            with shared_tool_memo_scope(memo), run_data_scope(run_data):
+                return self._propagate_with_stats(ticker, trade_date)
+
+        workers = max(1, min(max_concurrency, len(tickers)))
+        logger.info(f"🚀 [批量分析] {len(tickers)} 只股票, 并发数 {workers}, 日期 {trade_date}")
+
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="propagate")
+        try:
+            futures = {
+                pool.submit(contextvars.copy_context().run, run_one, ticker): ticker
+                for ticker in tickers
+            }
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    final_state, decision, tool_stats = future.result()
+                    yield {"ticker": ticker, "state": final_state, "decision": decision, "error": None,
+                           "tool_stats": tool_stats}
+                except Exception as e:
+                    logger.error(f"❌ [批量分析] {ticker} 分析失败: {e}", exc_info=True)
+                    yield {"ticker": ticker, "state": None, "decision": None, "error": str(e), "tool_stats": None}
+        finally:
+            # 调用方提前停止迭代时不再启动排队中的任务
+            pool.shutdown(wait=True, cancel_futures=True)
+            shared_stats = memo.get_stats()
+            self._record_tool_memo_stats(shared_stats, runs=0)
+            logger.info(f"📊 [批量分析] 共享工具结果: {shared_stats}")
+
+    def _resume_input(self, company_name, trade_date, args):
+        """Decide how to (re)start a checkpointed run.
+
+        Returns None to resume an interrupted run, the saved values if the run
+        already finished, or an empty dict to start from scratch.
+        """
+        thread_id = args["config"]["configurable"]["thread_id"]
+        snapshot = self.graph.get_state(args["config"])
+        if not snapshot.values:
+            return {}
+
+        values = snapshot.values
+        if values.get("company_of_interest") != company_name or values.get("trade_date") != str(trade_date):
+            # 同一分析ID换了股票或日期，旧检查点不再适用
+            logger.warning(f"⚠️ [检查点] 分析ID {thread_id} 的检查点属于 "
+                           f"{values.get('company_of_interest')}@{values.get('trade_date')}，重新开始")
+            self.checkpointer.delete_thread(thread_id)
+            return {}
+
+        if values.get("run_fingerprint") != self.run_fingerprint:
+            # 同一分析ID换了分析师、研究深度或模型，旧检查点的中间结果不再适用
+            logger.warning(f"⚠️ [检查点] 分析ID {thread_id} 的检查点来自不同的分析配置，重新开始")
+            self.checkpointer.delete_thread(thread_id)
+            return {}
+
+        if snapshot.next:
+            logger.info(f"♻️ [检查点] 分析 {thread_id} 从 {list(snapshot.next)} 继续")
+            return None
+
+        logger.info(f"♻️ [检查点] 分析 {thread_id} 已完成，直接使用保存的结果")
+        return values
+
+    def discard_checkpoint(self, analysis_id):
+        """Drop the saved checkpoints of a finished analysis."""
+        if self.checkpointer is not None and analysis_id:
+            try:
+                self.checkpointer.delete_thread(analysis_id)
+            except Exception as e:
+                logger.warning(f"⚠️ [检查点] 清理分析 {analysis_id} 的检查点失败: {e}")
+
+    def _record_tool_memo_stats(self, stats, runs=1):
+        """Add one memo's counts to the per-instance totals."""
+        with self._tool_memo_lock:
+            self._tool_memo_totals["runs"] += runs
+            self._tool_memo_totals["calls"] += stats["hits"] + stats["misses"]
+            self._tool_memo_totals["executed"] += stats["misses"]
+            self._tool_memo_totals["memo_hits"] += stats["hits"]
+            self._tool_memo_totals["inflight_dedup"] += stats["inflight_waits"]
+            self._tool_memo_hits_by_tool.update(stats["hits_by_tool"])
+
+    def get_tool_memo_stats(self):
+        """Duplicate tool calls avoided across all runs of this graph.
+
+        Returns:
+            dict with "runs", "calls" (tool calls made by analysts), "executed"
+            (calls that reached the data source), "memo_hits" (calls served from
+            a memo, including batch-wide shared results), "inflight_dedup" (calls
+            that waited for an identical call already in flight) and "hits_by_tool"
+        """
+        with self._tool_memo_lock:
+            totals = {key: self._tool_memo_totals[key]
+                      for key in ("runs", "calls", "executed", "memo_hits", "inflight_dedup")}
+            totals["hits_by_tool"] = dict(self._tool_memo_hits_by_tool)
+            return totals
+
+    def _run_graph(self, company_name, trade_date, analysis_id=None):
+        """Invoke the compiled graph for one ticker.
+
+        Returns:
+            (final_state, tool_stats): tool_stats are the run's memo counts
+            ("calls", "executed", "memo_hits", "inflight_dedup", "hits_by_tool")
+        """
 
         # 添加详细的接收日志
         logger.debug(f"🔍 [GRAPH DEBUG] ===== TradingAgentsGraph.propagate 接收参数 =====")
         logger.debug(f"🔍 [GRAPH DEBUG] 接收到的company_name: '{company_name}' (类型: {type(company_name)})")
         logger.debug(f"🔍 [GRAPH DEBUG] 接收到的trade_date: '{trade_date}' (类型: {type(trade_date)})")
 
-        self.ticker = company_name
-        logger.debug(f"🔍 [GRAPH DEBUG] 设置self.ticker: '{self.ticker}'")
-
         # Initialize state
         logger.debug(f"🔍 [GRAPH DEBUG] 创建初始状态，传递参数: company_name='{company_name}', trade_date='{trade_date}'")
         init_agent_state = self.propagator.create_initial_state(
-            company_name, trade_date
+            company_name, trade_date, run_fingerprint=self.run_fingerprint
         )
         logger.debug(f"🔍 [GRAPH DEBUG] 初始状态中的company_of_interest: '{init_agent_state.get('company_of_interest', 'NOT_FOUND')}'")
         logger.debug(f"🔍 [GRAPH DEBUG] 初始状态中的trade_date: '{init_agent_state.get('trade_date', 'NOT_FOUND')}'")
-        args = self.propagator.get_graph_args()
-
-        if self.debug:
-            # Debug mode with tracing
-            trace = []
-            for chunk in self.graph.stream(init_agent_state, **args):
-                if len(chunk["messages"]) == 0:
-                    pass
+
+        graph_input = init_agent_state
+        thread_id = None
+        if self.checkpointer is not None:
+            # 失败后未再续跑的分析不会被 discard_checkpoint 清理，按保留策略定期清理
+            prune_checkpoints(self.checkpointer, self.config)
+            if analysis_id:
+                thread_id = analysis_id
+            else:
+                # 带检查点的图必须提供thread_id：未指定分析ID时使用一次性的ID，运行结束后清理
+                thread_id = f"ephemeral-{uuid.uuid4().hex}"
+        args = self.propagator.get_graph_args(thread_id)
+
+        if analysis_id and thread_id:
+            saved = self._resume_input(company_name, trade_date, args)
+            if saved:
+                return saved, {"calls": 0, "executed": 0, "memo_hits": 0, "inflight_dedup": 0, "hits_by_tool": {}}
+            if saved is None:
+                graph_input = None
+
+        try:
+            # 各研究员/经理检索记忆时使用同一段situation，本次运行内只向量化一次；
+            # 各分析师相同参数的工具调用在本次运行内只执行一次
+            # 数据接口读取本图的配置（图复用池中不同配置的图可能并发运行）
+            with run_config_scope(self.config), embedding_memo_scope(), \
+                    run_tool_memo_scope(f"run:{company_name}") as tool_memo:
+                if self.debug:
+                    # Debug mode with tracing
+                    trace = []
+                    for chunk in self.graph.stream(graph_input, **args):
+                        if len(chunk["messages"]) == 0:
+                            pass
+                        else:
+                            chunk["messages"][-1].pretty_print()
+                            trace.append(chunk)
+
+                    final_state = trace[-1]
                 else:
-                    chunk["messages"][-1].pretty_print()
-                    trace.append(chunk)
+                    # Standard mode without tracing
+                    final_state = self.graph.invoke(graph_input, **args)
+        finally:
+            if thread_id and not analysis_id:
+                # 一次性ID无法用来续跑，成功或失败都不保留检查点
+                self.discard_checkpoint(thread_id)
+
+        stats = tool_memo.get_stats()
+        self._record_tool_memo_stats(stats)
+        logger.info(
+            f"📊 [工具缓存] {company_name} 本次运行: 工具调用 {stats['hits'] + stats['misses']} 次, "
+            f"实际执行 {stats['misses']} 次, 去重 {stats['hits']} 次（其中等待进行中的相同调用 "
+            f"{stats['inflight_waits']} 次） {stats['hits_by_tool'] or ''}"
+        )
 
-            final_state = trace[-1]
-        else:
-            # Standard mode without tracing
-            final_state = self.graph.invoke(init_agent_state, **args)
+        return final_state, {
+            "calls": stats["hits"] + stats["misses"],
+            "executed": stats["misses"],
+            "memo_hits": stats["hits"],
+            "inflight_dedup": stats["inflight_waits"],
+            "hits_by_tool": stats["hits_by_tool"],
+        }
 
-        # Store current state for reflection
-        self.curr_state = final_state
+    def _log_state(self, trade_date, final_state, ticker=None, analysis_id=None):
+        """Log the final state to a JSON file.
 
-        # Log state
-        self._log_state(trade_date, final_state)
-
-        # Return decision and processed signal
-        return final_state, self.process_signal(final_state["final_trade_decision"], company_name)
+        Runs with an analysis_id get their own file, so concurrent runs of the
+        same ticker and date do not overwrite each other.
+        """
+        if analysis_id:
+            ticker, log_states = ticker or self.ticker, {}
+        elif ticker is None:
+            ticker, log_states = self.ticker, self.log_states_dict
+        else:
+            log_states = self._batch_log_states.setdefault(ticker, {})
 
-    def _log_state(self, trade_date, final_state):
-        """Log the final state to a JSON file."""
-        self.log_states_dict[str(trade_date)] = {
+        entry = {
             "company_of_interest": final_state["company_of_interest"],
             "trade_date": final_state["trade_date"],
             "market_report": final_state["market_report"],
             "sentiment_report": final_state["sentiment_report"],
             "news_report": final_state["news_report"],
             "fundamentals_report": final_state["fundamentals_report"],
+            "research_brief": final_state.get("research_brief", ""),
             "investment_debate_state": {
                 "bull_history": final_state["investment_debate_state"]["bull_history"],
                 "bear_history": final_state["investment_debate_state"]["bear_history"],
@@ -312,33 +561,44 @@ class TradingAgentsGraph:
         }
 
         # Save to file
-        directory = Path(f"eval_results/{self.ticker}/TradingAgentsStrategy_logs/")
+        directory = Path(f"eval_results/{ticker}/TradingAgentsStrategy_logs/")
         directory.mkdir(parents=True, exist_ok=True)
+        file_name = f"full_states_log_{analysis_id}.json" if analysis_id else "full_states_log.json"
 
-        with open(
-            f"eval_results/{self.ticker}/TradingAgentsStrategy_logs/full_states_log.json",
-            "w",
-        ) as f:
-            json.dump(self.log_states_dict, f, indent=4)
+        # 批量/并发运行共用同一个字典和文件时串行写入
+        with self._log_lock:
+            log_states[str(trade_date)] = entry
+            with open(directory / file_name, "w") as f:
+                json.dump(log_states, f, indent=4)
 
     def reflect_and_remember(self, returns_losses):
-        """Reflect on decisions and update memory based on returns."""
-        self.reflector.reflect_bull_researcher(
-            self.curr_state, returns_losses, self.bull_memory
-        )
-        self.reflector.reflect_bear_researcher(
-            self.curr_state, returns_losses, self.bear_memory
-        )
-        self.reflector.reflect_trader(
-            self.curr_state, returns_losses, self.trader_memory
-        )
-        self.reflector.reflect_invest_judge(
-            self.curr_state, returns_losses, self.invest_judge_memory
-        )
-        self.reflector.reflect_risk_manager(
-            self.curr_state, returns_losses, self.risk_manager_memory
+        """Reflect on decisions and update memory based on returns.
+
+        The five component reflections run concurrently; returns once all memories are written.
+        """
+        return self.reflector.reflect_all(
+            self.curr_state,
+            returns_losses,
+            {
+                "bull": self.bull_memory,
+                "bear": self.bear_memory,
+                "trader": self.trader_memory,
+                "invest_judge": self.invest_judge_memory,
+                "risk_manager": self.risk_manager_memory,
+            },
         )
 
-    def process_signal(self, full_signal, stock_symbol=None):
+    def compact_memories(self, threshold=None):
+        """Merge near-duplicate situations in every memory collection."""
+        memories = {
+            "bull": self.bull_memory,
+            "bear": self.bear_memory,
+            "trader": self.trader_memory,
+            "invest_judge": self.invest_judge_memory,
+            "risk_manager": self.risk_manager_memory,
+        }
+        return {key: memory.compact(threshold) for key, memory in memories.items() if memory is not None}
+
+    def process_signal(self, full_signal, stock_symbol=None, decision_summary=None):
         """Process a signal to extract the core decision."""
-        return self.signal_processor.process_signal(full_signal, stock_symbol)
+        return self.signal_processor.process_signal(full_signal, stock_symbol, decision_summary)
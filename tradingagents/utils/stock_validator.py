@@ -8,6 +8,8 @@ import re
 from typing import Dict, Tuple, Optional
 from datetime import datetime, timedelta
 
+from tradingagents.dataflows.run_data_context import DEFAULT_PERIOD_DAYS
+
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('stock_validator')
@@ -54,7 +56,7 @@ StockValidationResult = StockDataPreparationResult
 class StockDataPreparer:
     """股票数据预获取和验证器"""
 
-    def __init__(self, default_period_days: int = 30):
+    def __init__(self, default_period_days: int = DEFAULT_PERIOD_DAYS):
         self.timeout_seconds = 15  # 数据获取超时时间
         self.default_period_days = default_period_days  # 默认历史数据时长（天）
     
@@ -259,6 +261,22 @@ class StockDataPreparer:
 
         return "未知"
 
+    def _hand_off(self, stock_code: str, market_type: str, stock_name: str, stock_info,
+                  historical_data: str, start_date: str, end_date: str, source: str):
+        """
+        把已下载的基本信息和行情写入运行数据上下文，分析工具不再重复请求数据源
+
+        source 为获取行情的数据接口名称，只有调用同一接口的工具才会使用这份行情
+        """
+        from tradingagents.dataflows.run_data_context import get_run_data_context
+
+        context = get_run_data_context()
+        meta = {"stock_name": stock_name, "market_type": market_type}
+        if stock_info is not None:
+            context.put("stock_info", stock_code, stock_info, **meta)
+        context.put("price_data", stock_code, historical_data, start_date=start_date, end_date=end_date,
+                    source=source, **meta)
+
     def _prepare_data_by_market(self, stock_code: str, market_type: str,
                                period_days: int, analysis_date: str) -> StockDataPreparationResult:
         """根据市场类型预获取数据"""
@@ -392,7 +410,9 @@ class StockDataPreparer:
                     suggestion="请检查网络连接或数据源配置，或稍后重试"
                 )
 
-            # 3. 数据准备成功
+            # 3. 数据准备成功，交给随后的分析直接使用
+            self._hand_off(stock_code, "A股", stock_name, stock_info, historical_data, start_date_str, end_date_str,
+                           "get_china_stock_data_unified")
             logger.info(f"🎉 [A股数据] 数据准备完成: {stock_code} - {stock_name}")
             return StockDataPreparationResult(
                 is_valid=True,
@@ -560,7 +580,9 @@ class StockDataPreparer:
                         suggestion="数据源可能暂时不可用，请稍后重试或联系技术支持"
                     )
 
-            # 3. 数据准备成功
+            # 3. 数据准备成功，交给随后的分析直接使用
+            self._hand_off(formatted_code, "港股", stock_name, stock_info, historical_data, start_date_str, end_date_str,
+                           "get_hk_stock_data_unified")
             logger.info(f"🎉 [港股数据] 数据准备完成: {formatted_code} - {stock_name}")
             return StockDataPreparationResult(
                 is_valid=True,
@@ -635,7 +657,7 @@ class StockDataPreparer:
                     logger.info(f"✅ [美股数据] 历史数据获取成功: {formatted_code} ({period_days}天)")
                     cache_status = f"历史数据已缓存({period_days}天)"
 
-                    # 数据准备成功
+                    # 美股分析工具使用 get_YFin_data_online（CSV格式），与这里的行情报告格式不同，不交接行情
                     logger.info(f"🎉 [美股数据] 数据准备完成: {formatted_code}")
                     return StockDataPreparationResult(
                         is_valid=True,
@@ -683,7 +705,7 @@ class StockDataPreparer:
 # 全局数据准备器实例
 _stock_preparer = None
 
-def get_stock_preparer(default_period_days: int = 30) -> StockDataPreparer:
+def get_stock_preparer(default_period_days: int = DEFAULT_PERIOD_DAYS) -> StockDataPreparer:
     """获取股票数据准备器实例（单例模式）"""
     global _stock_preparer
     if _stock_preparer is None:
@@ -427,6 +427,19 @@ def capture_screenshot(url):
         return None
 
 
+def create_streaming_markdown_callback(placeholder):
+    """
+    创建 token 回调：把累积的生成文本渲染到 Streamlit 占位符
+    """
+    parts = []
+
+    def on_token(token: str):
+        parts.append(token)
+        placeholder.markdown("".join(parts) + "▌")
+
+    return on_token
+
+
 # 多模态图片解析函数 - 分析图片并提取个股股票代码
 def analyze_image_with_multimodal(image):
     """
@@ -528,12 +541,19 @@ def analyze_image_with_multimodal(image):
                     messages=crag_messages
                 )
 
-                from crag.crag_server import CRAGServer
-                crag_server = CRAGServer(
+                from crag.registry import get_crag_server
+                # 进程内共享已编译的 CRAG 图，避免每张图片都重建索引
+                crag_server = get_crag_server(
                     doc_dir="./document",
                     collection_name="rag-chroma",
                 )
-                crag_document = crag_server.graph.invoke({"question": crag_resp.choices[0].message.content})
+                # 流式展示 CRAG 生成结果，首个 token 到达即开始渲染
+                crag_placeholder = st.empty()
+                crag_document = crag_server.invoke_streaming(
+                    crag_resp.choices[0].message.content,
+                    on_token=create_streaming_markdown_callback(crag_placeholder),
+                )
+                crag_placeholder.empty()
                 crag_report = crag_document["generation"]
 
                 # 显示API调试信息（仅在调试模式）
@@ -684,6 +704,31 @@ def extract_companies_from_text(text):
     return list(dict.fromkeys(companies))
 
 
+def find_resumable_analysis_id(run_key):
+    """
+    查找可续跑的分析ID
+
+    上一次分析（session state / 持久化会话中的分析ID）失败或中断，且股票、市场、日期、分析师、研究深度和模型都与本次相同时，
+    沿用它的ID，分析图会从该ID保存的检查点继续；否则返回 None。
+    """
+    try:
+        previous_id = get_persistent_analysis_id()
+        if not previous_id:
+            return None
+
+        from utils.thread_tracker import check_analysis_status
+        if check_analysis_status(previous_id) != 'failed':
+            return None
+
+        from utils.async_progress_tracker import get_progress_by_id
+        progress_data = get_progress_by_id(previous_id) or {}
+        if progress_data.get('run_key') == run_key:
+            return previous_id
+    except Exception as e:
+        logger.warning(f"⚠️ [续跑] 查找可续跑的分析失败: {e}")
+    return None
+
+
 # 生成最终综合报告
 def generate_final_synthesis_report(image_report, stock_report, crag_report):
     """
@@ -1345,9 +1390,22 @@ def main():
                 st.session_state.final_synthesis_report = ""
                 logger.info("🧹 [新分析] 清空旧的分析结果和综合报告")
 
-                # 生成分析ID
-                import uuid
-                analysis_id = f"analysis_{uuid.uuid4().hex[:8]}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                # 生成分析ID：重试失败或中断的同一分析时沿用原ID，从检查点继续
+                run_key = {
+                    'stock_symbol': form_data['stock_symbol'],
+                    'market_type': form_data.get('market_type', '美股'),
+                    'analysis_date': str(form_data['analysis_date']),
+                    'analysts': list(form_data['analysts']),
+                    'research_depth': form_data['research_depth'],
+                    'llm_provider': config['llm_provider'],
+                    'llm_model': config['llm_model'],
+                }
+                analysis_id = find_resumable_analysis_id(run_key)
+                if analysis_id:
+                    logger.info(f"♻️ [续跑] 沿用中断分析的ID: {analysis_id}")
+                else:
+                    import uuid
+                    analysis_id = f"analysis_{uuid.uuid4().hex[:8]}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
 
                 # 保存分析ID和表单配置到session state和cookie
                 form_config = st.session_state.get('form_config', {})
@@ -1364,7 +1422,8 @@ def main():
                     analysis_id=analysis_id,
                     analysts=form_data['analysts'],
                     research_depth=form_data['research_depth'],
-                    llm_provider=config['llm_provider']
+                    llm_provider=config['llm_provider'],
+                    run_key=run_key
                 )
 
                 # 创建进度回调函数
@@ -1419,7 +1478,8 @@ def main():
                             llm_provider=config['llm_provider'],
                             market_type=form_data.get('market_type', '美股'),
                             llm_model=config['llm_model'],
-                            progress_callback=progress_callback
+                            progress_callback=progress_callback,
+                            analysis_id=analysis_id
                         )
 
                         # 标记分析完成并保存结果
@@ -11,6 +11,7 @@ from dotenv import load_dotenv
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger, get_logger_manager
+from tradingagents.dataflows.run_data_context import DEFAULT_PERIOD_DAYS, RunDataContext, run_data_scope
 logger = get_logger('web')
 
 # 添加项目根目录到Python路径
@@ -97,7 +98,114 @@ def extract_risk_assessment(state):
         logger.info(f"提取风险评估数据时出错: {e}")
         return None
 
-def run_stock_analysis(stock_symbol, analysis_date, analysts, research_depth, llm_provider, llm_model, market_type="美股", progress_callback=None):
+def build_analysis_config(research_depth, llm_provider, llm_model, market_type="美股"):
+    """根据研究深度和LLM提供商生成分析配置（单只与批量分析共用）"""
+    from tradingagents.default_config import DEFAULT_CONFIG
+
+    config = DEFAULT_CONFIG.copy()
+    config["llm_provider"] = llm_provider
+    config["deep_think_llm"] = llm_model
+    config["quick_think_llm"] = llm_model
+    # 根据研究深度调整配置
+    if research_depth == 1:  # 1级 - 快速分析
+        config["max_debate_rounds"] = 1
+        config["max_risk_discuss_rounds"] = 1
+        # 保持内存功能启用，因为内存操作开销很小但能显著提升分析质量
+        config["memory_enabled"] = True
+
+        # 统一使用在线工具，避免离线工具的各种问题
+        config["online_tools"] = True  # 所有市场都使用统一工具
+        logger.info(f"🔧 [快速分析] {market_type}使用统一工具，确保数据源正确和稳定性")
+        if llm_provider == "dashscope":
+            config["quick_think_llm"] = "qwen-turbo-2025-07-15"  # 使用最快模型
+            config["deep_think_llm"] = "qwen-turbo-2025-07-15"
+        elif llm_provider == "deepseek":
+            config["quick_think_llm"] = "deepseek-chat"  # DeepSeek只有一个模型
+            config["deep_think_llm"] = "deepseek-chat"
+    elif research_depth == 2:  # 2级 - 基础分析
+        config["max_debate_rounds"] = 1
+        config["max_risk_discuss_rounds"] = 1
+        config["memory_enabled"] = True
+        config["online_tools"] = True
+        if llm_provider == "dashscope":
+            config["quick_think_llm"] = "qwen-plus"
+            config["deep_think_llm"] = "qwen-plus"
+        elif llm_provider == "deepseek":
+            config["quick_think_llm"] = "deepseek-chat"
+            config["deep_think_llm"] = "deepseek-chat"
+    elif research_depth == 3:  # 3级 - 标准分析 (默认)
+        config["max_debate_rounds"] = 1
+        config["max_risk_discuss_rounds"] = 2
+        config["memory_enabled"] = True
+        config["online_tools"] = True
+        if llm_provider == "dashscope":
+            config["quick_think_llm"] = "qwen-plus"
+            config["deep_think_llm"] = "qwen-max"
+        elif llm_provider == "deepseek":
+            config["quick_think_llm"] = "deepseek-chat"
+            config["deep_think_llm"] = "deepseek-chat"
+    elif research_depth == 4:  # 4级 - 深度分析
+        config["max_debate_rounds"] = 2
+        config["max_risk_discuss_rounds"] = 2
+        config["memory_enabled"] = True
+        config["online_tools"] = True
+        if llm_provider == "dashscope":
+            config["quick_think_llm"] = "qwen-plus"
+            config["deep_think_llm"] = "qwen-max"
+        elif llm_provider == "deepseek":
+            config["quick_think_llm"] = "deepseek-chat"
+            config["deep_think_llm"] = "deepseek-chat"
+    else:  # 5级 - 全面分析
+        config["max_debate_rounds"] = 3
+        config["max_risk_discuss_rounds"] = 3
+        config["memory_enabled"] = True
+        config["online_tools"] = True
+        if llm_provider == "dashscope":
+            config["quick_think_llm"] = "qwen-max"
+            config["deep_think_llm"] = "qwen-max"
+        elif llm_provider == "deepseek":
+            config["quick_think_llm"] = "deepseek-chat"
+            config["deep_think_llm"] = "deepseek-chat"
+
+    if research_depth >= 4:
+        # 多轮辩论时只保留最近2条发言原文，更早的发言按预算压缩为摘要
+        # （保留3条时，2轮牛熊辩论的最后一位辩手只看到3条发言，永远不会触发压缩）
+        config["debate_history_keep_turns"] = min(config.get("debate_history_keep_turns", 3), 2)
+
+    # 根据LLM提供商设置不同的配置
+    if llm_provider == "dashscope":
+        config["backend_url"] = "https://dashscope.aliyuncs.com/api/v1"
+    elif llm_provider == "deepseek":
+        config["backend_url"] = "https://api.deepseek.com"
+    elif llm_provider == "google":
+        # Google AI不需要backend_url，使用默认的OpenAI格式
+        config["backend_url"] = "https://api.openai.com/v1"
+
+    # 修复路径问题
+    config["data_dir"] = str(project_root / "data")
+    config["results_dir"] = str(project_root / "results")
+    config["data_cache_dir"] = str(project_root / "tradingagents" / "dataflows" / "data_cache")
+
+    return config
+
+
+def format_stock_symbol(stock_symbol, market_type="美股"):
+    """根据市场类型调整股票代码格式"""
+    if market_type == "A股":
+        # A股代码不需要特殊处理，保持原样
+        return stock_symbol
+    if market_type == "港股":
+        # 港股代码转为大写，确保.HK后缀
+        formatted_symbol = stock_symbol.upper()
+        if not formatted_symbol.endswith('.HK') and formatted_symbol.isdigit():
+            # 如果是纯数字，添加.HK后缀
+            formatted_symbol = f"{formatted_symbol.zfill(4)}.HK"
+        return formatted_symbol
+    # 美股代码转为大写
+    return stock_symbol.upper()
+
+
+def run_stock_analysis(stock_symbol, analysis_date, analysts, research_depth, llm_provider, llm_model, market_type="美股", progress_callback=None, analysis_id=None):
     """执行股票分析
 
     Args:
@@ -108,6 +216,7 @@ def run_stock_analysis(stock_symbol, analysis_date, analysts, research_depth, ll
         llm_provider: LLM提供商 (dashscope/deepseek/google)
         llm_model: 大模型名称
         progress_callback: 进度回调函数，用于更新UI状态
+        analysis_id: 分析ID，同时作为检查点键；传入中断分析的ID可从最后完成的节点继续
     """
 
     def update_progress(message, step=None, total_steps=None):
@@ -117,7 +226,10 @@ def run_stock_analysis(stock_symbol, analysis_date, analysts, research_depth, ll
         logger.info(f"[进度] {message}")
 
     # 生成会话ID用于Token跟踪和日志关联
-    session_id = f"analysis_{uuid.uuid4().hex[:8]}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    session_id = analysis_id or f"analysis_{uuid.uuid4().hex[:8]}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    # 本次分析的预获取数据交接区
+    run_data = RunDataContext()
 
     # 1. 数据预获取和验证阶段
     update_progress("🔍 验证股票代码并预获取数据...", 1, 10)
@@ -125,13 +237,14 @@ def run_stock_analysis(stock_symbol, analysis_date, analysts, research_depth, ll
     try:
         from tradingagents.utils.stock_validator import prepare_stock_data
 
-        # 预获取股票数据（默认30天历史数据）
-        preparation_result = prepare_stock_data(
-            stock_code=stock_symbol,
-            market_type=market_type,
-            period_days=30,  # 可以根据research_depth调整
-            analysis_date=analysis_date
-        )
+        # 预获取股票数据（默认30天历史数据），交给本次分析的工具使用
+        with run_data_scope(run_data):
+            preparation_result = prepare_stock_data(
+                stock_code=stock_symbol,
+                market_type=market_type,
+                period_days=DEFAULT_PERIOD_DAYS,  # 分析师按同样的区间请求行情
+                analysis_date=analysis_date
+            )
 
         if not preparation_result.is_valid:
             error_msg = f"❌ 股票数据验证失败: {preparation_result.error_message}"
@@ -217,89 +330,11 @@ def run_stock_analysis(stock_symbol, analysis_date, analysts, research_depth, ll
 
     try:
         # 导入必要的模块
-        from tradingagents.graph.trading_graph import TradingAgentsGraph
-        from tradingagents.default_config import DEFAULT_CONFIG
+        from tradingagents.graph.pool import get_graph_pool
 
         # 创建配置
         update_progress("配置分析参数...")
-        config = DEFAULT_CONFIG.copy()
-        config["llm_provider"] = llm_provider
-        config["deep_think_llm"] = llm_model
-        config["quick_think_llm"] = llm_model
-        # 根据研究深度调整配置
-        if research_depth == 1:  # 1级 - 快速分析
-            config["max_debate_rounds"] = 1
-            config["max_risk_discuss_rounds"] = 1
-            # 保持内存功能启用，因为内存操作开销很小但能显著提升分析质量
-            config["memory_enabled"] = True
-
-            # 统一使用在线工具，避免离线工具的各种问题
-            config["online_tools"] = True  # 所有市场都使用统一工具
-            logger.info(f"🔧 [快速分析] {market_type}使用统一工具，确保数据源正确和稳定性")
-            if llm_provider == "dashscope":
-                config["quick_think_llm"] = "qwen-turbo-2025-07-15"  # 使用最快模型
-                config["deep_think_llm"] = "qwen-turbo-2025-07-15"
-            elif llm_provider == "deepseek":
-                config["quick_think_llm"] = "deepseek-chat"  # DeepSeek只有一个模型
-                config["deep_think_llm"] = "deepseek-chat"
-        elif research_depth == 2:  # 2级 - 基础分析
-            config["max_debate_rounds"] = 1
-            config["max_risk_discuss_rounds"] = 1
-            config["memory_enabled"] = True
-            config["online_tools"] = True
-            if llm_provider == "dashscope":
-                config["quick_think_llm"] = "qwen-plus"
-                config["deep_think_llm"] = "qwen-plus"
-            elif llm_provider == "deepseek":
-                config["quick_think_llm"] = "deepseek-chat"
-                config["deep_think_llm"] = "deepseek-chat"
-        elif research_depth == 3:  # 3级 - 标准分析 (默认)
-            config["max_debate_rounds"] = 1
-            config["max_risk_discuss_rounds"] = 2
-            config["memory_enabled"] = True
-            config["online_tools"] = True
-            if llm_provider == "dashscope":
-                config["quick_think_llm"] = "qwen-plus"
-                config["deep_think_llm"] = "qwen-max"
-            elif llm_provider == "deepseek":
-                config["quick_think_llm"] = "deepseek-chat"
-                config["deep_think_llm"] = "deepseek-chat"
-        elif research_depth == 4:  # 4级 - 深度分析
-            config["max_debate_rounds"] = 2
-            config["max_risk_discuss_rounds"] = 2
-            config["memory_enabled"] = True
-            config["online_tools"] = True
-            if llm_provider == "dashscope":
-                config["quick_think_llm"] = "qwen-plus"
-                config["deep_think_llm"] = "qwen-max"
-            elif llm_provider == "deepseek":
-                config["quick_think_llm"] = "deepseek-chat"
-                config["deep_think_llm"] = "deepseek-chat"
-        else:  # 5级 - 全面分析
-            config["max_debate_rounds"] = 3
-            config["max_risk_discuss_rounds"] = 3
-            config["memory_enabled"] = True
-            config["online_tools"] = True
-            if llm_provider == "dashscope":
-                config["quick_think_llm"] = "qwen-max"
-                config["deep_think_llm"] = "qwen-max"
-            elif llm_provider == "deepseek":
-                config["quick_think_llm"] = "deepseek-chat"
-                config["deep_think_llm"] = "deepseek-chat"
-
-        # 根据LLM提供商设置不同的配置
-        if llm_provider == "dashscope":
-            config["backend_url"] = "https://dashscope.aliyuncs.com/api/v1"
-        elif llm_provider == "deepseek":
-            config["backend_url"] = "https://api.deepseek.com"
-        elif llm_provider == "google":
-            # Google AI不需要backend_url，使用默认的OpenAI格式
-            config["backend_url"] = "https://api.openai.com/v1"
-
-        # 修复路径问题
-        config["data_dir"] = str(project_root / "data")
-        config["results_dir"] = str(project_root / "results")
-        config["data_cache_dir"] = str(project_root / "tradingagents" / "dataflows" / "data_cache")
+        config = build_analysis_config(research_depth, llm_provider, llm_model, market_type)
 
         # 确保目录存在
         update_progress("📁 创建必要的目录...")
@@ -317,39 +352,30 @@ def run_stock_analysis(stock_symbol, analysis_date, analysts, research_depth, ll
         logger.debug(f"🔍 [RUNNER DEBUG] 原始股票代码: '{stock_symbol}'")
         logger.debug(f"🔍 [RUNNER DEBUG] 市场类型: '{market_type}'")
 
+        formatted_symbol = format_stock_symbol(stock_symbol, market_type)
         if market_type == "A股":
-            # A股代码不需要特殊处理，保持原样
-            formatted_symbol = stock_symbol
-            logger.debug(f"🔍 [RUNNER DEBUG] A股代码保持原样: '{formatted_symbol}'")
             update_progress(f"🇨🇳 准备分析A股: {formatted_symbol}")
         elif market_type == "港股":
-            # 港股代码转为大写，确保.HK后缀
-            formatted_symbol = stock_symbol.upper()
-            if not formatted_symbol.endswith('.HK'):
-                # 如果是纯数字，添加.HK后缀
-                if formatted_symbol.isdigit():
-                    formatted_symbol = f"{formatted_symbol.zfill(4)}.HK"
             update_progress(f"🇭🇰 准备分析港股: {formatted_symbol}")
         else:
-            # 美股代码转为大写
-            formatted_symbol = stock_symbol.upper()
-            logger.debug(f"🔍 [RUNNER DEBUG] 美股代码转大写: '{stock_symbol}' -> '{formatted_symbol}'")
             update_progress(f"🇺🇸 准备分析美股: {formatted_symbol}")
 
         logger.debug(f"🔍 [RUNNER DEBUG] 最终传递给分析引擎的股票代码: '{formatted_symbol}'")
 
-        # 初始化交易图
+        # 从复用池获取交易图（相同分析师与配置的图只构建一次）
         update_progress("🔧 初始化分析引擎...")
-        graph = TradingAgentsGraph(analysts, config=config, debug=False)
-
-        # 执行分析
-        update_progress(f"📊 开始分析 {formatted_symbol} 股票，这可能需要几分钟时间...")
-        logger.debug(f"🔍 [RUNNER DEBUG] ===== 调用graph.propagate =====")
-        logger.debug(f"🔍 [RUNNER DEBUG] 传递给graph.propagate的参数:")
-        logger.debug(f"🔍 [RUNNER DEBUG]   symbol: '{formatted_symbol}'")
-        logger.debug(f"🔍 [RUNNER DEBUG]   date: '{analysis_date}'")
-
-        state, decision = graph.propagate(formatted_symbol, analysis_date)
+        with get_graph_pool().lease(analysts, config) as graph:
+            # 执行分析
+            update_progress(f"📊 开始分析 {formatted_symbol} 股票，这可能需要几分钟时间...")
+            logger.debug(f"🔍 [RUNNER DEBUG] ===== 调用graph.propagate_isolated =====")
+            logger.debug(f"🔍 [RUNNER DEBUG] 传递给graph.propagate_isolated的参数:")
+            logger.debug(f"🔍 [RUNNER DEBUG]   symbol: '{formatted_symbol}'")
+            logger.debug(f"🔍 [RUNNER DEBUG]   date: '{analysis_date}'")
+
+            with run_data_scope(run_data):
+                state, decision = graph.propagate_isolated(formatted_symbol, analysis_date, analysis_id=session_id)
+            # 分析已完整成功，检查点不再需要
+            graph.discard_checkpoint(session_id)
 
         # 调试信息
         logger.debug(f"🔍 [DEBUG] 分析完成，decision类型: {type(decision)}")
@@ -452,6 +478,161 @@ def run_stock_analysis(stock_symbol, analysis_date, analysts, research_depth, ll
         # 如果真实分析失败，返回模拟数据用于演示
         return generate_demo_results(stock_symbol, analysis_date, analysts, research_depth, llm_provider, llm_model, str(e), market_type)
 
+def run_batch_stock_analysis(stock_symbols, analysis_date, analysts, research_depth, llm_provider, llm_model,
+                             market_type="美股", max_concurrency=4, progress_callback=None):
+    """批量执行股票分析，按完成顺序逐只返回结果
+
+    与逐只调用 run_stock_analysis 相比，所有股票共用同一个分析引擎（LLM客户端、工具集、记忆），
+    与个股无关的市场/宏观新闻只获取一次，并在有界线程池中并发分析。
+
+    Args:
+        stock_symbols: 股票代码列表
+        analysis_date: 分析日期
+        analysts: 分析师列表
+        research_depth: 研究深度
+        llm_provider: LLM提供商
+        llm_model: 大模型名称
+        market_type: 市场类型
+        max_concurrency: 同时分析的股票数量上限
+        progress_callback: 进度回调函数，参数与 run_stock_analysis 相同
+
+    Yields:
+        与 run_stock_analysis 返回值结构相同的结果字典（失败时 success 为 False，不返回演示数据）
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from tradingagents.utils.stock_validator import prepare_stock_data
+
+    stock_symbols = list(dict.fromkeys(stock_symbols))
+    total = len(stock_symbols)
+    if not total:
+        return
+
+    def update_progress(message, step=None, total_steps=None):
+        """更新进度"""
+        if progress_callback:
+            progress_callback(message, step, total_steps)
+        logger.info(f"[批量进度] {message}")
+
+    def failure(stock_symbol, error, suggestion=None):
+        return {
+            'stock_symbol': stock_symbol,
+            'analysis_date': analysis_date,
+            'analysts': analysts,
+            'research_depth': research_depth,
+            'llm_provider': llm_provider,
+            'llm_model': llm_model,
+            'success': False,
+            'error': error,
+            'suggestion': suggestion,
+        }
+
+    if not os.getenv("DASHSCOPE_API_KEY"):
+        raise ValueError("DASHSCOPE_API_KEY 环境变量未设置")
+    if not os.getenv("FINNHUB_API_KEY"):
+        raise ValueError("FINNHUB_API_KEY 环境变量未设置")
+
+    # 1. 并发验证股票代码并预获取数据
+    update_progress(f"🔍 验证 {total} 只股票并预获取数据...")
+
+    # 整批分析共用一个预获取数据交接区（按股票代码区分），预获取和分析在不同线程中进行
+    run_data = RunDataContext()
+
+    def prepare(stock_symbol):
+        try:
+            with run_data_scope(run_data):
+                return stock_symbol, prepare_stock_data(
+                    stock_code=stock_symbol,
+                    market_type=market_type,
+                    period_days=DEFAULT_PERIOD_DAYS,
+                    analysis_date=analysis_date
+                )
+        except Exception as e:
+            return stock_symbol, e
+
+    valid_symbols = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, total))) as pool:
+        for stock_symbol, preparation_result in pool.map(prepare, stock_symbols):
+            if isinstance(preparation_result, Exception):
+                yield failure(stock_symbol, f"数据预获取过程中发生错误: {preparation_result}", "请检查网络连接或稍后重试")
+            elif not preparation_result.is_valid:
+                yield failure(stock_symbol, preparation_result.error_message, preparation_result.suggestion)
+            else:
+                valid_symbols.append(stock_symbol)
+
+    if not valid_symbols:
+        return
+
+    # 2. 共用一个分析引擎
+    from tradingagents.graph.pool import get_graph_pool
+
+    config = build_analysis_config(research_depth, llm_provider, llm_model, market_type)
+    os.makedirs(config["data_dir"], exist_ok=True)
+    os.makedirs(config["results_dir"], exist_ok=True)
+    os.makedirs(config["data_cache_dir"], exist_ok=True)
+
+    update_progress("🔧 初始化分析引擎...")
+    with get_graph_pool().lease(analysts, config) as graph:
+        # 3. 并发分析，逐只返回
+        symbol_map = {format_stock_symbol(symbol, market_type): symbol for symbol in valid_symbols}
+        finished = total - len(valid_symbols)
+        for item in graph.propagate_many(list(symbol_map), analysis_date, max_concurrency=max_concurrency,
+                                         run_data=run_data):
+            finished += 1
+            stock_symbol = symbol_map[item["ticker"]]
+            if item["error"]:
+                update_progress(f"❌ {stock_symbol} 分析失败（{finished}/{total}）", finished, total)
+                yield failure(stock_symbol, item["error"])
+                continue
+
+            state = item["state"]
+            risk_assessment = extract_risk_assessment(state)
+            if risk_assessment:
+                state['risk_assessment'] = risk_assessment
+
+            update_progress(f"✅ {stock_symbol} 分析完成（{finished}/{total}）", finished, total)
+            yield {
+                'stock_symbol': stock_symbol,
+                'analysis_date': analysis_date,
+                'analysts': analysts,
+                'research_depth': research_depth,
+                'llm_provider': llm_provider,
+                'llm_model': llm_model,
+                'state': state,
+                'decision': item["decision"],
+                'tool_stats': item["tool_stats"],
+                'success': True,
+                'error': None,
+                'session_id': None
+            }
+
+
+def format_stock_analysis_report(code: str, analysis_result: dict) -> str:
+    """把单只股票的分析结果（run_stock_analysis / run_batch_stock_analysis 的返回值）整理为报告段落"""
+    if not analysis_result.get('success') and 'state' not in analysis_result:
+        return f"### 个股分析: {code}\n分析失败：{analysis_result.get('error')}"
+
+    # 处理分析结果
+    raw_reports = []
+    if 'state' in analysis_result:
+        state = analysis_result['state']
+        report_types = [
+            'market_report', 'fundamentals_report',
+            'sentiment_report', 'news_report',
+        ]
+        for report_type in report_types:
+            if report_type in state:
+                raw_reports.append(
+                    f"#### {report_type.replace('_', ' ').title()}\n{state[report_type]}")
+
+    # 添加决策推理
+    decision_reasoning = ""
+    if 'decision' in analysis_result and 'reasoning' in analysis_result['decision']:
+        decision_reasoning = f"#### 核心决策结论\n{analysis_result['decision']['reasoning']}"
+
+    # 整合报告
+    full_raw_report = "\n\n".join(raw_reports + [decision_reasoning])
+    return f"### 个股分析: {code}\n{full_raw_report if full_raw_report else '无分析结果'}"
+
 def format_analysis_results(results):
     """格式化分析结果用于显示"""
     
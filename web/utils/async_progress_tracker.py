@@ -46,7 +46,8 @@ def safe_serialize(obj):
 class AsyncProgressTracker:
     """异步进度跟踪器"""
     
-    def __init__(self, analysis_id: str, analysts: List[str], research_depth: int, llm_provider: str):
+    def __init__(self, analysis_id: str, analysts: List[str], research_depth: int, llm_provider: str,
+                 run_key: Optional[Dict[str, Any]] = None):
         self.analysis_id = analysis_id
         self.analysts = analysts
         self.research_depth = research_depth
@@ -73,7 +74,9 @@ class AsyncProgressTracker:
             'last_message': '准备开始分析...',
             'last_update': time.time(),
             'start_time': self.start_time,
-            'steps': self.analysis_steps
+            'steps': self.analysis_steps,
+            # 股票/市场/日期，用于判断重试时能否沿用该分析ID从检查点继续
+            'run_key': run_key or {}
         }
         
         # 尝试初始化Redis，失败则使用文件